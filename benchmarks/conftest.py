@@ -0,0 +1,69 @@
+"""Benchmarks of the job stores, the service layer and the HTTP API.
+
+The benchmarks are not collected by a plain ``pytest`` run. Install pytest-benchmark with
+``pip install fastapi-uws[benchmark]`` and record the results as JSON for comparison between
+runs::
+
+    pytest benchmarks --benchmark-json=benchmark.json
+
+To fail a run that is more than 10% slower than the last saved one::
+
+    pytest benchmarks --benchmark-autosave --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Reads of the stores are repeated with each of ``--job-counts`` jobs stored, 1000 and 100000 by
+default. ``--job-counts=1000,100000,1000000`` runs the full matrix, which takes some minutes to
+fill the stores and several gigabytes of memory.
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.jobs import fill_store
+from fastapi_uws.stores import BaseUWSStore, InMemoryStore, SQLiteStore
+
+STORES = {
+    "memory": lambda directory: InMemoryStore(),
+    "sqlite": lambda directory: SQLiteStore(str(directory / "jobs.db")),
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--job-counts",
+        default="1000,100000",
+        help="Comma-separated numbers of stored jobs to benchmark reads at.",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "job_count" in metafunc.fixturenames:
+        counts = [int(count) for count in metafunc.config.getoption("job_counts").split(",")]
+        metafunc.parametrize("job_count", counts, ids=[f"{count}jobs" for count in counts], scope="session")
+
+
+@pytest.fixture(scope="session", params=list(STORES))
+def store_kind(request) -> str:
+    return request.param
+
+
+@pytest.fixture
+def empty_store(store_kind, tmp_path) -> BaseUWSStore:
+    """A new store with no jobs, for benchmarks that write."""
+    return STORES[store_kind](tmp_path)
+
+
+@pytest.fixture(scope="session")
+def populated_store(store_kind, job_count, tmp_path_factory) -> BaseUWSStore:
+    """A store holding ``job_count`` jobs, shared by the benchmarks that only read."""
+    store = STORES[store_kind](tmp_path_factory.mktemp(store_kind))
+    fill_store(store, job_count)
+    return store
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run a coroutine to completion on an event loop kept for the whole session."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
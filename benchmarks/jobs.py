@@ -0,0 +1,52 @@
+"""Jobs used to fill the stores under benchmark."""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi_uws.models import Parameter
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.stores import BaseUWSStore
+from fastapi_uws.stores.base import new_job
+
+PARAMETERS = [
+    Parameter(id="QUERY", value="SELECT * FROM TAP_SCHEMA.tables"),
+    Parameter(id="LANG", value="ADQL"),
+]
+
+PHASES = [
+    ExecutionPhase.PENDING,
+    ExecutionPhase.QUEUED,
+    ExecutionPhase.EXECUTING,
+    ExecutionPhase.COMPLETED,
+    ExecutionPhase.ERROR,
+    ExecutionPhase.ABORTED,
+]
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+"""The creation time of the first job. Each later job is created one second after the last."""
+
+BATCH_SIZE = 10_000
+
+
+def fill_store(store: BaseUWSStore, count: int):
+    """Save jobs to a store, spread evenly over the phases and one second apart.
+
+    The jobs never expire, so the store can be read for as long as the benchmarks run.
+
+    Args:
+        store: The store to fill.
+        count: The number of jobs to save.
+    """
+    for offset in range(0, count, BATCH_SIZE):
+        jobs = []
+        for i in range(offset, min(offset + BATCH_SIZE, count)):
+            job = new_job(PARAMETERS, owner_id=f"user{i % 100}")
+            job.creation_time = EPOCH + timedelta(seconds=i)
+            job.destruction_time = None
+            job.phase = PHASES[i % len(PHASES)]
+            jobs.append(job)
+        store.save_jobs(jobs)
+
+
+def midpoint(count: int) -> datetime:
+    """The creation time after which half of ``count`` jobs were created."""
+    return EPOCH + timedelta(seconds=count // 2)
@@ -0,0 +1,90 @@
+"""Benchmarks of the HTTP API, through an in-process ASGI client.
+
+Requests go through the whole application, including routing, validation and content
+negotiation, but no network. The operations per second reported for each benchmark are the
+request throughput of a single client.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.jobs import PARAMETERS, fill_store
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.router.uws_router import uws_router
+from fastapi_uws.settings import get_store_instance
+
+HTTP_JOBS = 10_000
+
+CREATE_JOB = {"parameter": [parameter.model_dump() for parameter in PARAMETERS]}
+
+
+@pytest.fixture(scope="module")
+def client():
+    """A client of the application, with the configured store holding ``HTTP_JOBS`` jobs."""
+    store = get_store_instance()
+    store.clear()
+    fill_store(store, HTTP_JOBS)
+
+    app = FastAPI()
+    app.include_router(uws_router)
+    with TestClient(app) as client:
+        yield client
+    store.clear()
+
+
+@pytest.fixture(scope="module")
+def job_id() -> str:
+    return get_store_instance().query_jobs(phases=[ExecutionPhase.COMPLETED], limit=1)[0].job_id
+
+
+def request(client: TestClient, method: str, url: str, status: int, **kwargs):
+    response = client.request(method, url, follow_redirects=False, **kwargs)
+    assert response.status_code == status
+    return response
+
+
+@pytest.mark.benchmark(group="http-job")
+class TestJob:
+    """Benchmark reading a job"""
+
+    def test_json(self, benchmark, client, job_id):
+        benchmark(request, client, "GET", f"/uws/{job_id}", 200)
+
+    def test_xml(self, benchmark, client, job_id):
+        benchmark(request, client, "GET", f"/uws/{job_id}", 200, headers={"Accept": "application/xml"})
+
+    def test_not_modified(self, benchmark, client, job_id):
+        etag = request(client, "GET", f"/uws/{job_id}", 200).headers["ETag"]
+        benchmark(request, client, "GET", f"/uws/{job_id}", 304, headers={"If-None-Match": etag})
+
+    def test_wait_finished(self, benchmark, client, job_id):
+        benchmark(request, client, "GET", f"/uws/{job_id}?WAIT=30", 200)
+
+    def test_phase(self, benchmark, client, job_id):
+        benchmark(request, client, "GET", f"/uws/{job_id}/phase", 200)
+
+
+@pytest.mark.benchmark(group="http-list")
+class TestJobList:
+    """Benchmark reading the job list"""
+
+    def test_last(self, benchmark, client):
+        benchmark(request, client, "GET", "/uws/?LAST=100", 200)
+
+    def test_phase_last(self, benchmark, client):
+        benchmark(request, client, "GET", "/uws/?PHASE=COMPLETED&LAST=100", 200)
+
+    def test_after(self, benchmark, client):
+        benchmark(request, client, "GET", "/uws/?PHASE=EXECUTING&AFTER=2024-01-01T02:30:00Z", 200)
+
+    def test_page_xml(self, benchmark, client):
+        benchmark(request, client, "GET", "/uws/?PAGESIZE=100", 200, headers={"Accept": "application/xml"})
+
+
+@pytest.mark.benchmark(group="http-create")
+class TestCreateJob:
+    """Benchmark submitting jobs"""
+
+    def test_create(self, benchmark, client):
+        benchmark(request, client, "POST", "/uws/", 303, json=CREATE_JOB)
@@ -0,0 +1,103 @@
+"""Benchmarks of the service layer, including serialisation of its results."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.jobs import PARAMETERS, midpoint
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.responses import UWSJSONResponse
+from fastapi_uws.service import UWSService
+from fastapi_uws.stores import AsyncStoreAdapter, InMemoryStore
+from fastapi_uws.xml_writer import iter_job_xml, iter_jobs_xml
+
+
+@pytest.fixture(scope="session")
+def service(populated_store) -> UWSService:
+    """A service reading the jobs of the populated store."""
+    service = UWSService()
+    service.store = AsyncStoreAdapter(populated_store)
+    return service
+
+
+@pytest.fixture
+def wait_service() -> UWSService:
+    """A service with one active job, for benchmarking WAIT."""
+    service = UWSService()
+    service.store = AsyncStoreAdapter(InMemoryStore())
+    return service
+
+
+@pytest.mark.benchmark(group="service-list")
+class TestJobList:
+    """Benchmark building the job list"""
+
+    def test_last(self, benchmark, run, service):
+        jobs = benchmark(lambda: run(service.get_job_list(last=100)))
+        assert len(jobs.jobref) == 100
+
+    def test_phase_last(self, benchmark, run, service):
+        jobs = benchmark(lambda: run(service.get_job_list([ExecutionPhase.COMPLETED], last=100)))
+        assert len(jobs.jobref) == 100
+
+    def test_phase_after(self, benchmark, run, service, job_count):
+        after = midpoint(job_count)
+        jobs = benchmark(lambda: run(service.get_job_list([ExecutionPhase.COMPLETED], after=after)))
+        assert len(jobs.jobref) == pytest.approx(job_count // 12, abs=1)
+
+    def test_page(self, benchmark, run, service):
+        jobs, cursor = run(service.get_job_page(page_size=100))
+        jobs, _ = benchmark(lambda: run(service.get_job_page(page_size=100, cursor=cursor)))
+        assert len(jobs.jobref) == 100
+
+
+@pytest.mark.benchmark(group="service-wait")
+class TestWait:
+    """Benchmark clients polling a job with WAIT"""
+
+    def test_finished_job(self, benchmark, run, wait_service):
+        """A finished job is returned straight away"""
+        store = wait_service.store.store
+        job_id = store.add_job(PARAMETERS)
+        store.update_job(job_id, lambda job: setattr(job, "phase", ExecutionPhase.COMPLETED))
+
+        job = benchmark(lambda: run(wait_service.get_job_summary(job_id, wait=30)))
+        assert job.phase == ExecutionPhase.COMPLETED
+
+    def test_phase_change(self, benchmark, run, wait_service):
+        """The time from a waiting client's request to its return once another client changes the job"""
+        store = wait_service.store.store
+        job_id = store.add_job(PARAMETERS)
+
+        async def poll():
+            current = store.get_job(job_id).phase
+            new_phase = ExecutionPhase.EXECUTING if current == ExecutionPhase.PENDING else ExecutionPhase.PENDING
+            waiter = asyncio.create_task(wait_service.get_job_summary(job_id, wait=30))
+            # the waiter runs until it blocks on the job
+            await asyncio.sleep(0)
+            store.update_job(job_id, lambda job: setattr(job, "phase", new_phase))
+            job = await waiter
+            assert job.phase == new_phase
+
+        benchmark(lambda: run(poll()))
+
+
+@pytest.mark.benchmark(group="serialisation")
+class TestSerialisation:
+    """Benchmark rendering jobs and job lists"""
+
+    def test_job_json(self, benchmark, populated_store):
+        job = populated_store.query_jobs(limit=1)[0]
+        benchmark(UWSJSONResponse, job)
+
+    def test_job_xml(self, benchmark, populated_store):
+        job = populated_store.query_jobs(limit=1)[0]
+        benchmark(lambda: "".join(iter_job_xml(job)))
+
+    def test_job_list_json(self, benchmark, run, service):
+        jobs = run(service.get_job_list(last=1000))
+        benchmark(UWSJSONResponse, jobs)
+
+    def test_job_list_xml(self, benchmark, run, service):
+        jobs = run(service.get_job_list(last=1000))
+        benchmark(lambda: "".join(iter_jobs_xml(jobs)))
@@ -0,0 +1,60 @@
+"""Benchmarks of the job stores."""
+
+import pytest
+
+from benchmarks.jobs import PARAMETERS, midpoint
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.stores import NewJob
+
+
+@pytest.mark.benchmark(group="store-create")
+class TestCreateJobs:
+    """Benchmark adding and saving jobs"""
+
+    def test_add_job(self, benchmark, empty_store):
+        benchmark(empty_store.add_job, PARAMETERS)
+
+    def test_add_jobs(self, benchmark, empty_store):
+        jobs = [NewJob(PARAMETERS) for _ in range(100)]
+        benchmark(empty_store.add_jobs, jobs)
+
+    def test_save_job(self, benchmark, empty_store):
+        job = empty_store.get_job(empty_store.add_job(PARAMETERS))
+        benchmark(empty_store.save_job, job)
+
+
+@pytest.mark.benchmark(group="store-read")
+class TestReadJobs:
+    """Benchmark reading single jobs from a full store"""
+
+    def test_get_job(self, benchmark, populated_store):
+        job_id = populated_store.query_jobs(limit=1)[0].job_id
+        assert benchmark(populated_store.get_job, job_id).job_id == job_id
+
+    def test_get_job_version(self, benchmark, populated_store):
+        job_id = populated_store.query_jobs(limit=1)[0].job_id
+        benchmark(populated_store.get_job_version, job_id)
+
+    def test_count_jobs(self, benchmark, populated_store, job_count):
+        assert sum(benchmark(populated_store.count_jobs).values()) == job_count
+
+
+@pytest.mark.benchmark(group="store-query")
+class TestQueryJobs:
+    """Benchmark the filters of the job list"""
+
+    def test_last(self, benchmark, populated_store):
+        assert len(benchmark(populated_store.query_jobs, limit=100)) == 100
+
+    def test_phase_last(self, benchmark, populated_store):
+        jobs = benchmark(populated_store.query_jobs, phases=[ExecutionPhase.COMPLETED], limit=100)
+        assert len(jobs) == 100
+
+    def test_phases_after(self, benchmark, populated_store, job_count):
+        phases = [ExecutionPhase.EXECUTING, ExecutionPhase.ERROR]
+        jobs = benchmark(populated_store.query_jobs, phases=phases, after=midpoint(job_count))
+        assert len(jobs) == pytest.approx(job_count // 6, abs=2)
+
+    def test_after_last(self, benchmark, populated_store, job_count):
+        jobs = benchmark(populated_store.query_jobs, after=midpoint(job_count), limit=100)
+        assert len(jobs) == 100
@@ -0,0 +1,270 @@
+"""Change notifications for UWS jobs."""
+
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from fastapi_uws.models import JobSummary
+from fastapi_uws.models.types import ExecutionPhase
+
+
+@dataclass(frozen=True)
+class JobEvent:
+    """A change to a job in the store."""
+
+    job_id: str
+    phase: Optional[ExecutionPhase] = None
+    owner_id: Optional[str] = None
+    deleted: bool = False
+
+    @classmethod
+    def from_job(cls, job: JobSummary) -> "JobEvent":
+        """Build an event describing the current state of a job."""
+        return cls(job_id=job.job_id, phase=ExecutionPhase(job.phase), owner_id=job.owner_id)
+
+    def as_message(self) -> dict:
+        """The event as a JSON-compatible message, using the field aliases of the job models."""
+        return {
+            "jobId": self.job_id,
+            "phase": self.phase.value if self.phase is not None else None,
+            "ownerId": self.owner_id,
+            "deleted": self.deleted,
+        }
+
+
+JobListener = Callable[[JobEvent], None]
+
+
+class PhaseWatch:
+    """Waits for a job to leave a given phase.
+
+    Create one with :meth:`JobEventHub.watch` *before* reading the job from the store, so that
+    a change landing between the read and the wait is not missed. Enter it with ``with`` to wait
+    from a thread, or with ``async with`` to wait from an event loop.
+    """
+
+    def __init__(self, hub: "JobEventHub", job_id: str, phase: ExecutionPhase):
+        self.hub = hub
+        self.job_id = job_id
+        self.phase = phase
+        self.changed = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_changed: Optional[asyncio.Event] = None
+        self._unsubscribe = None
+
+    def _on_event(self, event: JobEvent):
+        if event.deleted or event.phase != self.phase:
+            self.changed.set()
+            if self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._async_changed.set)
+                except RuntimeError:
+                    # the waiting loop has already been closed
+                    pass
+
+    def __enter__(self):
+        self._unsubscribe = self.hub.subscribe(self._on_event, self.job_id)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._unsubscribe()
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        self._async_changed = asyncio.Event()
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        self.__exit__(*exc_info)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job changes phase.
+
+        Args:
+            timeout: The maximum time to wait in seconds, or None to wait forever.
+
+        Returns:
+            True if the phase changed, False if the timeout expired.
+        """
+        return self.changed.wait(timeout)
+
+    async def wait_async(self, timeout: float = None) -> bool:
+        """Wait on the event loop until the job changes phase, without tying up a thread.
+
+        Args:
+            timeout: The maximum time to wait in seconds, or None to wait forever.
+
+        Returns:
+            True if the phase changed, False if the timeout expired.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await self._async_changed.wait()
+        except TimeoutError:
+            return False
+        return True
+
+
+class JobSubscription:
+    """Delivers the events of a set of jobs to a consumer on an event loop.
+
+    Events are handed from the publishing thread to a bounded queue on the consumer's loop. A
+    consumer that falls behind loses the oldest events rather than holding memory or slowing the
+    publisher; :attr:`dropped` counts them so the consumer can tell its client to resynchronise.
+
+    Enter the subscription with ``async with`` to start receiving events.
+
+    Args:
+        hub: The hub to subscribe to.
+        owner_id: Only deliver events of jobs with this owner.
+        job_ids: Only deliver events of these jobs. Every job matches if None.
+        max_queued: The maximum number of undelivered events.
+    """
+
+    def __init__(
+        self,
+        hub: "JobEventHub",
+        owner_id: str = None,
+        job_ids: Iterable[str] = None,
+        max_queued: int = 1000,
+    ):
+        self.hub = hub
+        self.owner_id = owner_id
+        self.job_ids: Optional[set[str]] = None if job_ids is None else set(job_ids)
+        self.max_queued = max_queued
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._unsubscribe = None
+
+    def matches(self, event: JobEvent) -> bool:
+        """Whether an event is about one of the subscribed jobs."""
+        if self.owner_id is not None and event.owner_id != self.owner_id:
+            return False
+        # read once, as the set may be replaced from the consumer's loop
+        job_ids = self.job_ids
+        return job_ids is None or event.job_id in job_ids
+
+    def add_jobs(self, job_ids: Iterable[str]):
+        """Start delivering events of more jobs. Has no effect when subscribed to every job."""
+        if self.job_ids is not None:
+            self.job_ids = self.job_ids | set(job_ids)
+
+    def remove_jobs(self, job_ids: Iterable[str]):
+        """Stop delivering events of the given jobs. Has no effect when subscribed to every job."""
+        if self.job_ids is not None:
+            self.job_ids = self.job_ids - set(job_ids)
+
+    def _on_event(self, event: JobEvent):
+        if self.matches(event):
+            try:
+                self._loop.call_soon_threadsafe(self._put, event)
+            except RuntimeError:
+                # the consuming loop has already been closed
+                pass
+
+    def _put(self, event: JobEvent):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_queued)
+        self._unsubscribe = self.hub.subscribe(self._on_event)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._unsubscribe()
+
+    async def get(self, timeout: float = None) -> Optional[JobEvent]:
+        """Wait for the next event.
+
+        Args:
+            timeout: The maximum time to wait in seconds, or None to wait forever.
+
+        Returns:
+            The next event, or None if the timeout expired.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                return await self._queue.get()
+        except TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        """Get the number of events dropped since the last call, and reset the count."""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class JobEventHub:
+    """Fans out job change events to listeners.
+
+    Stores publish an event every time a job is added, saved or deleted. Listeners are called
+    synchronously in the publishing thread, so they must be quick and must never block.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # listeners keyed by job ID, with the None key holding listeners for every job
+        self._listeners: dict[Optional[str], set[JobListener]] = {}
+
+    def subscribe(self, listener: JobListener, job_id: str = None) -> Callable[[], None]:
+        """Register a listener for job events.
+
+        Args:
+            listener: The callable to notify.
+            job_id: Only notify the listener about this job. Notify about every job if None.
+
+        Returns:
+            A callable that removes the listener.
+        """
+        with self._lock:
+            self._listeners.setdefault(job_id, set()).add(listener)
+
+        def unsubscribe():
+            with self._lock:
+                listeners = self._listeners.get(job_id)
+                if listeners is None:
+                    return
+                listeners.discard(listener)
+                if not listeners:
+                    del self._listeners[job_id]
+
+        return unsubscribe
+
+    def publish(self, event: JobEvent):
+        """Notify every interested listener of an event.
+
+        Args:
+            event: The event to publish.
+        """
+        with self._lock:
+            listeners = [*self._listeners.get(event.job_id, ()), *self._listeners.get(None, ())]
+
+        for listener in listeners:
+            listener(event)
+
+    def watch(self, job_id: str, phase: ExecutionPhase) -> PhaseWatch:
+        """Watch a job for a change away from the given phase.
+
+        Args:
+            job_id: The ID of the job to watch.
+            phase: The phase the job is currently in.
+        """
+        return PhaseWatch(self, job_id, phase)
+
+    def subscription(
+        self, owner_id: str = None, job_ids: Iterable[str] = None, max_queued: int = 1000
+    ) -> JobSubscription:
+        """Subscribe an event loop consumer to the events of many jobs.
+
+        Args:
+            owner_id: Only deliver events of jobs with this owner.
+            job_ids: Only deliver events of these jobs. Every job matches if None.
+            max_queued: The maximum number of undelivered events.
+        """
+        return JobSubscription(self, owner_id, job_ids, max_queued)
@@ -0,0 +1,385 @@
+"""Load generator simulating a mix of UWS clients.
+
+Run it against a service started with uvicorn::
+
+    uvicorn fastapi_uws.main:app --port 8000
+    python -m fastapi_uws.loadgen --url http://localhost:8000 --duration 60 --pollers 32
+
+or, without ``--url``, against the application in this process. In-process runs need no server
+and are repeatable, but the clients share the event loop and CPU with the service, so they
+understate the capacity of a real deployment.
+
+Each simulated client repeats the behaviour of its profile until the run ends:
+
+* submitters create jobs, and start them with ``--run``;
+* pollers follow recently submitted jobs with blocking ``WAIT`` reads until they finish;
+* viewers read the job list, with and without a ``PHASE`` filter;
+* downloaders fetch the results of completed jobs. For in-process runs ``--seed-jobs``
+  completed jobs with a result of ``--result-size`` bytes are created first.
+
+The latency percentiles and throughput of each endpoint are printed at the end, and written as
+JSON with ``--json``. The load generator needs httpx (``pip install fastapi-uws[loadgen]``).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from fastapi_uws.models import Parameter, Results
+from fastapi_uws.models.types import ExecutionPhase
+
+ACTIVE_PHASES = {ExecutionPhase.PENDING.value, ExecutionPhase.QUEUED.value, ExecutionPhase.EXECUTING.value}
+
+CREATE_JOB = {
+    "parameter": [
+        {"id": "QUERY", "value": "SELECT * FROM TAP_SCHEMA.tables"},
+        {"id": "LANG", "value": "ADQL"},
+    ]
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """The nearest-rank percentile of sorted values.
+
+    Args:
+        values: The values, in increasing order.
+        fraction: The percentile as a fraction, such as 0.95.
+    """
+    if not values:
+        return math.nan
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+@dataclass
+class EndpointStats:
+    """The requests made to one endpoint."""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    bytes: int = 0
+
+    def summary(self, duration: float) -> dict:
+        """The request count, throughput and latency percentiles, with latencies in milliseconds."""
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput": len(latencies) / duration,
+            "mib_per_second": self.bytes / duration / 2**20,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+        }
+
+
+@dataclass
+class LoadReport:
+    """The outcome of a load run, by endpoint."""
+
+    duration: float
+    endpoints: dict[str, EndpointStats] = field(default_factory=dict)
+
+    def record(self, endpoint: str, latency: float, error: bool = False, size: int = 0):
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        stats.latencies.append(latency)
+        stats.bytes += size
+        if error:
+            stats.errors += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "endpoints": {endpoint: stats.summary(self.duration) for endpoint, stats in sorted(self.endpoints.items())},
+        }
+
+    def render(self) -> str:
+        """The report as a text table."""
+        header = (
+            f"{'endpoint':<42} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for endpoint, summary in self.as_dict()["endpoints"].items():
+            lines.append(
+                f"{endpoint:<42} {summary['requests']:>9} {summary['errors']:>7} {summary['throughput']:>9.1f} "
+                f"{summary['p50']:>9.1f} {summary['p95']:>9.1f} {summary['p99']:>9.1f}"
+            )
+            if summary["mib_per_second"]:
+                lines.append(f"{'':<42} {summary['mib_per_second']:>27.1f} MiB/s")
+        return "\n".join(lines)
+
+
+class LoadContext:
+    """The state shared by the simulated clients of a run.
+
+    Args:
+        client: The HTTP client to send requests with.
+        report: The report to record requests in.
+        wait: The ``WAIT`` time of blocking reads, in seconds.
+        run_jobs: Whether submitters start the jobs they create.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, report: LoadReport, wait: int = 5, run_jobs: bool = False):
+        self.client = client
+        self.report = report
+        self.wait = wait
+        self.run_jobs = run_jobs
+        # recently submitted jobs, followed by the pollers
+        self.submitted: deque[str] = deque(maxlen=1000)
+        # completed jobs, whose results are fetched by the downloaders
+        self.completed: deque[str] = deque(maxlen=1000)
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Send a request, recording its latency under the given endpoint label.
+
+        Returns:
+            The response, or None if the request failed without one.
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.report.record(endpoint, time.perf_counter() - start, error=True)
+            return None
+        self.report.record(
+            endpoint, time.perf_counter() - start, error=response.status_code >= 400, size=len(response.content)
+        )
+        return response
+
+
+async def submitter(context: LoadContext, think_time: float):
+    """Create jobs, optionally starting them."""
+    while True:
+        response = await context.request("POST /uws/", "POST", "/uws/", json=CREATE_JOB)
+        if response is not None and response.status_code == 303:
+            job_id = response.headers["location"].rstrip("/").rsplit("/", 1)[-1]
+            context.submitted.append(job_id)
+            if context.run_jobs:
+                await context.request("POST /uws/{job_id}/phase", "POST", f"/uws/{job_id}/phase", json={"PHASE": "RUN"})
+        await asyncio.sleep(think_time)
+
+
+async def poller(context: LoadContext, think_time: float):
+    """Follow recently submitted jobs with blocking reads until they finish."""
+    while True:
+        if not context.submitted:
+            await asyncio.sleep(think_time)
+            continue
+
+        job_id = random.choice(context.submitted)
+        while True:
+            response = await context.request(
+                "GET /uws/{job_id}?WAIT", "GET", f"/uws/{job_id}", params={"WAIT": context.wait}
+            )
+            if response is None or response.status_code != 200:
+                break
+            phase = response.json()["phase"]
+            if phase not in ACTIVE_PHASES:
+                if phase == ExecutionPhase.COMPLETED.value:
+                    context.completed.append(job_id)
+                break
+        await asyncio.sleep(think_time)
+
+
+async def viewer(context: LoadContext, think_time: float):
+    """Read the newest jobs, alternately all of them and only the active ones."""
+    while True:
+        await context.request("GET /uws/?LAST", "GET", "/uws/", params={"LAST": 50})
+        await asyncio.sleep(think_time)
+        await context.request(
+            "GET /uws/?PHASE&LAST", "GET", "/uws/", params={"PHASE": ["QUEUED", "EXECUTING"], "LAST": 50}
+        )
+        await asyncio.sleep(think_time)
+
+
+async def downloader(context: LoadContext, think_time: float):
+    """Fetch every result of completed jobs."""
+    while True:
+        if not context.completed:
+            response = await context.request(
+                "GET /uws/?PHASE&LAST", "GET", "/uws/", params={"PHASE": "COMPLETED", "LAST": 100}
+            )
+            if response is not None and response.status_code == 200:
+                context.completed.extend(job["jobId"] for job in response.json().get("jobref") or [])
+            if not context.completed:
+                await asyncio.sleep(max(think_time, 1))
+                continue
+
+        job_id = random.choice(context.completed)
+        response = await context.request("GET /uws/{job_id}/results", "GET", f"/uws/{job_id}/results")
+        if response is not None and response.status_code == 200:
+            for result in Results.model_validate(response.json()).result or []:
+                if result.href:
+                    await context.request("GET /uws/{job_id}/results/{result_id}", "GET", result.href)
+        await asyncio.sleep(think_time)
+
+
+BEHAVIOURS: dict[str, Callable[[LoadContext, float], Awaitable[None]]] = {
+    "submitter": submitter,
+    "poller": poller,
+    "viewer": viewer,
+    "downloader": downloader,
+}
+
+
+@dataclass
+class ClientProfile:
+    """A kind of simulated client, and how many of them to run.
+
+    Args:
+        behaviour: The name of the behaviour, one of ``BEHAVIOURS``.
+        clients: The number of clients.
+        think_time: The pause between a client's actions, in seconds.
+    """
+
+    behaviour: str
+    clients: int
+    think_time: float = 0.1
+
+
+def seed_completed_jobs(count: int, result_size: int) -> list[str]:
+    """Create completed jobs in the configured store, each with one stored result.
+
+    Only possible when the service runs in this process.
+
+    Args:
+        count: The number of jobs to create.
+        result_size: The size of each result, in bytes.
+
+    Returns:
+        The IDs of the jobs.
+    """
+    from fastapi_uws.settings import get_result_store_instance, get_store_instance
+
+    store = get_store_instance()
+    results = get_result_store_instance()
+    content = random.randbytes(result_size)
+    parameters = [Parameter(**parameter) for parameter in CREATE_JOB["parameter"]]
+
+    job_ids = []
+    for _ in range(count):
+        job_id = store.add_job(parameters)
+        reference = results.put(job_id, "result.bin", content, "application/octet-stream")
+
+        def complete(job, reference=reference):
+            job.phase = ExecutionPhase.COMPLETED
+            job.results = Results(result=[reference])
+
+        store.update_job(job_id, complete)
+        job_ids.append(job_id)
+    return job_ids
+
+
+async def run_load(
+    profiles: list[ClientProfile],
+    duration: float,
+    url: str = None,
+    wait: int = 5,
+    run_jobs: bool = False,
+    seed_jobs: int = 0,
+    result_size: int = 2**20,
+) -> LoadReport:
+    """Simulate clients of a UWS service for a fixed time.
+
+    Args:
+        profiles: The clients to simulate.
+        duration: How long to run for, in seconds.
+        url: The base URL of the service, or None to send requests to the application in this process.
+        wait: The ``WAIT`` time of the pollers' blocking reads, in seconds.
+        run_jobs: Whether submitters start the jobs they create.
+        seed_jobs: The number of completed jobs with results to create before an in-process run.
+        result_size: The size of the seeded results, in bytes.
+
+    Returns:
+        The latency and throughput of each endpoint.
+    """
+    seeded = []
+    if url is None:
+        from fastapi_uws.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        url = "http://testserver"
+        seeded = seed_completed_jobs(seed_jobs, result_size)
+    else:
+        transport = None
+
+    report = LoadReport(duration)
+    # blocking reads must not time out before the service answers them
+    timeout = httpx.Timeout(wait + 30)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, transport=transport, timeout=timeout, limits=limits) as client:
+        context = LoadContext(client, report, wait, run_jobs)
+        context.completed.extend(seeded)
+
+        tasks = [
+            asyncio.create_task(BEHAVIOURS[profile.behaviour](context, profile.think_time))
+            for profile in profiles
+            for _ in range(profile.clients)
+        ]
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            # requests still in flight are not recorded
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if seeded:
+        from fastapi_uws.settings import get_store_instance
+
+        get_store_instance().delete_jobs(seeded)
+    return report
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m fastapi_uws.loadgen", description="Simulate a mix of UWS clients and report endpoint latency."
+    )
+    parser.add_argument("--url", help="Base URL of the service. Defaults to the application in this process.")
+    parser.add_argument("--duration", type=float, default=30, help="Length of the run in seconds.")
+    parser.add_argument("--submitters", type=int, default=2, help="Number of clients creating jobs.")
+    parser.add_argument("--pollers", type=int, default=8, help="Number of clients following jobs with WAIT.")
+    parser.add_argument("--viewers", type=int, default=2, help="Number of clients reading the job list.")
+    parser.add_argument("--downloaders", type=int, default=2, help="Number of clients fetching results.")
+    parser.add_argument("--think-time", type=float, default=0.1, help="Pause between a client's actions in seconds.")
+    parser.add_argument("--wait", type=int, default=5, help="WAIT time of the pollers' requests in seconds.")
+    parser.add_argument("--run", action="store_true", help="Start submitted jobs.")
+    parser.add_argument("--seed-jobs", type=int, default=20, help="Completed jobs to create for an in-process run.")
+    parser.add_argument("--result-size", type=int, default=2**20, help="Size of the seeded results in bytes.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report to this file as JSON.")
+    args = parser.parse_args(argv)
+
+    profiles = [
+        ClientProfile("submitter", args.submitters, args.think_time),
+        ClientProfile("poller", args.pollers, args.think_time),
+        ClientProfile("viewer", args.viewers, args.think_time),
+        ClientProfile("downloader", args.downloaders, args.think_time),
+    ]
+    report = asyncio.run(
+        run_load(
+            profiles,
+            args.duration,
+            url=args.url,
+            wait=args.wait,
+            run_jobs=args.run,
+            seed_jobs=args.seed_jobs,
+            result_size=args.result_size,
+        )
+    )
+
+    print(report.render())
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report.as_dict(), file, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
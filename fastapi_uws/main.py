@@ -1,13 +1,35 @@
 """Main module."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from fastapi_uws.metrics import MetricsMiddleware, metrics_router
+from fastapi_uws.reaper import ExpiryReaper
 from fastapi_uws.router.uws_router import uws_router
+from fastapi_uws.settings import app_settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background expiry reaper for the lifetime of the application."""
+    reaper = ExpiryReaper()
+    reaper.start()
+    yield
+    await reaper.stop()
+
 
 app = FastAPI(
     title="Universal Worker Service (UWS)",
-    description="The Universal Worker Service (UWS) pattern defines how to manage asynchronous execution of jobs on a service.",
+    description=(
+        "The Universal Worker Service (UWS) pattern defines how to manage asynchronous execution of jobs on a service."
+    ),
     version="1.2",
+    lifespan=lifespan,
 )
 
 app.include_router(uws_router)
+
+if app_settings.metrics.ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
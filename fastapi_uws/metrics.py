@@ -0,0 +1,359 @@
+"""Operational metrics in the Prometheus text format.
+
+The metrics are kept in process by a small pure-Python implementation, and exposed by the
+``/metrics`` route of :data:`metrics_router`. With ``UWS_METRICS_ENABLED`` set, the configured
+store and worker are wrapped in :class:`InstrumentedStore` and :class:`InstrumentedWorker`, and
+the application records the latency of every request with :class:`MetricsMiddleware`.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from fastapi_uws.models import JobSummary, Parameter
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.settings import get_async_store_instance
+from fastapi_uws.stores import BaseUWSStore, NewJob
+from fastapi_uws.stores.base import JobVersion
+from fastapi_uws.stores.index import IndexKey
+from fastapi_uws.workers import BaseUWSWorker
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Iterable[tuple[str, str]]) -> str:
+    labels = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{labels}}}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A named family of samples, one per combination of label values.
+
+    Args:
+        name: The name of the metric.
+        documentation: A description of the metric.
+        labels: The names of the labels distinguishing the samples.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[tuple[str, tuple[tuple[str, str], ...], float]]:
+        """The samples of the metric, as ``(name suffix, label pairs, value)``."""
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in sorted(values):
+            yield "", tuple(zip(self.labels, key)), value
+
+    def render(self) -> str:
+        """The metric in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+    def clear(self):
+        """Forget every sample."""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """A count that only goes up."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """The distribution of observed values, counted in cumulative buckets.
+
+    Args:
+        buckets: The upper bounds of the buckets, in increasing order.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        # the count of each bucket alone, with the last for values above every bound; summed when rendered
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in sorted(values):
+            labels = tuple(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield "_bucket", (*labels, ("le", _format_value(bound))), cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """The set of metrics exposed together."""
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+JOBS = REGISTRY.gauge("uws_jobs", "The number of stored jobs in each phase.", ["phase"])
+WAITING_CLIENTS = REGISTRY.gauge("uws_waiting_clients", "The number of clients blocked on a job with WAIT.")
+STORE_SECONDS = REGISTRY.histogram(
+    "uws_store_operation_seconds", "The time taken by job store operations.", ["operation"]
+)
+STORE_ERRORS = REGISTRY.counter("uws_store_errors_total", "The number of failed job store operations.", ["operation"])
+WORKER_SECONDS = REGISTRY.histogram(
+    "uws_worker_operation_seconds", "The time taken by worker operations.", ["operation"]
+)
+WORKER_ERRORS = REGISTRY.counter("uws_worker_errors_total", "The number of failed worker operations.", ["operation"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "uws_http_request_duration_seconds", "The time taken to answer HTTP requests.", ["method", "route"]
+)
+REQUESTS = REGISTRY.counter(
+    "uws_http_requests_total", "The number of HTTP requests answered.", ["method", "route", "status"]
+)
+
+
+def _timed(histogram: Histogram, errors: Counter, operation: str, func: Callable, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    except Exception:
+        errors.inc(operation=operation)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, operation=operation)
+
+
+class InstrumentedStore(BaseUWSStore):
+    """Store wrapper recording the latency and failures of every operation of another store.
+
+    Attributes not part of the store interface are passed through to the wrapped store.
+
+    Args:
+        store: The store to wrap.
+    """
+
+    def __init__(self, store: BaseUWSStore):
+        self.store = store
+        self.blocking = store.blocking
+        self.events = store.events
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _call(self, operation: str, *args):
+        return _timed(STORE_SECONDS, STORE_ERRORS, operation, getattr(self.store, operation), *args)
+
+    def get_job(self, job_id: str) -> JobSummary:
+        return self._call("get_job", job_id)
+
+    def get_jobs(self) -> list[JobSummary]:
+        return self._call("get_jobs")
+
+    def get_jobs_by_id(self, job_ids: list[str]) -> list[JobSummary]:
+        return self._call("get_jobs_by_id", job_ids)
+
+    def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ) -> list[JobSummary]:
+        return self._call("query_jobs", phases, after, limit, before)
+
+    def count_jobs(self) -> dict[ExecutionPhase, int]:
+        return self._call("count_jobs")
+
+    def get_job_version(self, job_id: str) -> Optional[JobVersion]:
+        return self._call("get_job_version", job_id)
+
+    def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
+        return self._call("add_job", parameters, owner_id, run_id)
+
+    def save_job(self, job: JobSummary) -> None:
+        return self._call("save_job", job)
+
+    def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        return self._call("update_job", job_id, update)
+
+    def delete_job(self, job_id: str) -> None:
+        return self._call("delete_job", job_id)
+
+    def add_jobs(self, jobs: list[NewJob]) -> list[str]:
+        return self._call("add_jobs", jobs)
+
+    def save_jobs(self, jobs: list[JobSummary]) -> None:
+        return self._call("save_jobs", jobs)
+
+    def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        return self._call("update_jobs", job_ids, update)
+
+    def delete_jobs(self, job_ids: list[str]) -> list[str]:
+        return self._call("delete_jobs", job_ids)
+
+    def expire_jobs(self, now: datetime = None, archive: bool = False) -> list[JobSummary]:
+        return self._call("expire_jobs", now, archive)
+
+
+class InstrumentedWorker(BaseUWSWorker):
+    """Worker wrapper recording the latency and failures of every call to another worker.
+
+    Args:
+        worker: The worker to wrap.
+    """
+
+    def __init__(self, worker: BaseUWSWorker):
+        self.worker = worker
+        self.blocking = worker.blocking
+
+    def __getattr__(self, name):
+        return getattr(self.worker, name)
+
+    def _call(self, operation: str, *args):
+        return _timed(WORKER_SECONDS, WORKER_ERRORS, operation, getattr(self.worker, operation), *args)
+
+    def run(self, job: JobSummary) -> None:
+        return self._call("run", job)
+
+    def cancel(self, job: JobSummary) -> None:
+        return self._call("cancel", job)
+
+    def cleanup(self, job: JobSummary) -> None:
+        return self._call("cleanup", job)
+
+    def queue_position(self, job: JobSummary) -> Optional[int]:
+        return self._call("queue_position", job)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of each HTTP request.
+
+    Requests are labelled with the path template of the route that answered them, such as
+    ``/uws/{job_id}``, so the number of samples does not grow with the number of jobs.
+
+    Args:
+        app: The application to wrap.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router records the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=route)
+            REQUESTS.inc(method=method, route=route, status=str(status))
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Report the metrics of this process in the Prometheus text format."""
+    counts = await get_async_store_instance().count_jobs()
+    for phase in ExecutionPhase:
+        JOBS.set(counts.get(phase, 0), phase=phase.value)
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -103,6 +103,20 @@ class JobSummary(BaseUWSModel):
         default=None, description="The version of the UWS standard that the job complies with."
     )
 
+    def to_short_description(self) -> ShortJobDescription:
+        """Project the job onto its short description.
+
+        The fields are copied without validation, as they were validated when the job was built,
+        so the cost does not grow with the job's parameters and results.
+        """
+        return ShortJobDescription.model_construct(
+            creation_time=self.creation_time,
+            job_id=self.job_id,
+            owner_id=self.owner_id,
+            phase=ExecutionPhase(self.phase),
+            run_id=self.run_id,
+        )
+
 
 class Jobs(BaseUWSModel):
     """The list of job references returned at /jobs."""
@@ -0,0 +1,123 @@
+"""Interactive job monitoring over a WebSocket."""
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from fastapi_uws.events import JobEvent, JobSubscription
+from fastapi_uws.models.types import ExecutionPhase, PhaseAction
+from fastapi_uws.service import UWSService
+
+
+class JobMonitor:
+    """Serves one WebSocket connection monitoring and controlling jobs.
+
+    The client sends JSON commands:
+
+    - ``{"action": "subscribe", "jobs": [...]}`` starts reporting changes to the given jobs, and
+      replies with their current state.
+    - ``{"action": "unsubscribe", "jobs": [...]}`` stops reporting them.
+    - ``{"action": "phase", "jobId": ..., "phase": "RUN" | "ABORT"}`` changes the phase of a job,
+      as a POST to ``/uws/{job_id}/phase`` would.
+
+    Every command is answered with an ``ack`` or ``error`` message. Job changes arrive as ``job``
+    messages with the job ID, phase and owner, plus the results once the job has completed.
+
+    Changes are queued per connection with a bound; a client that cannot keep up loses the oldest
+    changes and is sent an ``overflow`` message with the number lost, rather than holding memory
+    on the server.
+
+    Args:
+        websocket: The connection to serve.
+        service: The service to read and update jobs through.
+        owner_id: Report every job of this owner, instead of only the subscribed jobs.
+    """
+
+    def __init__(self, websocket: WebSocket, service: UWSService, owner_id: str = None):
+        self.websocket = websocket
+        self.service = service
+        self.owner_id = owner_id
+        self._send_lock = asyncio.Lock()
+
+    async def serve(self):
+        """Accept the connection and serve it until the client disconnects."""
+        await self.websocket.accept()
+
+        job_ids = None if self.owner_id is not None else []
+        async with self.service.watch_jobs(self.owner_id, job_ids) as subscription:
+            try:
+                async with asyncio.TaskGroup() as tasks:
+                    sender = tasks.create_task(self._send_changes(subscription))
+                    try:
+                        await self._receive_commands(subscription)
+                    finally:
+                        sender.cancel()
+            except* WebSocketDisconnect:
+                pass
+
+    async def _send(self, message: dict):
+        # commands are acknowledged from the receiving task while changes are sent from another
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _job_message(self, job_id: str, phase: Optional[ExecutionPhase], message: dict) -> dict:
+        if phase == ExecutionPhase.COMPLETED:
+            try:
+                results = await self.service.get_job_detail(job_id, "results")
+            except HTTPException:
+                # deleted since the change
+                return message
+            message["results"] = results.model_dump(mode="json", by_alias=True)["result"]
+        return message
+
+    async def _send_changes(self, subscription: JobSubscription):
+        while True:
+            event = await subscription.get()
+
+            dropped = subscription.take_dropped()
+            if dropped:
+                await self._send({"type": "overflow", "dropped": dropped})
+
+            message = {"type": "job", **event.as_message()}
+            await self._send(await self._job_message(event.job_id, event.phase, message))
+
+    async def _receive_commands(self, subscription: JobSubscription):
+        while True:
+            text = await self.websocket.receive_text()
+            try:
+                command = json.loads(text)
+                action = command["action"]
+                if action == "subscribe":
+                    await self._subscribe(subscription, command["jobs"])
+                elif action == "unsubscribe":
+                    subscription.remove_jobs(command["jobs"])
+                elif action == "phase":
+                    response = await self.service.update_job_phase(command["jobId"], PhaseAction(command["phase"]))
+                    if isinstance(response, HTTPException):
+                        raise response
+                else:
+                    await self._send({"type": "error", "message": f"Unknown action {action!r}"})
+                    continue
+            except HTTPException as exc:
+                await self._send({"type": "error", "action": command.get("action"), "message": exc.detail})
+            except (KeyError, TypeError, ValueError):
+                await self._send({"type": "error", "message": "Malformed command"})
+            else:
+                await self._send({"type": "ack", "action": action})
+
+    async def _subscribe(self, subscription: JobSubscription, job_ids: list[str]):
+        if not isinstance(job_ids, list):
+            raise TypeError("jobs must be a list")
+
+        # subscribe before reading, so that a change between the two is not missed
+        subscription.add_jobs(job_ids)
+        for job_id in job_ids:
+            try:
+                job = await self.service.get_job_summary(job_id)
+            except HTTPException:
+                await self._send({"type": "error", "jobId": job_id, "message": "Job not found"})
+                continue
+            event = JobEvent.from_job(job)
+            await self._send(await self._job_message(job_id, event.phase, {"type": "job", **event.as_message()}))
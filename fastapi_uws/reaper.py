@@ -0,0 +1,71 @@
+"""Background removal of expired jobs."""
+
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi_uws.models import JobSummary
+from fastapi_uws.settings import app_settings, get_async_store_instance, get_async_worker_instance
+from fastapi_uws.stores import AsyncBaseUWSStore
+from fastapi_uws.workers import AsyncBaseUWSWorker
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryReaper:
+    """Periodically deletes or archives jobs that are past their destruction time.
+
+    Args:
+        store: The store to sweep. Defaults to the configured store.
+        worker: The worker asked to clean up after expired jobs. Defaults to the configured worker.
+        interval: The time between sweeps in seconds. Defaults to ``UWS_STORE_REAP_INTERVAL``.
+        archive: Whether to archive jobs instead of deleting them. Defaults to ``UWS_STORE_ARCHIVE_EXPIRED``.
+    """
+
+    def __init__(
+        self,
+        store: AsyncBaseUWSStore = None,
+        worker: AsyncBaseUWSWorker = None,
+        interval: int = None,
+        archive: bool = None,
+    ):
+        self.store = store or get_async_store_instance()
+        self.worker = worker or get_async_worker_instance()
+        self.interval = app_settings.store.REAP_INTERVAL if interval is None else interval
+        self.archive = app_settings.store.ARCHIVE_EXPIRED if archive is None else archive
+        self._task: Optional[asyncio.Task] = None
+
+    async def reap(self) -> list[JobSummary]:
+        """Expire jobs once, and clean up after them.
+
+        Returns:
+            The jobs that expired.
+        """
+        expired = await self.store.expire_jobs(archive=self.archive)
+        for job in expired:
+            await self.worker.cleanup(job)
+        return expired
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("Failed to remove expired jobs")
+
+    def start(self):
+        """Start sweeping in the background on the running event loop."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sweeping."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,7 +1,10 @@
 from fastapi_uws.requests.requests import (
     CreateJobRequest,
+    CreateJobsRequest,
+    DeleteJobsRequest,
     UpdateJobDestructionRequest,
     UpdateJobExecutionDurationRequest,
     UpdateJobPhaseRequest,
+    UpdateJobsPhaseRequest,
     UpdateJobRequest,
 )
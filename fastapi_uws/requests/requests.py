@@ -39,3 +39,23 @@ class CreateJobRequest(BaseModel):
     parameter: list[Parameter]
     owner_id: Optional[str] = Field(default=None, alias="ownerId")
     run_id: Optional[str] = Field(default=None, alias="runId")
+
+
+class CreateJobsRequest(BaseModel):
+    """Body of the request to create many jobs at once."""
+
+    jobs: list[CreateJobRequest]
+    phase: Optional[Literal["RUN"]] = Field(default=None, alias="PHASE")
+
+
+class UpdateJobsPhaseRequest(BaseModel):
+    """Body of the request to update the phase of many jobs at once."""
+
+    job_ids: list[str] = Field(alias="jobIds")
+    phase: PhaseAction = Field(alias="PHASE")
+
+
+class DeleteJobsRequest(BaseModel):
+    """Body of the request to delete many jobs at once."""
+
+    job_ids: list[str] = Field(alias="jobIds")
@@ -1,7 +1,358 @@
-from pydantic import BaseModel
+import os
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import anyio
+import pydantic_core
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.types import Receive, Scope, Send
+
+from fastapi_uws.events import JobSubscription
+from fastapi_uws.models import Jobs, JobSummary, Parameters, Results
+from fastapi_uws.results import MappedResult
+from fastapi_uws.settings import app_settings
+from fastapi_uws.stores.base import JobVersion
+from fastapi_uws.xml_writer import iter_job_xml, iter_jobs_xml, iter_parameters_xml, iter_results_xml
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class UWSJSONResponse(JSONResponse):
+    """JSON response serialising straight to bytes.
+
+    Pydantic models are rendered by pydantic-core using their field aliases, skipping the
+    intermediate dictionaries built by ``jsonable_encoder``. Other content is rendered with orjson
+    when it is installed (``pip install fastapi-uws[fast]``), or with pydantic-core otherwise.
+
+    Routes returning an instance of this class bypass FastAPI's response-model serialisation, so
+    the content must already be validated.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None and not isinstance(content, BaseModel):
+            return orjson.dumps(content)
+        return pydantic_core.to_json(content, by_alias=True)
+
+
+XML_MEDIA_TYPES = ("application/xml", "text/xml")
+
+XML_WRITERS = {
+    Jobs: iter_jobs_xml,
+    JobSummary: iter_job_xml,
+    Parameters: iter_parameters_xml,
+    Results: iter_results_xml,
+}
+
+
+class UWSXMLResponse(StreamingResponse):
+    """Response streaming a UWS model as its standard XML representation.
+
+    The writer yields one small string per element, so its output is gathered into chunks of
+    about ``CHUNK_SIZE`` bytes, each sent from the event loop without a hop to the threadpool.
+
+    Args:
+        content: A job list, job summary, or the parameters or results of a job.
+        headers: Extra response headers.
+    """
+
+    media_type = "application/xml"
+
+    CHUNK_SIZE = 64 * 1024
+    """The size in bytes above which the XML written so far is sent."""
+
+    def __init__(self, content: BaseModel, status_code: int = 200, headers: dict[str, str] = None):
+        super().__init__(self._encode(XML_WRITERS[type(content)](content)), status_code=status_code, headers=headers)
+
+    @classmethod
+    async def _encode(cls, chunks: Iterator[str]) -> AsyncIterator[bytes]:
+        batch = []
+        size = 0
+        for chunk in chunks:
+            batch.append(chunk)
+            size += len(chunk)
+            if size >= cls.CHUNK_SIZE:
+                yield "".join(batch).encode("utf-8")
+                batch.clear()
+                size = 0
+        if size:
+            yield "".join(batch).encode("utf-8")
+
+
+class EventSourceResponse(StreamingResponse):
+    """Response streaming job events to the client as server-sent events.
+
+    Each change is sent as a ``job`` event carrying the job ID, phase and owner. If the client
+    falls behind and events are dropped, an ``overflow`` event gives the number lost, after which
+    the client should re-read the job list. A comment is sent when the stream is idle, so that
+    proxies keep the connection open.
+
+    Args:
+        subscription: The jobs to report on. It is entered when the stream starts.
+        keepalive: The longest time without sending anything, in seconds.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, subscription: JobSubscription, keepalive: float = 15):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        super().__init__(self._stream(subscription, keepalive), headers=headers)
+
+    @staticmethod
+    async def _stream(subscription: JobSubscription, keepalive: float) -> AsyncIterator[str]:
+        async with subscription:
+            # sent once subscribed, so the client knows no later change will be missed
+            yield ": subscribed\n\n"
+
+            event_id = 0
+            while True:
+                event = await subscription.get(keepalive)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield f"event: overflow\ndata: {pydantic_core.to_json({'dropped': dropped}).decode()}\n\n"
+
+                event_id += 1
+                yield f"id: {event_id}\nevent: job\ndata: {pydantic_core.to_json(event.as_message()).decode()}\n\n"
+
+
+def requested_range(request: Request, response: Response, size: int) -> Optional[tuple[int, int]]:
+    """The byte range of a file the client asked for, if it can be served on its own.
+
+    Malformed ranges, requests for several ranges and ranges conditional on a different version
+    of the file (``If-Range``) are ignored, so the whole file is sent.
+
+    Args:
+        request: The request for the file.
+        response: The response carrying the file's ``ETag`` and ``Last-Modified`` headers.
+        size: The size of the file in bytes.
+
+    Returns:
+        The first and last byte of the range, or None to send the whole file.
+
+    Raises:
+        HTTPException: 416 if the range starts past the end of the file.
+    """
+    header = request.headers.get("range")
+    if header is None:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range not in (response.headers.get("etag"), response.headers.get("last-modified")):
+        return None
+
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not dash:
+        return None
+
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # a suffix range: the last N bytes
+            suffix = int(last)
+            if suffix < 0:
+                return None
+            start, end = max(size - suffix, 0) if suffix else size, size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """File response honouring a ``Range`` request for part of the file.
+
+    The whole file is sent as by :class:`~fastapi.responses.FileResponse`. A partial (206)
+    response seeks to the start of the range and sends only the requested bytes. Either way the
+    file is read in chunks of ``UWS_RESULTS_CHUNK_SIZE``, so it is never held in memory.
+
+    Args:
+        path: The file to send.
+        request: The request for the file.
+        stat_result: The result of :func:`os.stat` on the file.
+        media_type: The content type of the file.
+    """
+
+    def __init__(self, path: str, request: Request, stat_result: os.stat_result, media_type: str = None):
+        super().__init__(path, media_type=media_type, stat_result=stat_result)
+        self.chunk_size = app_settings.results.CHUNK_SIZE
+        self.headers["Accept-Ranges"] = "bytes"
+
+        size = stat_result.st_size
+        self.byte_range = requested_range(request, self, size)
+        if self.byte_range is not None:
+            start, end = self.byte_range
+            self.status_code = 206
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self.headers["Content-Length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.byte_range is None:
+            await super().__call__(scope, receive, send)
+            return
+
+        start, end = self.byte_range
+        remaining = end - start + 1
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # the file was truncated since it was opened
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+
+class MappedFileResponse(RangeFileResponse):
+    """File response sending slices of a memory-mapped result.
+
+    Each chunk is a view into the mapping rather than a copy read into a new buffer, so hot
+    results are served from the page cache with no per-chunk allocation. Ranges are handled as by
+    :class:`RangeFileResponse`. The mapping is released when the response has been sent.
+
+    Args:
+        mapped: The mapped result, acquired from a :class:`~fastapi_uws.results.MappedResultCache`.
+        request: The request for the file.
+        media_type: The content type of the file.
+    """
+
+    def __init__(self, mapped: MappedResult, request: Request, media_type: str = None):
+        try:
+            super().__init__(mapped.path, request, mapped.stat, media_type=media_type)
+        except BaseException:
+            mapped.release()
+            raise
+        self.mapped = mapped
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            start, end = self.byte_range or (0, self.mapped.stat.st_size - 1)
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                view = self.mapped.view
+                for offset in range(start, end + 1, self.chunk_size):
+                    chunk_end = min(offset + self.chunk_size, end + 1)
+                    more_body = chunk_end <= end
+                    await send({"type": "http.response.body", "body": view[offset:chunk_end], "more_body": more_body})
+        finally:
+            self.mapped.release()
+
+        if self.background is not None:
+            await self.background()
+
+
+def xml_requested(request: Request) -> bool:
+    """Whether the client prefers XML to JSON, going by its Accept header.
+
+    JSON wins ties and is the default when the header is missing or names neither type.
+    """
+    accept = request.headers.get("accept")
+    if not accept:
+        return False
+
+    best_xml = best_json = 0.0
+    for entry in accept.split(","):
+        media_type, *params = (part.strip() for part in entry.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type in XML_MEDIA_TYPES:
+            best_xml = max(best_xml, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            best_json = max(best_json, quality)
+    return best_xml > best_json
+
+
+def negotiate_response(request: Request, content: BaseModel) -> Response:
+    """Respond with a UWS model as XML or JSON, whichever the client asked for."""
+    if xml_requested(request):
+        return UWSXMLResponse(content)
+    return UWSJSONResponse(content)
+
+
+def cache_headers(version: Optional[JobVersion]) -> dict[str, str]:
+    """The validator headers for a representation of a job at the given revision."""
+    if version is None:
+        return {}
+    return {
+        "ETag": version.etag,
+        "Last-Modified": format_datetime(version.modified.astimezone(timezone.utc), usegmt=True),
+        "Vary": "Accept",
+    }
+
+
+def not_modified(request: Request, version: Optional[JobVersion]) -> bool:
+    """Whether the client's cached copy of a job is still current.
+
+    ``If-None-Match`` is checked with the weak comparison, and takes precedence over
+    ``If-Modified-Since``.
+    """
+    if version is None:
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or version.etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have a resolution of one second
+        return version.modified.replace(microsecond=0) <= since
+
+    return False
 
 
 class ErrorMessage(BaseModel):
     """A message describing an error."""
 
-    message: str = "An error occurred."
\ No newline at end of file
+    message: str = "An error occurred."
+
+
+class BatchResult(BaseModel):
+    """The outcome of a request applying to many jobs."""
+
+    job_ids: list[str] = Field(alias="jobIds", description="The IDs of the jobs the request was applied to.")
+    not_found: list[str] = Field(
+        default_factory=list, alias="notFound", description="The requested job IDs that do not exist."
+    )
+
+    model_config = {
+        "populate_by_name": True,
+    }
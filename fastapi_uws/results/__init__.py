@@ -0,0 +1,3 @@
+from fastapi_uws.results.base import BaseResultStore, StoredResult
+from fastapi_uws.results.local import LocalResultStore
+from fastapi_uws.results.mapped import MappedResult, MappedResultCache
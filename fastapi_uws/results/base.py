@@ -0,0 +1,101 @@
+"""Base class for storing the output files of UWS jobs."""
+
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, NamedTuple, Optional, Union
+
+from fastapi_uws.events import JobEvent
+from fastapi_uws.models import ResultReference
+from fastapi_uws.models.types import ExecutionPhase
+
+logger = logging.getLogger(__name__)
+
+ResultContent = Union[bytes, BinaryIO, str, os.PathLike]
+"""The content of a result: raw bytes, a readable binary file, or the path of a file to copy."""
+
+
+class StoredResult(NamedTuple):
+    """A result file held by a result store."""
+
+    path: str
+    stat: os.stat_result
+
+    @property
+    def size(self) -> int:
+        """The size of the result in bytes."""
+        return self.stat.st_size
+
+    @property
+    def mime_type(self) -> Optional[str]:
+        """The MIME type of the result, guessed from its file name."""
+        return mimetypes.guess_type(self.path)[0]
+
+
+class BaseResultStore:
+    """Base class for storing the output files of jobs.
+
+    Results are stored per job, and removed when their job is deleted or archived. Backends must
+    expose each stored result as a local file, which is streamed to clients without reading it
+    into memory; a backend for remote storage would keep a local copy or mount.
+
+    Results removed in response to job events are deleted one job at a time in a background
+    thread, as event listeners must not block the thread publishing the event.
+    """
+
+    def __init__(self):
+        self._deleter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uws-results")
+
+    def put(self, job_id: str, result_id: str, content: ResultContent, mime_type: str = None) -> ResultReference:
+        """Store a result of a job, replacing any result with the same ID.
+
+        Args:
+            job_id: The ID of the job.
+            result_id: The ID of the result within the job.
+            content: The bytes, readable binary file or path of the file to store.
+            mime_type: The MIME type of the result. Guessed from the result ID if not given.
+
+        Returns:
+            A reference to the result, with its size and MIME type filled in, to add to the job's results.
+        """
+        raise NotImplementedError
+
+    def get(self, job_id: str, result_id: str) -> Optional[StoredResult]:
+        """Find a stored result.
+
+        Args:
+            job_id: The ID of the job.
+            result_id: The ID of the result within the job.
+
+        Returns:
+            The stored result, or None if it does not exist.
+        """
+        raise NotImplementedError
+
+    def delete(self, job_id: str) -> None:
+        """Delete every result of a job.
+
+        Args:
+            job_id: The ID of the job.
+        """
+        raise NotImplementedError
+
+    def on_job_event(self, event: JobEvent) -> None:
+        """Delete the results of jobs that have been deleted or archived.
+
+        Subscribed to the job store's events by :func:`~fastapi_uws.settings.get_result_store_instance`.
+        The results are deleted in the background.
+        """
+        if event.deleted or event.phase == ExecutionPhase.ARCHIVED:
+            self._deleter.submit(self._delete_quietly, event.job_id)
+
+    def flush(self) -> None:
+        """Wait for the deletions queued by job events so far to finish."""
+        self._deleter.submit(lambda: None).result()
+
+    def _delete_quietly(self, job_id: str):
+        try:
+            self.delete(job_id)
+        except Exception:
+            logger.exception("Failed to delete the results of job %s", job_id)
@@ -0,0 +1,83 @@
+"""Result store keeping job outputs on the local filesystem."""
+
+import mimetypes
+import os
+import shutil
+import tempfile
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi_uws.models import ResultReference
+from fastapi_uws.results.base import BaseResultStore, ResultContent, StoredResult
+from fastapi_uws.settings import app_settings
+
+
+class LocalResultStore(BaseResultStore):
+    """Result store keeping each job's results in its own directory.
+
+    Results are written to a temporary file and renamed into place, so a download never sees a
+    partly written file. Content is copied in chunks, so large outputs are never held in memory.
+    The directories are created as results are stored.
+
+    Args:
+        directory: The directory holding the results. Defaults to ``UWS_RESULTS_DIRECTORY``.
+    """
+
+    def __init__(self, directory: str = None):
+        super().__init__()
+        self.directory = os.path.abspath(directory or app_settings.results.DIRECTORY)
+
+    @staticmethod
+    def _name(identifier: str) -> str:
+        # IDs come from URLs, so they must not be able to name a file outside their directory
+        name = quote(identifier, safe="")
+        if name in ("", ".", ".."):
+            raise ValueError(f"Invalid identifier {identifier!r}")
+        return name
+
+    def _job_directory(self, job_id: str) -> str:
+        return os.path.join(self.directory, self._name(job_id))
+
+    def put(self, job_id: str, result_id: str, content: ResultContent, mime_type: str = None) -> ResultReference:
+        """Store a result of a job, replacing any result with the same ID."""
+        job_directory = self._job_directory(job_id)
+        path = os.path.join(job_directory, self._name(result_id))
+        os.makedirs(job_directory, exist_ok=True)
+
+        fd, partial_path = tempfile.mkstemp(dir=job_directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                if isinstance(content, bytes):
+                    output.write(content)
+                elif isinstance(content, (str, os.PathLike)):
+                    with open(content, "rb") as source:
+                        shutil.copyfileobj(source, output)
+                else:
+                    shutil.copyfileobj(content, output)
+            os.replace(partial_path, path)
+        except BaseException:
+            os.unlink(partial_path)
+            raise
+
+        return ResultReference(
+            id=result_id,
+            size=os.path.getsize(path),
+            mime_type=mime_type or mimetypes.guess_type(result_id)[0],
+        )
+
+    def get(self, job_id: str, result_id: str) -> Optional[StoredResult]:
+        """Find a stored result."""
+        try:
+            path = os.path.join(self._job_directory(job_id), self._name(result_id))
+            stat = os.stat(path)
+        except (ValueError, FileNotFoundError):
+            return None
+        return StoredResult(path, stat)
+
+    def delete(self, job_id: str) -> None:
+        """Delete every result of a job."""
+        try:
+            job_directory = self._job_directory(job_id)
+        except ValueError:
+            return
+        shutil.rmtree(job_directory, ignore_errors=True)
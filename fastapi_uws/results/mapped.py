@@ -0,0 +1,136 @@
+"""Memory-mapped result files, shared between downloads."""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi_uws.events import JobEvent
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.results.base import StoredResult
+
+
+def _identity(stat: os.stat_result) -> tuple:
+    # a result replaced through put() is a new file, so its inode changes
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class MappedResult:
+    """A result file mapped into memory, with slices of ``view`` sent without copying.
+
+    Obtained from :meth:`MappedResultCache.acquire`, and handed back with :meth:`release` once
+    the download is done.
+    """
+
+    def __init__(self, cache: "MappedResultCache", stored: StoredResult):
+        self.cache = cache
+        self.path = stored.path
+        self.stat = stored.stat
+        with open(stored.path, "rb") as file:
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapping)
+        self.users = 0
+        self.evicted = False
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Whether the mapping is of the file as it is now."""
+        return _identity(self.stat) == _identity(stat)
+
+    def release(self):
+        """Hand the mapping back to the cache."""
+        self.cache.release(self)
+
+    def close(self):
+        self.view.release()
+        try:
+            self.mapping.close()
+        except BufferError:
+            # a slice is still held by the server, and the file is unmapped once it is collected
+            pass
+
+
+class MappedResultCache:
+    """A bounded, least-recently-used set of open result file mappings.
+
+    Popular results stay mapped between downloads, so they are served straight from the page
+    cache without a read into a new buffer for every chunk. A mapping is closed once it has been
+    evicted and the last download using it has finished. Mappings of a job are evicted when the
+    job is deleted or archived, and a mapping is replaced when its file is.
+
+    Args:
+        max_size: The largest number of files kept mapped.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(max_size, 1)
+        self._lock = threading.Lock()
+        self._mappings: OrderedDict[tuple[str, str], MappedResult] = OrderedDict()
+
+    def __len__(self):
+        return len(self._mappings)
+
+    def acquire(self, job_id: str, result_id: str, stored: StoredResult) -> Optional[MappedResult]:
+        """Get the mapping of a result file, mapping it if needed.
+
+        Args:
+            job_id: The ID of the job.
+            result_id: The ID of the result.
+            stored: The result file.
+
+        Returns:
+            The mapping, to be released once the download is done, or None if the file cannot
+            be mapped.
+        """
+        key = (job_id, result_id)
+        with self._lock:
+            mapped = self._mappings.get(key)
+            if mapped is not None and mapped.matches(stored.stat):
+                self._mappings.move_to_end(key)
+                mapped.users += 1
+                return mapped
+
+        if stored.size == 0:
+            # empty files cannot be mapped
+            return None
+        try:
+            new = MappedResult(self, stored)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            mapped = self._mappings.get(key)
+            if mapped is not None and mapped.matches(stored.stat):
+                # mapped by another download in the meantime
+                new.close()
+            else:
+                if mapped is not None:
+                    self._discard(mapped)
+                mapped = self._mappings[key] = new
+                while len(self._mappings) > self.max_size:
+                    self._discard(self._mappings.popitem(last=False)[1])
+            mapped.users += 1
+            return mapped
+
+    def release(self, mapped: MappedResult):
+        """Hand back a mapping obtained from :meth:`acquire`."""
+        with self._lock:
+            mapped.users -= 1
+            if mapped.evicted and mapped.users == 0:
+                mapped.close()
+
+    def _discard(self, mapped: MappedResult):
+        mapped.evicted = True
+        if mapped.users == 0:
+            mapped.close()
+
+    def evict_job(self, job_id: str):
+        """Close the mappings of every result of a job."""
+        with self._lock:
+            for key in [key for key in self._mappings if key[0] == job_id]:
+                self._discard(self._mappings.pop(key))
+
+    def on_job_event(self, event: JobEvent):
+        """Evict the results of jobs that have been deleted or archived."""
+        if event.deleted or event.phase == ExecutionPhase.ARCHIVED:
+            self.evict_job(event.job_id)
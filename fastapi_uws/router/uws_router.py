@@ -1,24 +1,76 @@
 from datetime import datetime
+from typing import Awaitable, Callable
+from urllib.parse import quote
 
-from fastapi import APIRouter, Body, Path, Query
-from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
+from fastapi import APIRouter, Body, Path, Query, Request, WebSocket
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response
 from fastapi_restful.cbv import cbv
 
 from fastapi_uws.models import ErrorSummary, Jobs, JobSummary, Parameters, Results
-from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.models.types import ExecutionPhase, PhaseAction
+from fastapi_uws.monitor import JobMonitor
 from fastapi_uws.requests import (
     CreateJobRequest,
+    CreateJobsRequest,
+    DeleteJobsRequest,
     UpdateJobDestructionRequest,
     UpdateJobExecutionDurationRequest,
     UpdateJobPhaseRequest,
     UpdateJobRequest,
+    UpdateJobsPhaseRequest,
+)
+from fastapi_uws.responses import (
+    BatchResult,
+    EventSourceResponse,
+    MappedFileResponse,
+    RangeFileResponse,
+    UWSJSONResponse,
+    cache_headers,
+    negotiate_response,
+    not_modified,
 )
-from fastapi_uws.responses import ErrorMessage
 from fastapi_uws.service import UWSService
+from fastapi_uws.stores import NewJob
 
-uws_router = APIRouter(tags=["UWS"])
+uws_router = APIRouter(tags=["UWS"], default_response_class=UWSJSONResponse)
 uws_service = UWSService()
 
+RESULT_PATH = "/uws/{job_id}/results/{result_id}"
+
+
+async def conditional_response(request: Request, job_id: str, build: Callable[[], Awaitable[Response]]) -> Response:
+    """Answer a read of a job resource, or 304 if the client's copy is current.
+
+    The job revision is read before the job, so a representation is never labelled with a newer
+    revision than it shows.
+
+    Args:
+        request: The incoming request.
+        job_id: The ID of the job being read.
+        build: Loads the job and builds the full response. Only called when the client's copy is stale.
+    """
+    version = await uws_service.get_job_version(job_id)
+    headers = cache_headers(version)
+    if not_modified(request, version):
+        return Response(status_code=304, headers=headers)
+
+    response = await build()
+    response.headers.update(headers)
+    return response
+
+
+def link_results(request: Request, job_id: str, results: Results) -> Results:
+    """Point results without an explicit URL at their download route on this service.
+
+    The URL is built from the route path rather than ``request.url_for``, as ``cbv`` renames the
+    routes of the class it decorates.
+    """
+    for result in results.result or []:
+        if result.href is None:
+            path = RESULT_PATH.format(job_id=quote(job_id, safe=""), result_id=quote(result.id, safe=""))
+            result.href = str(request.base_url) + path.lstrip("/")
+    return results
+
 
 @cbv(uws_router)
 class UWSAPIRouter:
@@ -35,11 +87,11 @@ class UWSAPIRouter:
         summary="Deletes the job",
         response_model_by_alias=True,
     )
-    def delete_job(
+    async def delete_job(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> None:
-        uws_service.delete_job(job_id)
+        await uws_service.delete_job(job_id)
         return RedirectResponse(status_code=303, url="/uws/")  # Redirect to the job list
 
     @uws_router.get(
@@ -53,11 +105,11 @@ class UWSAPIRouter:
         summary="Returns the job destruction time",
         response_model_by_alias=True,
     )
-    def get_job_destruction(
+    async def get_job_destruction(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> datetime:
-        return PlainTextResponse(uws_service.get_job_detail(job_id, "destruction_time").isoformat())
+        return PlainTextResponse((await uws_service.get_job_detail(job_id, "destruction_time")).isoformat())
 
     @uws_router.get(
         "/uws/{job_id}/error",
@@ -70,11 +122,11 @@ class UWSAPIRouter:
         summary="Returns the job error summary",
         response_model_by_alias=True,
     )
-    def get_job_error_summary(
+    async def get_job_error_summary(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> ErrorSummary:
-        return uws_service.get_job_detail(job_id, "error_summary")
+        return UWSJSONResponse(await uws_service.get_job_detail(job_id, "error_summary"))
 
     @uws_router.get(
         "/uws/{job_id}/executionduration",
@@ -87,16 +139,20 @@ class UWSAPIRouter:
         summary="Returns the job execution duration",
         response_model_by_alias=True,
     )
-    def get_job_execution_duration(
+    async def get_job_execution_duration(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> int:
-        return uws_service.get_job_detail(job_id, "execution_duration")
+        return UWSJSONResponse(await uws_service.get_job_detail(job_id, "execution_duration"))
 
     @uws_router.get(
         "/uws/",
         responses={
-            200: {"model": Jobs, "description": "Any response containing the UWS job list"},
+            200: {
+                "model": Jobs,
+                "description": "Any response containing the UWS job list",
+                "content": {"application/xml": {}},
+            },
             403: {"model": object, "description": "Forbidden"},
             404: {"model": object, "description": "Job not found"},
         },
@@ -104,15 +160,42 @@ class UWSAPIRouter:
         summary="Returns the list of UWS jobs",
         response_model_by_alias=True,
     )
-    def get_job_list(
+    async def get_job_list(
         self,
+        request: Request,
         phase: list[ExecutionPhase] = Query(
             None, description="Execution phase of the job to filter for", alias="PHASE"
         ),
         after: datetime = Query(None, description="Return jobs submitted after this date", alias="AFTER"),
         last: int = Query(None, description="Return only the last N jobs", alias="LAST", ge=1),
+        page_size: int = Query(None, description="Return the job list in pages of N jobs", alias="PAGESIZE", ge=1),
+        cursor: str = Query(None, description="Opaque cursor of the page to return", alias="CURSOR"),
     ) -> Jobs:
-        return uws_service.get_job_list(phase, after, last)
+        if page_size is None and cursor is None:
+            return negotiate_response(request, await uws_service.get_job_list(phase, after, last))
+
+        job_list, next_cursor = await uws_service.get_job_page(phase, after, last, page_size, cursor)
+        response = negotiate_response(request, job_list)
+        if next_cursor:
+            next_url = request.url.include_query_params(CURSOR=next_cursor)
+            response.headers["Link"] = f'<{next_url}>; rel="next"'
+        return response
+
+    @uws_router.get(
+        "/uws/events",
+        responses={
+            200: {"content": {"text/event-stream": {}}, "description": "A stream of job changes"},
+        },
+        tags=["UWS"],
+        summary="Streams changes to jobs as server-sent events",
+        response_class=EventSourceResponse,
+    )
+    async def get_job_events(
+        self,
+        owner: str = Query(None, description="Only report jobs with this owner", alias="OWNER"),
+        job: list[str] = Query(None, description="Only report these jobs", alias="JOB"),
+    ):
+        return EventSourceResponse(uws_service.watch_jobs(owner, job))
 
     @uws_router.get(
         "/uws/{job_id}/owner",
@@ -125,16 +208,16 @@ class UWSAPIRouter:
         summary="Returns the job owner",
         response_model_by_alias=True,
     )
-    def get_job_owner(
+    async def get_job_owner(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> str:
-        return PlainTextResponse(uws_service.get_job_detail(job_id, "owner_id"))
+        return PlainTextResponse(await uws_service.get_job_detail(job_id, "owner_id"))
 
     @uws_router.get(
         "/uws/{job_id}/parameters",
         responses={
-            200: {"model": Parameters, "description": "Success"},
+            200: {"model": Parameters, "description": "Success", "content": {"application/xml": {}}},
             403: {"model": object, "description": "Forbidden"},
             404: {"model": object, "description": "Job not found"},
         },
@@ -142,11 +225,15 @@ class UWSAPIRouter:
         summary="Returns the job parameters",
         response_model_by_alias=True,
     )
-    def get_job_parameters(
+    async def get_job_parameters(
         self,
+        request: Request,
         job_id: str = Path(..., description="Job ID"),
     ) -> Parameters:
-        return uws_service.get_job_detail(job_id, "parameters")
+        async def build():
+            return negotiate_response(request, await uws_service.get_job_detail(job_id, "parameters"))
+
+        return await conditional_response(request, job_id, build)
 
     @uws_router.get(
         "/uws/{job_id}/phase",
@@ -159,11 +246,32 @@ class UWSAPIRouter:
         summary="Returns the job phase",
         response_model_by_alias=True,
     )
-    def get_job_phase(
+    async def get_job_phase(
         self,
+        request: Request,
         job_id: str = Path(..., description="Job ID"),
     ) -> ExecutionPhase:
-        return PlainTextResponse(uws_service.get_job_detail(job_id, "phase"))
+        async def build():
+            return PlainTextResponse(await uws_service.get_job_detail(job_id, "phase"))
+
+        return await conditional_response(request, job_id, build)
+
+    @uws_router.get(
+        "/uws/{job_id}/queueposition",
+        responses={
+            200: {"model": int, "description": "Success"},
+            403: {"model": object, "description": "Forbidden"},
+            404: {"model": object, "description": "Job not found or not queued"},
+        },
+        tags=["UWS"],
+        summary="Returns the number of jobs that will start before this queued job",
+        response_model_by_alias=True,
+    )
+    async def get_job_queue_position(
+        self,
+        job_id: str = Path(..., description="Job ID"),
+    ) -> int:
+        return PlainTextResponse(str(await uws_service.get_queue_position(job_id)))
 
     @uws_router.get(
         "/uws/{job_id}/quote",
@@ -176,16 +284,16 @@ class UWSAPIRouter:
         summary="Returns the job quote",
         response_model_by_alias=True,
     )
-    def get_job_quote(
+    async def get_job_quote(
         self,
         job_id: str = Path(..., description="Job ID"),
     ) -> datetime:
-        return PlainTextResponse(uws_service.get_job_detail(job_id, "quote"))
+        return PlainTextResponse(await uws_service.get_job_detail(job_id, "quote"))
 
     @uws_router.get(
         "/uws/{job_id}/results",
         responses={
-            200: {"model": Results, "description": "Success"},
+            200: {"model": Results, "description": "Success", "content": {"application/xml": {}}},
             403: {"model": object, "description": "Forbidden"},
             404: {"model": object, "description": "Job not found"},
         },
@@ -193,16 +301,51 @@ class UWSAPIRouter:
         summary="Returns the job results",
         response_model_by_alias=True,
     )
-    def get_job_results(
+    async def get_job_results(
         self,
+        request: Request,
         job_id: str = Path(..., description="Job ID"),
     ) -> Results:
-        return uws_service.get_job_detail(job_id, "results")
+        async def build():
+            results = await uws_service.get_job_detail(job_id, "results")
+            return negotiate_response(request, link_results(request, job_id, results))
+
+        return await conditional_response(request, job_id, build)
+
+    @uws_router.get(
+        RESULT_PATH,
+        responses={
+            200: {"description": "The result file"},
+            206: {"description": "The requested range of the result file"},
+            403: {"model": object, "description": "Forbidden"},
+            404: {"model": object, "description": "Job or result not found"},
+            416: {"model": object, "description": "Requested range not satisfiable"},
+        },
+        tags=["UWS"],
+        summary="Downloads a job result",
+        response_class=RangeFileResponse,
+    )
+    async def get_job_result(
+        self,
+        request: Request,
+        job_id: str = Path(..., description="Job ID"),
+        result_id: str = Path(..., description="Result ID"),
+    ):
+        stored, mime_type = await uws_service.get_job_result(job_id, result_id)
+        if uws_service.mapped_results is not None:
+            mapped = uws_service.mapped_results.acquire(job_id, result_id, stored)
+            if mapped is not None:
+                return MappedFileResponse(mapped, request, media_type=mime_type)
+        return RangeFileResponse(stored.path, request, stored.stat, media_type=mime_type)
 
     @uws_router.get(
         "/uws/{job_id}",
         responses={
-            200: {"model": JobSummary, "description": "Any response containing the job summary"},
+            200: {
+                "model": JobSummary,
+                "description": "Any response containing the job summary",
+                "content": {"application/xml": {}},
+            },
             403: {"model": object, "description": "Forbidden"},
             404: {"model": object, "description": "Job not found"},
         },
@@ -210,13 +353,22 @@ class UWSAPIRouter:
         summary="Returns the job summary",
         response_model_by_alias=True,
     )
-    def get_job_summary(
+    async def get_job_summary(
         self,
+        request: Request,
         job_id: str = Path(..., description="Job ID"),
         phase: ExecutionPhase = Query(None, description="Phase of the job to poll for", alias="PHASE"),
         wait: int = Query(None, description="Maximum time to wait for the job to change phases.", alias="WAIT", ge=-1),
     ) -> JobSummary:
-        return uws_service.get_job_summary(job_id, phase, wait)
+        async def build():
+            job = await uws_service.get_job_summary(job_id, phase, wait)
+            link_results(request, job_id, job.results)
+            return negotiate_response(request, job)
+
+        if wait is not None:
+            # a blocking read returns once the job changes, so it is never answered from a cached copy
+            return await build()
+        return await conditional_response(request, job_id, build)
 
     @uws_router.post(
         "/uws/",
@@ -229,16 +381,70 @@ class UWSAPIRouter:
         summary="Submits a job",
         response_model_by_alias=True,
     )
-    def post_create_job(
+    async def post_create_job(
         self,
         create_job_request: CreateJobRequest = Body(None, description="Initial job values"),
     ) -> None:
         parameters = create_job_request.parameter
         owner_id = create_job_request.owner_id
         run_id = create_job_request.run_id
-        job_id = uws_service.create_job(parameters, owner_id, run_id)
+        job_id = await uws_service.create_job(parameters, owner_id, run_id)
         return RedirectResponse(status_code=303, url=f"/uws/{job_id}")
 
+    @uws_router.post(
+        "/uws/batch",
+        responses={
+            200: {"model": BatchResult, "description": "The IDs of the created jobs"},
+            403: {"model": object, "description": "Forbidden"},
+        },
+        tags=["UWS"],
+        summary="Submits many jobs at once",
+        response_model_by_alias=True,
+    )
+    async def post_create_jobs(
+        self,
+        create_jobs_request: CreateJobsRequest = Body(..., description="Initial values of each job"),
+    ) -> BatchResult:
+        jobs = [NewJob(job.parameter, job.owner_id, job.run_id) for job in create_jobs_request.jobs]
+        job_ids = await uws_service.create_jobs(jobs, run=create_jobs_request.phase == PhaseAction.RUN)
+        return UWSJSONResponse(BatchResult(job_ids=job_ids))
+
+    @uws_router.post(
+        "/uws/batch/phase",
+        responses={
+            200: {"model": BatchResult, "description": "The IDs of the updated jobs"},
+            403: {"model": object, "description": "Forbidden"},
+        },
+        tags=["UWS"],
+        summary="Updates the phase of many jobs at once",
+        response_model_by_alias=True,
+    )
+    async def post_update_jobs_phase(
+        self,
+        update_jobs_phase_request: UpdateJobsPhaseRequest = Body(..., description="Jobs and the phase to move them to"),
+    ) -> BatchResult:
+        job_ids, not_found = await uws_service.update_jobs_phase(
+            update_jobs_phase_request.job_ids, update_jobs_phase_request.phase
+        )
+        return UWSJSONResponse(BatchResult(job_ids=job_ids, not_found=not_found))
+
+    @uws_router.post(
+        "/uws/batch/delete",
+        responses={
+            200: {"model": BatchResult, "description": "The IDs of the deleted jobs"},
+            403: {"model": object, "description": "Forbidden"},
+        },
+        tags=["UWS"],
+        summary="Deletes many jobs at once",
+        response_model_by_alias=True,
+    )
+    async def post_delete_jobs(
+        self,
+        delete_jobs_request: DeleteJobsRequest = Body(..., description="Jobs to delete"),
+    ) -> BatchResult:
+        job_ids, not_found = await uws_service.delete_jobs(delete_jobs_request.job_ids)
+        return UWSJSONResponse(BatchResult(job_ids=job_ids, not_found=not_found))
+
     @uws_router.post(
         "/uws/{job_id}",
         responses={
@@ -250,7 +456,7 @@ class UWSAPIRouter:
         summary="Update job values",
         response_model_by_alias=True,
     )
-    def post_update_job(
+    async def post_update_job(
         self,
         job_id: str = Path(..., description="Job ID"),
         update_job_request: UpdateJobRequest = Body(None, description="Values to update"),
@@ -259,7 +465,7 @@ class UWSAPIRouter:
         destruction = update_job_request.destruction
         action = update_job_request.action
 
-        uws_service.post_update_job(job_id, phase, destruction, action)
+        await uws_service.post_update_job(job_id, phase, destruction, action)
 
         if action == "DELETE":
             return RedirectResponse(status_code=303, url="/uws/")
@@ -276,14 +482,14 @@ class UWSAPIRouter:
         summary="Updates the job destruction time",
         response_model_by_alias=True,
     )
-    def post_update_job_destruction(
+    async def post_update_job_destruction(
         self,
         job_id: str = Path(..., description="Job ID"),
         post_update_job_destruction_request: UpdateJobDestructionRequest = Body(
             None, description="Destruction time to update"
         ),
     ) -> None:
-        uws_service.update_job_value(job_id, "destruction_time", post_update_job_destruction_request.destruction)
+        await uws_service.update_job_value(job_id, "destruction_time", post_update_job_destruction_request.destruction)
         return RedirectResponse(status_code=303, url=f"/uws/{job_id}")
 
     @uws_router.post(
@@ -297,14 +503,14 @@ class UWSAPIRouter:
         summary="Updates the job execution duration",
         response_model_by_alias=True,
     )
-    def post_update_job_execution_duration(
+    async def post_update_job_execution_duration(
         self,
         job_id: str = Path(..., description="Job ID"),
         post_update_job_execution_duration_request: UpdateJobExecutionDurationRequest = Body(
             None, description="Execution duration to update"
         ),
     ) -> None:
-        uws_service.update_job_value(
+        await uws_service.update_job_value(
             job_id, "execution_duration", post_update_job_execution_duration_request.executionduration
         )
         return RedirectResponse(status_code=303, url=f"/uws/{job_id}")
@@ -320,12 +526,12 @@ class UWSAPIRouter:
         summary="Update job parameters",
         response_model_by_alias=True,
     )
-    def post_update_job_parameters(
+    async def post_update_job_parameters(
         self,
         job_id: str = Path(..., description="Job ID"),
         parameters: Parameters = Body(None, description="Parameters to update"),
     ) -> None:
-        uws_service.update_job_value(job_id, "parameters", parameters)
+        await uws_service.update_job_value(job_id, "parameters", parameters)
         return RedirectResponse(status_code=303, url=f"/uws/{job_id}")
 
     @uws_router.post(
@@ -339,9 +545,19 @@ class UWSAPIRouter:
         summary="Updates the job phase",
         response_model_by_alias=True,
     )
-    def post_update_job_phase(
+    async def post_update_job_phase(
         self,
         job_id: str = Path(..., description="Job ID"),
         post_update_job_phase_request: UpdateJobPhaseRequest = Body(None, description="Phase to update"),
     ) -> None:
-        uws_service.update_job_value(job_id, "phase", post_update_job_phase_request.phase)
+        await uws_service.update_job_phase(job_id, post_update_job_phase_request.phase)
+        return RedirectResponse(status_code=303, url=f"/uws/{job_id}")
+
+
+@uws_router.websocket("/uws/monitor")
+async def monitor_jobs(
+    websocket: WebSocket,
+    owner: str = Query(None, description="Report every job of this owner", alias="OWNER"),
+):
+    """Monitor and control jobs interactively over a WebSocket."""
+    await JobMonitor(websocket, uws_service, owner).serve()
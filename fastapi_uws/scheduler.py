@@ -0,0 +1,209 @@
+"""Fair-share scheduling of queued jobs."""
+
+import heapq
+import threading
+from itertools import count
+from typing import Optional
+
+from fastapi_uws.events import JobEvent
+from fastapi_uws.models import JobSummary
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.settings import app_settings, get_store_instance
+from fastapi_uws.stores import BaseUWSStore
+from fastapi_uws.workers import BaseUWSWorker
+from fastapi_uws.workers.base import mark_queued
+
+# a job holds a running slot until it leaves these phases
+ACTIVE_PHASES = (ExecutionPhase.QUEUED, ExecutionPhase.EXECUTING, ExecutionPhase.SUSPENDED)
+
+
+class OwnerQueue:
+    """The queued jobs of one owner, ordered by priority and then submission order."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.jobs: list[tuple[int, int, str]] = []
+        # virtual time of the owner; the owner with the lowest pass is served next
+        self.pass_value = 0.0
+        # breaks ties between equal passes in favour of the owner served longest ago
+        self.last_served = -1
+
+    def push(self, priority: int, seq: int, job_id: str):
+        heapq.heappush(self.jobs, (-priority, seq, job_id))
+
+    def pop(self, seq: int) -> str:
+        self.pass_value += 1 / self.weight
+        self.last_served = seq
+        return heapq.heappop(self.jobs)[2]
+
+    def remove(self, job_id: str):
+        self.jobs = [entry for entry in self.jobs if entry[2] != job_id]
+        heapq.heapify(self.jobs)
+
+
+class FairShareScheduler(BaseUWSWorker):
+    """Worker wrapper holding jobs in per-owner queues and releasing them to the real worker.
+
+    At most ``max_running`` jobs are handed to the wrapped worker at once. Free slots go to the
+    owner who has received the least service relative to their weight (stride scheduling), so an
+    owner submitting thousands of jobs cannot starve everyone else. Within one owner, jobs with a
+    higher priority parameter run first.
+
+    A slot is released when the store reports that the job left the QUEUED, EXECUTING or
+    SUSPENDED phases, so the wrapped worker must record job progress in the store.
+
+    Args:
+        worker: The worker that runs the jobs.
+        store: The store holding the jobs. Defaults to the configured store.
+        max_running: The maximum number of jobs running at once. Defaults to ``UWS_SCHEDULER_MAX_RUNNING``.
+        weights: The share of each owner, by owner ID. Defaults to ``UWS_SCHEDULER_OWNER_WEIGHTS``.
+            Owners not listed have a weight of 1.
+        priority_parameter: The job parameter holding the job priority. Defaults to
+            ``UWS_SCHEDULER_PRIORITY_PARAMETER``.
+    """
+
+    def __init__(
+        self,
+        worker: BaseUWSWorker,
+        store: BaseUWSStore = None,
+        max_running: int = None,
+        weights: dict[str, float] = None,
+        priority_parameter: str = None,
+    ):
+        self.worker = worker
+        self.store = store or get_store_instance()
+        # run() records the job as QUEUED in the store before handing it on
+        self.blocking = worker.blocking or self.store.blocking
+        self.max_running = max_running or app_settings.scheduler.MAX_RUNNING
+        self.weights = app_settings.scheduler.OWNER_WEIGHTS if weights is None else weights
+        self.priority_parameter = priority_parameter or app_settings.scheduler.PRIORITY_PARAMETER
+
+        self._lock = threading.Lock()
+        self._seq = count()
+        self._queues: dict[Optional[str], OwnerQueue] = {}
+        self._queued: dict[str, Optional[str]] = {}
+        self._running: set[str] = set()
+        self._local = threading.local()
+
+        self.store.events.subscribe(self._on_event)
+
+    def priority(self, job: JobSummary) -> int:
+        """The priority of a job, read from its parameters. Higher priorities run first."""
+        for parameter in job.parameters.parameter:
+            if parameter.id == self.priority_parameter:
+                try:
+                    return int(parameter.value)
+                except (TypeError, ValueError):
+                    return 0
+        return 0
+
+    def run(self, job: JobSummary) -> None:
+        """Queue a job, and start it if a slot is free."""
+        if self.store.update_job(job.job_id, mark_queued) is None:
+            # deleted since the caller read it
+            return
+
+        with self._lock:
+            queue = self._queues.get(job.owner_id)
+            if queue is None:
+                queue = self._queues[job.owner_id] = OwnerQueue(self.weights.get(job.owner_id, 1.0))
+            if not queue.jobs:
+                # owners returning from idle start level with the others rather than with banked credit
+                queue.pass_value = max(queue.pass_value, self._min_pass())
+            queue.push(self.priority(job), next(self._seq), job.job_id)
+            self._queued[job.job_id] = job.owner_id
+
+        self._dispatch()
+
+    def cancel(self, job: JobSummary) -> None:
+        """Drop a queued job, or cancel it in the wrapped worker if it is running."""
+        with self._lock:
+            if job.job_id in self._queued:
+                self._queues[self._queued.pop(job.job_id)].remove(job.job_id)
+                return
+            running = job.job_id in self._running
+            self._running.discard(job.job_id)
+
+        if running:
+            self.worker.cancel(job)
+            self._dispatch()
+
+    def cleanup(self, job: JobSummary) -> None:
+        self.worker.cleanup(job)
+
+    def queue_position(self, job: JobSummary) -> Optional[int]:
+        """The number of jobs that will be started before the given job, or None if it is not queued.
+
+        This replays the scheduling decisions over a copy of the queues, so it costs time linear
+        in the number of queued jobs.
+        """
+        with self._lock:
+            if job.job_id not in self._queued:
+                return None
+            queues = [
+                (queue.pass_value, queue.last_served, 0, queue.weight, sorted(queue.jobs))
+                for queue in self._queues.values()
+                if queue.jobs
+            ]
+            seq = count(next(self._seq))
+
+        heapq.heapify(queues)
+        position = 0
+        while queues:
+            pass_value, _, next_job, weight, jobs = heapq.heappop(queues)
+            if jobs[next_job][2] == job.job_id:
+                return position
+            position += 1
+            if next_job + 1 < len(jobs):
+                heapq.heappush(queues, (pass_value + 1 / weight, next(seq), next_job + 1, weight, jobs))
+        return None
+
+    def _min_pass(self) -> float:
+        active = [queue.pass_value for queue in self._queues.values() if queue.jobs]
+        return min(active, default=0.0)
+
+    def _dispatch(self):
+        """Hand queued jobs to the wrapped worker while slots are free."""
+        if getattr(self._local, "dispatching", False):
+            # a job finished synchronously inside worker.run, and the loop below will fill its slot
+            return
+
+        self._local.dispatching = True
+        try:
+            while True:
+                with self._lock:
+                    if len(self._running) >= self.max_running or not self._queued:
+                        return
+                    queue = min(
+                        (queue for queue in self._queues.values() if queue.jobs),
+                        key=lambda q: (q.pass_value, q.last_served),
+                    )
+                    job_id = queue.pop(next(self._seq))
+                    del self._queued[job_id]
+                    self._running.add(job_id)
+
+                job = self.store.get_job(job_id)
+                if job is None:
+                    with self._lock:
+                        self._running.discard(job_id)
+                    continue
+                self.worker.run(job)
+        finally:
+            self._local.dispatching = False
+
+    def _on_event(self, event: JobEvent):
+        if event.job_id not in self._running and event.job_id not in self._queued:
+            return
+        if not event.deleted and event.phase in ACTIVE_PHASES:
+            return
+
+        with self._lock:
+            if event.job_id in self._queued:
+                # deleted or moved on while still waiting in the queue
+                self._queues[self._queued.pop(event.job_id)].remove(event.job_id)
+                return
+            if event.job_id not in self._running:
+                return
+            self._running.discard(event.job_id)
+
+        self._dispatch()
@@ -1,26 +1,91 @@
 """Module implementing the service layer of the application."""
 
-import time
+import base64
+import binascii
+import json
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Literal, Optional
 
 from fastapi import HTTPException
-
-from fastapi_uws.models import Jobs, Parameter, ShortJobDescription
-from fastapi_uws.models.types import ExecutionPhase, PhaseAction
-from fastapi_uws.settings import get_store_instance, get_worker_instance
-from fastapi_uws.stores import BaseUWSStore
-from fastapi_uws.workers import BaseUWSWorker
+from starlette.concurrency import run_in_threadpool
+
+from fastapi_uws.events import JobSubscription
+from fastapi_uws.metrics import WAITING_CLIENTS
+from fastapi_uws.models import Jobs, JobSummary, Parameter
+from fastapi_uws.models.types import ExecutionPhase, PhaseAction, UWSVersion
+from fastapi_uws.results import BaseResultStore, MappedResultCache, StoredResult
+from fastapi_uws.settings import (
+    app_settings,
+    get_async_store_instance,
+    get_async_worker_instance,
+    get_result_store_instance,
+)
+from fastapi_uws.stores import AsyncBaseUWSStore, NewJob
+from fastapi_uws.stores.base import JobVersion
+from fastapi_uws.stores.index import IndexKey, index_key
+from fastapi_uws.workers import AsyncBaseUWSWorker
+
+
+def encode_cursor(key: IndexKey, remaining: Optional[int]) -> str:
+    """Encode the position after a page of the job list as an opaque cursor.
+
+    Args:
+        key: The ordering key of the last job on the page.
+        remaining: How many more jobs the client may receive under LAST, or None if unlimited.
+    """
+    creation_time, job_id = key
+    payload = json.dumps([creation_time.isoformat(), job_id, remaining], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[IndexKey, Optional[int]]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises:
+        HTTPException: If the cursor is malformed, has a creation time without a timezone or a
+            ``remaining`` count that is not a non-negative integer.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        creation_time, job_id, remaining = json.loads(payload)
+        creation_time = datetime.fromisoformat(creation_time)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(400, "Invalid job list cursor")
+
+    # the index holds timezone-aware creation times, which cannot be compared with naive ones
+    valid_remaining = remaining is None or (type(remaining) is int and remaining >= 0)
+    if creation_time.tzinfo is None or not valid_remaining:
+        raise HTTPException(400, "Invalid job list cursor")
+    return (creation_time, str(job_id)), remaining
+
+
+def list_phases(phase: list[ExecutionPhase] = None) -> list[ExecutionPhase]:
+    """The phases to include in a job list, given the requested PHASE filter."""
+    if phase:
+        return phase
+    # jobs with the phase "ARCHIVED" should not be returned for backwards compatibility
+    # they should be returned if specifically asked for
+    return [job_phase for job_phase in ExecutionPhase if job_phase != ExecutionPhase.ARCHIVED]
+
+
+def mark_aborted(job: JobSummary) -> None:
+    """Move a job to the ABORTED phase, for use with ``update_job``."""
+    job.phase = ExecutionPhase.ABORTED
 
 
 class UWSService:
     """Service class implementing the business logic of the application."""
 
     def __init__(self):
-        self.store: BaseUWSStore = get_store_instance()
-        self.worker: BaseUWSWorker = get_worker_instance()
-
-    def get_job_summary(self, job_id: str, phase: ExecutionPhase = None, wait: int = None):
+        self.store: AsyncBaseUWSStore = get_async_store_instance()
+        self.worker: AsyncBaseUWSWorker = get_async_worker_instance()
+        self.results: BaseResultStore = get_result_store_instance()
+        self.mapped_results: Optional[MappedResultCache] = None
+        if app_settings.results.MMAP:
+            self.mapped_results = MappedResultCache(app_settings.results.MMAP_CACHE_SIZE)
+            self.store.events.subscribe(self.mapped_results.on_job_event)
+
+    async def get_job_summary(self, job_id: str, phase: ExecutionPhase = None, wait: int = None):
         """Get a job by its ID.
 
         Args:
@@ -35,7 +100,7 @@ class UWSService:
             KeyError: If no job with the given ID exists.
         """
 
-        summary = self.store.get_job(job_id)
+        summary = await self.store.get_job(job_id)
         if not summary:
             raise HTTPException(404, "Job summary not found")
 
@@ -52,23 +117,24 @@ class UWSService:
                 return summary
 
         current_phase = summary.phase
-        start_time = time.monotonic()
-
-        while (time.monotonic() - start_time) < wait:
-            new_summary = self.store.get_job(job_id)
 
-            if new_summary is None:
-                raise HTTPException(404, "Job summary found missing while polling for phase change")
+        # subscribe before re-reading the job so a phase change in between can't be missed
+        async with self.store.events.watch(job_id, current_phase) as watch:
+            summary = await self.store.get_job(job_id)
+            if summary is not None and summary.phase == current_phase:
+                WAITING_CLIENTS.inc()
+                try:
+                    await watch.wait_async(wait)
+                finally:
+                    WAITING_CLIENTS.dec()
+                summary = await self.store.get_job(job_id)
 
-            if new_summary.phase != current_phase:
-                return new_summary
+        if summary is None:
+            raise HTTPException(404, "Job summary found missing while waiting for phase change")
 
-            time.sleep(0.1)
-
-        # we've reached maximum wait time, just return the job summary
         return summary
 
-    def get_job_list(self, phase: list[ExecutionPhase] = None, after: datetime = None, last: int = None):
+    async def get_job_list(self, phase: list[ExecutionPhase] = None, after: datetime = None, last: int = None):
         """Get all jobs.
 
         Args:
@@ -80,38 +146,59 @@ class UWSService:
             A list of all jobs in the store, filtered by the given parameters.
         """
 
-        all_jobs = self.store.get_jobs()
+        # the store returns jobs newest first, stopping as soon as LAST jobs have matched
+        jobs = await self.store.query_jobs(phases=list_phases(phase), after=after, limit=last)
 
-        # sort by creation time
-        all_jobs.sort(key=lambda job: job.creation_time, reverse=True)
+        job_list = Jobs.model_construct(jobref=[job.to_short_description() for job in jobs], version=UWSVersion.V1_1)
 
-        job_list = Jobs(jobref=[], version="1.1")
+        return job_list
 
-        for job in all_jobs:
-            # apply filters
-            if after:
-                if job.creation_time < after:
-                    continue
-            if phase:
-                job_phase = ExecutionPhase(job.phase).value
-                if job_phase not in phase:
-                    continue
-            else:
-                if job.phase == ExecutionPhase.ARCHIVED:
-                    # jobs with the phase "ARCHIVED" should not be returned for backwards compatibility
-                    # they should be returned if specifically asked for
-                    continue
+    async def get_job_page(
+        self,
+        phase: list[ExecutionPhase] = None,
+        after: datetime = None,
+        last: int = None,
+        page_size: int = None,
+        cursor: str = None,
+    ) -> tuple[Jobs, Optional[str]]:
+        """Get one page of the job list.
 
-            job_desc = ShortJobDescription(**job.model_dump())
-            job_list.jobref.append(job_desc)
+        Pages follow each other in the store's creation time order, so a client walking through the
+        list sees every job once even while new jobs are added.
 
-        # limit by last, if specified
-        if last:
-            job_list.jobref = job_list.jobref[:last]
+        Args:
+            phase: The phase or list of phases to filter by.
+            after: The date after which to filter.
+            last: Return the last N jobs in total, across all pages. Ignored when continuing from a cursor.
+            page_size: The maximum number of jobs on the page.
+            cursor: The cursor returned with the previous page, or None for the first page.
 
-        return job_list
+        Returns:
+            The page of jobs, and the cursor for the next page or None if this is the last page.
+        """
+
+        before = None
+        remaining = last
+        if cursor:
+            before, remaining = decode_cursor(cursor)
+
+        limits = [limit for limit in (page_size, remaining) if limit is not None]
+        limit = min(limits) if limits else None
+
+        jobs = await self.store.query_jobs(phases=list_phases(phase), after=after, limit=limit, before=before)
+
+        if remaining is not None:
+            remaining -= len(jobs)
 
-    def get_job_detail(self, job_id: str, value: str):
+        next_cursor = None
+        if jobs and len(jobs) == limit and remaining != 0:
+            next_cursor = encode_cursor(index_key(jobs[-1]), remaining)
+
+        job_list = Jobs.model_construct(jobref=[job.to_short_description() for job in jobs], version=UWSVersion.V1_1)
+
+        return job_list, next_cursor
+
+    async def get_job_detail(self, job_id: str, value: str):
         """Return one of the detail elements of the job summary.
 
         Args:
@@ -120,7 +207,7 @@ class UWSService:
 
         """
 
-        job = self.store.get_job(job_id)
+        job = await self.store.get_job(job_id)
         if not job:
             raise HTTPException(404, "Job not found")
 
@@ -129,7 +216,70 @@ class UWSService:
         except AttributeError:
             raise HTTPException(400, f"Job detail {value} not found")
 
-    def delete_job(self, job_id):
+    async def get_job_result(self, job_id: str, result_id: str) -> tuple[StoredResult, Optional[str]]:
+        """Find the stored file of one of a job's results.
+
+        Args:
+            job_id: The ID of the job.
+            result_id: The ID of the result, as listed in the job's results.
+
+        Returns:
+            The stored result, and its MIME type.
+        """
+
+        job = await self.store.get_job(job_id)
+        if not job:
+            raise HTTPException(404, "Job not found")
+
+        reference = next((result for result in job.results.result or [] if result.id == result_id), None)
+        if reference is None:
+            raise HTTPException(404, "Result not found")
+
+        stored = await run_in_threadpool(self.results.get, job_id, result_id)
+        if stored is None:
+            raise HTTPException(404, "Result not found")
+        return stored, reference.mime_type or stored.mime_type
+
+    def watch_jobs(self, owner_id: str = None, job_ids: list[str] = None) -> JobSubscription:
+        """Subscribe to the changes of many jobs at once.
+
+        Args:
+            owner_id: Only report jobs with this owner.
+            job_ids: Only report these jobs. Every job is reported if None.
+
+        Returns:
+            A subscription to enter on the event loop.
+        """
+        return self.store.events.subscription(owner_id, job_ids)
+
+    async def get_job_version(self, job_id: str) -> Optional[JobVersion]:
+        """Get the revision of a job, used to validate cached copies of it.
+
+        Args:
+            job_id: The ID of the job.
+
+        Returns:
+            The revision of the job, or None if the job does not exist or the store does not track revisions.
+        """
+        return await self.store.get_job_version(job_id)
+
+    async def get_queue_position(self, job_id: str) -> int:
+        """Get the number of jobs that will be started before a queued job.
+
+        Args:
+            job_id: The ID of the job.
+        """
+
+        job = await self.store.get_job(job_id)
+        if not job:
+            raise HTTPException(404, "Job not found")
+
+        position = await self.worker.queue_position(job)
+        if position is None:
+            raise HTTPException(404, "Job is not queued")
+        return position
+
+    async def delete_job(self, job_id):
         """Delete a job by its ID.
 
         Args:
@@ -139,14 +289,15 @@ class UWSService:
             KeyError: If no job with the given ID exists.
         """
 
-        job = self.store.get_job(job_id)
+        job = await self.store.get_job(job_id)
         if not job:
             raise HTTPException(404, "Job not found")
 
-        self.store.delete_job(job_id)
-        self.worker.cancel(job_id)
+        await self.store.delete_job(job_id)
+        await self.worker.cancel(job)
+        await self.worker.cleanup(job)
 
-    def create_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
+    async def create_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
         """Create a new job.
 
         Args:
@@ -156,10 +307,90 @@ class UWSService:
             The ID of the created job.
         """
 
-        job_id = self.store.add_job(parameters, owner_id, run_id)
+        job_id = await self.store.add_job(parameters, owner_id, run_id)
         return job_id
 
-    def post_update_job(
+    async def create_jobs(self, jobs: list[NewJob], run: bool = False) -> list[str]:
+        """Create many jobs at once.
+
+        Args:
+            jobs: The initial values of the jobs.
+            run: Whether to start the jobs straight away.
+
+        Returns:
+            The IDs of the created jobs, in the same order.
+        """
+
+        job_ids = await self.store.add_jobs(jobs)
+        if run:
+            for job in await self.store.get_jobs_by_id(job_ids):
+                await self.worker.run(job)
+        return job_ids
+
+    async def update_jobs_phase(self, job_ids: list[str], phase: PhaseAction) -> tuple[list[str], list[str]]:
+        """Update the phase of many jobs at once.
+
+        The jobs are read with one store call. Aborted jobs are saved with one atomic update once
+        they have all been cancelled, so progress recorded by the worker in the meantime is kept.
+
+        Args:
+            job_ids: The IDs of the jobs to update.
+            phase: The new phase of the jobs.
+
+        Returns:
+            The IDs of the jobs found, and the IDs of those that do not exist.
+        """
+
+        if phase not in (PhaseAction.RUN, PhaseAction.ABORT):
+            raise HTTPException(501, "Phase not supported.")
+
+        jobs, missing = await self._get_jobs_by_id(job_ids)
+
+        if phase == PhaseAction.RUN:
+            for job in jobs:
+                if job.phase in (ExecutionPhase.PENDING, ExecutionPhase.HELD):
+                    await self.worker.run(job)
+        else:
+            for job in jobs:
+                await self.worker.cancel(job)
+            found_ids = [job.job_id for job in jobs]
+            jobs = await self.store.update_jobs(found_ids, mark_aborted)
+            aborted = {job.job_id for job in jobs}
+            # deleted while the jobs were being cancelled
+            missing.extend(job_id for job_id in found_ids if job_id not in aborted)
+
+        return [job.job_id for job in jobs], missing
+
+    async def delete_jobs(self, job_ids: list[str]) -> tuple[list[str], list[str]]:
+        """Delete many jobs at once.
+
+        Args:
+            job_ids: The IDs of the jobs to delete.
+
+        Returns:
+            The IDs of the deleted jobs, and the IDs of those that do not exist.
+        """
+
+        job_ids = list(dict.fromkeys(job_ids))
+        jobs = await self.store.get_jobs_by_id(job_ids)
+        deleted = await self.store.delete_jobs(job_ids)
+
+        deleted_ids = set(deleted)
+        for job in jobs:
+            if job.job_id in deleted_ids:
+                await self.worker.cancel(job)
+                await self.worker.cleanup(job)
+
+        return deleted, [job_id for job_id in job_ids if job_id not in deleted_ids]
+
+    async def _get_jobs_by_id(self, job_ids: list[str]) -> tuple[list[JobSummary], list[str]]:
+        """Read many jobs with one store call, splitting out the IDs of those that do not exist."""
+        job_ids = list(dict.fromkeys(job_ids))
+        jobs = await self.store.get_jobs_by_id(job_ids)
+        found = {job.job_id for job in jobs}
+        return jobs, [job_id for job_id in job_ids if job_id not in found]
+
+    async def post_update_job(
         self,
         job_id: str,
         phase: PhaseAction = None,
@@ -175,25 +406,27 @@ class UWSService:
             action: The action to take on the job. Currently only "DELETE" is supported.
         """
 
-        job = self.store.get_job(job_id)
+        job = await self.store.get_job(job_id)
         if not job:
             raise HTTPException(404, "Job not found")
 
         if action:
             # If they delete the job, there's nothing else to update
-            self.delete_job(job_id)
+            await self.delete_job(job_id)
             return None
         if destruction:
             if destruction < datetime.now(timezone.utc):
                 raise HTTPException(400, "Destruction time must be in the future")
-            job.destruction_time = destruction
+            updated = await self.store.update_job(job_id, lambda job: setattr(job, "destruction_time", destruction))
+            if updated is None:
+                raise HTTPException(404, "Job not found")
         if phase:
             # Finally, update the phase - we can return right away
-            self.update_job_phase(job_id, phase)
+            await self.update_job_phase(job_id, phase)
 
-        return self.get_job_summary(job_id)
+        return await self.get_job_summary(job_id)
 
-    def update_job_phase(self, job_id: str, phase: PhaseAction):
+    async def update_job_phase(self, job_id: str, phase: PhaseAction):
         """Update the phase of a job.
 
         Args:
@@ -201,22 +434,21 @@ class UWSService:
             phase: The new phase of the job.
         """
 
-        job = self.store.get_job(job_id)
+        job = await self.store.get_job(job_id)
         if not job:
             raise HTTPException(404, "Job not found")
 
         if phase == PhaseAction.RUN:
             # Only run the job if PENDING or HELD
             if job.phase in (ExecutionPhase.PENDING, ExecutionPhase.HELD):
-                self.worker.run(job)
+                await self.worker.run(job)
         elif phase == PhaseAction.ABORT:
-            self.worker.cancel(job)
-            job.phase = ExecutionPhase.ABORTED
-            self.store.save_job(job)
+            await self.worker.cancel(job)
+            await self.store.update_job(job_id, mark_aborted)
         else:
             return HTTPException(501, "Phase not supported.")
 
-    def update_job_value(self, job_id: str, value: str, new_value):
+    async def update_job_value(self, job_id: str, value: str, new_value):
         """Update a value of a job.
 
         Args:
@@ -225,9 +457,7 @@ class UWSService:
             new_value: The new value of the job.
         """
 
-        job = self.store.get_job(job_id)
-        if not job:
+        # read and written under the store's lock, so concurrent updates to other values are kept
+        updated = await self.store.update_job(job_id, lambda job: setattr(job, value, new_value))
+        if updated is None:
             raise HTTPException(404, "Job not found")
-
-        setattr(job, value, new_value)
-        self.store.save_job(job)
@@ -1,11 +1,14 @@
 from importlib import import_module
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from fastapi_uws.stores import BaseUWSStore
-from fastapi_uws.workers import BaseUWSWorker
+if TYPE_CHECKING:
+    # the store and worker modules read their configuration from here, so only import them lazily
+    from fastapi_uws.results import BaseResultStore
+    from fastapi_uws.stores import AsyncBaseUWSStore, BaseUWSStore
+    from fastapi_uws.workers import AsyncBaseUWSWorker, BaseUWSWorker
 
 EXPIRY_DAY = 86400  # 1 day in seconds
 
@@ -20,6 +23,16 @@ class StoreSettings(BaseSettings):
     MAX_EXPIRY: int = Field(
         EXPIRY_DAY * 7, description="The maximum expiry time for jobs and results in the store in seconds."
     )
+    REAP_INTERVAL: int = Field(
+        60, description="How often to remove expired jobs from the store in seconds. 0 disables the reaper."
+    )
+    DATABASE: str = Field("uws.db", description="The database file used by the SQLite store.")
+    WATCH_INTERVAL: float = Field(
+        0.25, description="How often the shared SQLite store checks for changes from other processes in seconds."
+    )
+    ARCHIVE_EXPIRED: bool = Field(
+        False, description="Whether to archive expired jobs, keeping their metadata, instead of deleting them."
+    )
 
     model_config = SettingsConfigDict(
         description="The configuration for the UWS store.",
@@ -31,6 +44,11 @@ class WorkerSettings(BaseSettings):
     """Settings for the UWS worker."""
 
     CLASS: str = Field("fastapi_uws.workers.BaseUWSWorker", description="The class to use for the UWS worker.")
+    MAX_WORKERS: int = Field(4, description="The maximum number of jobs a pool-based worker runs at once.")
+    TARGET: Optional[str] = Field(None, description="The dotted path of the callable run by pool-based workers.")
+    MAX_CONCURRENT_JOBS: int = Field(
+        1000, description="The maximum number of jobs the asyncio worker runs at once on its event loop."
+    )
 
     model_config = SettingsConfigDict(
         description="The configuration for the UWS worker.",
@@ -38,11 +56,60 @@ class WorkerSettings(BaseSettings):
     )
 
 
+class SchedulerSettings(BaseSettings):
+    """Settings for the fair-share job scheduler."""
+
+    ENABLED: bool = Field(False, description="Whether to queue jobs in the fair-share scheduler before the worker.")
+    MAX_RUNNING: int = Field(4, description="The maximum number of jobs the scheduler lets run at once.")
+    OWNER_WEIGHTS: dict[str, float] = Field(
+        default_factory=dict, description="The scheduling weight of each owner, by owner ID. The default weight is 1."
+    )
+    PRIORITY_PARAMETER: str = Field("PRIORITY", description="The job parameter holding the job priority.")
+
+    model_config = SettingsConfigDict(
+        description="The configuration for the fair-share job scheduler.",
+        env_prefix="UWS_SCHEDULER_",
+    )
+
+
+class ResultSettings(BaseSettings):
+    """Settings for the storage of job results."""
+
+    CLASS: str = Field("fastapi_uws.results.LocalResultStore", description="The class to use for the result store.")
+    DIRECTORY: str = Field("uws_results", description="The directory holding results in the local result store.")
+    CHUNK_SIZE: int = Field(
+        64 * 1024, description="The size of the chunks in which result downloads are sent, in bytes."
+    )
+    MMAP: bool = Field(False, description="Whether to serve results from memory-mapped files.")
+    MMAP_CACHE_SIZE: int = Field(64, description="The largest number of result files kept memory-mapped.")
+
+    model_config = SettingsConfigDict(
+        description="The configuration for the result store.",
+        env_prefix="UWS_RESULTS_",
+    )
+
+
+class MetricsSettings(BaseSettings):
+    """Settings for operational metrics."""
+
+    ENABLED: bool = Field(
+        False, description="Whether to serve /metrics and record store, worker and request latencies."
+    )
+
+    model_config = SettingsConfigDict(
+        description="The configuration for operational metrics.",
+        env_prefix="UWS_METRICS_",
+    )
+
+
 class Settings(BaseSettings):
     """Settings for the application."""
 
     worker: Annotated[WorkerSettings, Field(default_factory=WorkerSettings)]
     store: Annotated[StoreSettings, Field(default_factory=StoreSettings)]
+    scheduler: Annotated[SchedulerSettings, Field(default_factory=SchedulerSettings)]
+    results: Annotated[ResultSettings, Field(default_factory=ResultSettings)]
+    metrics: Annotated[MetricsSettings, Field(default_factory=MetricsSettings)]
 
 
 def import_string(dotted_path: str):
@@ -60,24 +127,77 @@ def import_string(dotted_path: str):
 #      this should be refactored to use dependency injection, maybe?
 _store_instance = None
 _worker_instance = None
+_async_store_instance = None
+_async_worker_instance = None
+_result_store_instance = None
 
 
-def get_store_instance() -> BaseUWSStore:
+def get_store_instance() -> "BaseUWSStore | AsyncBaseUWSStore":
     """Get an instance of the configured UWS store."""
     global _store_instance
     if _store_instance is None:
         store_class = import_string(app_settings.store.CLASS)
         _store_instance = store_class()
+        if app_settings.metrics.ENABLED:
+            from fastapi_uws.metrics import InstrumentedStore
+            from fastapi_uws.stores import BaseUWSStore
+
+            # only synchronous stores are instrumented
+            if isinstance(_store_instance, BaseUWSStore):
+                _store_instance = InstrumentedStore(_store_instance)
     return _store_instance
 
 
-def get_worker_instance() -> BaseUWSWorker:
+def get_worker_instance() -> "BaseUWSWorker | AsyncBaseUWSWorker":
     """Get an instance of the configured UWS worker."""
     global _worker_instance
     if _worker_instance is None:
         worker_class = import_string(app_settings.worker.CLASS)
         _worker_instance = worker_class()
+        if app_settings.scheduler.ENABLED:
+            from fastapi_uws.scheduler import FairShareScheduler
+
+            _worker_instance = FairShareScheduler(_worker_instance)
+        if app_settings.metrics.ENABLED:
+            from fastapi_uws.metrics import InstrumentedWorker
+            from fastapi_uws.workers import BaseUWSWorker
+
+            # only synchronous workers are instrumented
+            if isinstance(_worker_instance, BaseUWSWorker):
+                _worker_instance = InstrumentedWorker(_worker_instance)
     return _worker_instance
 
 
+def get_async_store_instance() -> "AsyncBaseUWSStore":
+    """Get the configured UWS store, wrapping synchronous stores for use from the event loop."""
+    from fastapi_uws.stores import AsyncBaseUWSStore, AsyncStoreAdapter
+
+    global _async_store_instance
+    if _async_store_instance is None:
+        store = get_store_instance()
+        _async_store_instance = store if isinstance(store, AsyncBaseUWSStore) else AsyncStoreAdapter(store)
+    return _async_store_instance
+
+
+def get_async_worker_instance() -> "AsyncBaseUWSWorker":
+    """Get the configured UWS worker, wrapping synchronous workers for use from the event loop."""
+    from fastapi_uws.workers import AsyncBaseUWSWorker, AsyncWorkerAdapter
+
+    global _async_worker_instance
+    if _async_worker_instance is None:
+        worker = get_worker_instance()
+        _async_worker_instance = worker if isinstance(worker, AsyncBaseUWSWorker) else AsyncWorkerAdapter(worker)
+    return _async_worker_instance
+
+
+def get_result_store_instance() -> "BaseResultStore":
+    """Get an instance of the configured result store, which removes the results of deleted jobs."""
+    global _result_store_instance
+    if _result_store_instance is None:
+        result_store_class = import_string(app_settings.results.CLASS)
+        _result_store_instance = result_store_class()
+        get_store_instance().events.subscribe(_result_store_instance.on_job_event)
+    return _result_store_instance
+
+
 app_settings = Settings()
@@ -1,2 +1,3 @@
-from fastapi_uws.stores.base import BaseUWSStore
+from fastapi_uws.stores.base import AsyncBaseUWSStore, AsyncStoreAdapter, BaseUWSStore, NewJob
 from fastapi_uws.stores.mem_store import InMemoryStore
+from fastapi_uws.stores.sqlite_store import SharedSQLiteStore, SQLiteStore
@@ -1,10 +1,90 @@
 """Base class for storing UWS jobs / results."""
 
-from fastapi_uws.models import JobSummary, Parameter
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Callable, NamedTuple, Optional
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+
+from fastapi_uws.events import JobEventHub
+from fastapi_uws.models import JobSummary, Parameter, Parameters, Results
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.stores.index import IndexKey, index_key
+
+
+def archive_job(job: JobSummary) -> JobSummary:
+    """Move a job to the ARCHIVED phase, dropping its results but keeping its metadata.
+
+    Args:
+        job: The job to archive. It is modified in place.
+
+    Returns:
+        The archived job.
+    """
+    job.phase = ExecutionPhase.ARCHIVED
+    job.results = Results(result=[])
+    job.destruction_time = None
+    return job
+
+
+class JobVersion(NamedTuple):
+    """The revision of a stored job, advanced every time the job is saved."""
+
+    version: int
+    modified: datetime
+
+    @property
+    def etag(self) -> str:
+        """The job revision as a weak entity tag, shared by every representation of the job."""
+        return f'W/"{self.version}"'
+
+
+class NewJob(NamedTuple):
+    """The initial values of a job to be created."""
+
+    parameters: list[Parameter]
+    owner_id: Optional[str] = None
+    run_id: Optional[str] = None
+
+
+def new_job(parameters: list[Parameter], owner_id: str = None, run_id: str = None, expiry: int = 0) -> JobSummary:
+    """Build a new PENDING job with a fresh ID.
+
+    Args:
+        parameters: The service-specific parameters of the job.
+        owner_id: The owner of the job.
+        run_id: The client supplied identifier for the job.
+        expiry: The time until the job is destroyed, in seconds.
+
+    Returns:
+        The new job.
+    """
+    now = datetime.now(timezone.utc)
+    return JobSummary(
+        job_id=str(uuid4()),
+        owner_id=owner_id,
+        run_id=run_id,
+        phase=ExecutionPhase.PENDING,
+        creation_time=now,
+        destruction_time=now + timedelta(seconds=expiry),
+        parameters=Parameters(parameter=parameters),
+    )
 
 
 class BaseUWSStore:
-    """Base class for storing UWS jobs / results."""
+    """Base class for storing UWS jobs / results.
+
+    Implementations must publish a :class:`~fastapi_uws.events.JobEvent` on ``events`` whenever
+    a job is added, saved or deleted, so that clients waiting on a job are woken up.
+    """
+
+    blocking: bool = True
+    """Whether calls may block on I/O. Non-blocking stores are called directly from the event loop."""
+
+    def __init__(self):
+        self.events = JobEventHub()
 
     def get_job(self, job_id: str) -> JobSummary:
         """Get a job by its ID.
@@ -28,11 +108,87 @@ class BaseUWSStore:
         """
         raise NotImplementedError
 
-    def add_job(self, parameters: list[Parameter]) -> str:
+    def get_jobs_by_id(self, job_ids: list[str]) -> list[JobSummary]:
+        """Get many jobs by their IDs at once.
+
+        Stores should override this to read the jobs in a single query.
+
+        Args:
+            job_ids: The IDs of the jobs to get.
+
+        Returns:
+            The jobs that exist, in the order of their IDs.
+        """
+        jobs = (self.get_job(job_id) for job_id in job_ids)
+        return [job for job in jobs if job is not None]
+
+    def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ) -> list[JobSummary]:
+        """Get jobs matching the given filters, newest first.
+
+        Stores with an ordered index should override this so that the cost is proportional to
+        the number of jobs returned rather than the number of jobs stored.
+
+        Args:
+            phases: Only return jobs in one of these phases. Jobs in any phase are returned if None.
+            after: Only return jobs created at or after this time.
+            limit: Return at most this many jobs.
+            before: Only return jobs ordered before this ``(creation_time, job_id)`` key, to continue
+                from the last job of a previous page.
+
+        Returns:
+            The matching jobs, sorted by descending creation time.
+        """
+        jobs = self.get_jobs()
+        jobs.sort(key=index_key, reverse=True)
+        matches = (
+            job
+            for job in jobs
+            if (after is None or job.creation_time >= after)
+            and (before is None or index_key(job) < before)
+            and (phases is None or job.phase in phases)
+        )
+        return list(islice(matches, limit))
+
+    def get_job_version(self, job_id: str) -> Optional[JobVersion]:
+        """Get the revision of a job without loading the job itself.
+
+        Stores that do not track revisions return None, and their jobs are served without
+        validators.
+
+        Args:
+            job_id: The ID of the job.
+
+        Returns:
+            The revision of the job, or None if the job does not exist or is not versioned.
+        """
+        return None
+
+    def count_jobs(self) -> dict[ExecutionPhase, int]:
+        """Count the stored jobs in each phase.
+
+        Stores should override this to count without loading every job.
+
+        Returns:
+            The number of jobs in each phase. Phases without jobs may be left out.
+        """
+        return dict(Counter(ExecutionPhase(job.phase) for job in self.get_jobs()))
+
+    def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
         """Add a job.
 
         Args:
             parameters: The service-specific parameters with which to create the job.
+            owner_id: The owner of the job.
+            run_id: The client supplied identifier for the job.
+
+        Returns:
+            The ID of the new job.
         """
         raise NotImplementedError
 
@@ -44,6 +200,26 @@ class BaseUWSStore:
         """
         raise NotImplementedError
 
+    def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        """Modify a job and save it.
+
+        Stores should override this so that no other save of the job can land between reading and
+        saving it; this default is not atomic.
+
+        Args:
+            job_id: The ID of the job to update.
+            update: Called with the current job, which it modifies in place.
+
+        Returns:
+            The updated job, or None if the job does not exist.
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        update(job)
+        self.save_job(job)
+        return job
+
     def delete_job(self, job_id: str) -> None:
         """Delete a job by its ID.
 
@@ -51,3 +227,323 @@ class BaseUWSStore:
             job_id: The ID of the job to delete.
         """
         raise NotImplementedError
+
+    def add_jobs(self, jobs: list[NewJob]) -> list[str]:
+        """Add many jobs at once.
+
+        Stores should override this to add the jobs in a single transaction or lock acquisition.
+
+        Args:
+            jobs: The initial values of the jobs.
+
+        Returns:
+            The IDs of the new jobs, in the same order.
+        """
+        return [self.add_job(job.parameters, job.owner_id, job.run_id) for job in jobs]
+
+    def save_jobs(self, jobs: list[JobSummary]) -> None:
+        """Update many jobs at once.
+
+        Args:
+            jobs: The jobs to update.
+        """
+        for job in jobs:
+            self.save_job(job)
+
+    def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        """Modify many jobs and save them.
+
+        Stores should override this to update the jobs in a single transaction or lock acquisition;
+        this default updates each job with :meth:`update_job`.
+
+        Args:
+            job_ids: The IDs of the jobs to update.
+            update: Called with each current job, which it modifies in place.
+
+        Returns:
+            The updated jobs, leaving out those that do not exist.
+        """
+        jobs = (self.update_job(job_id, update) for job_id in job_ids)
+        return [job for job in jobs if job is not None]
+
+    def delete_jobs(self, job_ids: list[str]) -> list[str]:
+        """Delete many jobs at once.
+
+        Args:
+            job_ids: The IDs of the jobs to delete.
+
+        Returns:
+            The IDs of the jobs that existed and were deleted.
+        """
+        deleted = [job_id for job_id in job_ids if self.get_job(job_id) is not None]
+        for job_id in deleted:
+            self.delete_job(job_id)
+        return deleted
+
+    def expire_jobs(self, now: datetime = None, archive: bool = False) -> list[JobSummary]:
+        """Delete or archive every job past its destruction time.
+
+        Archived jobs keep their metadata, but lose their results and destruction time.
+
+        Args:
+            now: The time to compare destruction times against. Defaults to the current time.
+            archive: Whether to archive expired jobs instead of deleting them.
+
+        Returns:
+            The jobs that expired.
+        """
+        now = now or datetime.now(timezone.utc)
+        expired = [job for job in self.get_jobs() if job.destruction_time and job.destruction_time <= now]
+        for job in expired:
+            if archive:
+                self.save_job(archive_job(job))
+            else:
+                self.delete_job(job.job_id)
+        return expired
+
+
+class AsyncBaseUWSStore:
+    """Base class for UWS stores with a native asynchronous interface.
+
+    The methods mirror :class:`BaseUWSStore`, but are awaited directly on the event loop. Like the
+    synchronous stores, implementations must publish job changes on ``events``.
+    """
+
+    def __init__(self):
+        self.events = JobEventHub()
+
+    async def get_job(self, job_id: str) -> JobSummary:
+        """Get a job by its ID.
+
+        Args:
+            job_id: The ID of the job to get.
+
+        Returns:
+            The job with the given ID, or None if it does not exist.
+        """
+        raise NotImplementedError
+
+    async def get_jobs(self) -> list[JobSummary]:
+        """Get all jobs.
+
+        Returns:
+            A list of all jobs.
+        """
+        raise NotImplementedError
+
+    async def get_jobs_by_id(self, job_ids: list[str]) -> list[JobSummary]:
+        """Get many jobs by their IDs at once.
+
+        Args:
+            job_ids: The IDs of the jobs to get.
+
+        Returns:
+            The jobs that exist, in the order of their IDs.
+        """
+        raise NotImplementedError
+
+    async def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ) -> list[JobSummary]:
+        """Get jobs matching the given filters, newest first.
+
+        Args:
+            phases: Only return jobs in one of these phases. Jobs in any phase are returned if None.
+            after: Only return jobs created at or after this time.
+            limit: Return at most this many jobs.
+            before: Only return jobs ordered before this ``(creation_time, job_id)`` key, to continue
+                from the last job of a previous page.
+
+        Returns:
+            The matching jobs, sorted by descending creation time.
+        """
+        raise NotImplementedError
+
+    async def get_job_version(self, job_id: str) -> Optional[JobVersion]:
+        """Get the revision of a job without loading the job itself.
+
+        Args:
+            job_id: The ID of the job.
+
+        Returns:
+            The revision of the job, or None if the job does not exist or is not versioned.
+        """
+        return None
+
+    async def count_jobs(self) -> dict[ExecutionPhase, int]:
+        """Count the stored jobs in each phase.
+
+        Returns:
+            The number of jobs in each phase. Phases without jobs may be left out.
+        """
+        raise NotImplementedError
+
+    async def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
+        """Add a job.
+
+        Args:
+            parameters: The service-specific parameters with which to create the job.
+            owner_id: The owner of the job.
+            run_id: The client supplied identifier for the job.
+
+        Returns:
+            The ID of the new job.
+        """
+        raise NotImplementedError
+
+    async def save_job(self, job: JobSummary) -> None:
+        """Update a job.
+
+        Args:
+            job: The job to update.
+        """
+        raise NotImplementedError
+
+    async def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        """Modify a job and save it, with no other save of the job landing in between.
+
+        Args:
+            job_id: The ID of the job to update.
+            update: Called with the current job, which it modifies in place.
+
+        Returns:
+            The updated job, or None if the job does not exist.
+        """
+        raise NotImplementedError
+
+    async def delete_job(self, job_id: str) -> None:
+        """Delete a job by its ID.
+
+        Args:
+            job_id: The ID of the job to delete.
+        """
+        raise NotImplementedError
+
+    async def add_jobs(self, jobs: list[NewJob]) -> list[str]:
+        """Add many jobs at once.
+
+        Args:
+            jobs: The initial values of the jobs.
+
+        Returns:
+            The IDs of the new jobs, in the same order.
+        """
+        raise NotImplementedError
+
+    async def save_jobs(self, jobs: list[JobSummary]) -> None:
+        """Update many jobs at once.
+
+        Args:
+            jobs: The jobs to update.
+        """
+        raise NotImplementedError
+
+    async def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        """Modify many jobs and save them, with no other save of the jobs landing in between.
+
+        Args:
+            job_ids: The IDs of the jobs to update.
+            update: Called with each current job, which it modifies in place.
+
+        Returns:
+            The updated jobs, leaving out those that do not exist.
+        """
+        raise NotImplementedError
+
+    async def delete_jobs(self, job_ids: list[str]) -> list[str]:
+        """Delete many jobs at once.
+
+        Args:
+            job_ids: The IDs of the jobs to delete.
+
+        Returns:
+            The IDs of the jobs that existed and were deleted.
+        """
+        raise NotImplementedError
+
+    async def expire_jobs(self, now: datetime = None, archive: bool = False) -> list[JobSummary]:
+        """Delete or archive every job past its destruction time.
+
+        Args:
+            now: The time to compare destruction times against. Defaults to the current time.
+            archive: Whether to archive expired jobs instead of deleting them.
+
+        Returns:
+            The jobs that expired.
+        """
+        raise NotImplementedError
+
+
+class AsyncStoreAdapter(AsyncBaseUWSStore):
+    """Exposes a synchronous store through the asynchronous store interface.
+
+    Calls to blocking stores are run in the threadpool; non-blocking stores are called directly
+    on the event loop.
+
+    Args:
+        store: The synchronous store to wrap.
+    """
+
+    def __init__(self, store: BaseUWSStore):
+        self.store = store
+        self.events = store.events
+
+    async def _call(self, func, *args, **kwargs):
+        if self.store.blocking:
+            return await run_in_threadpool(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def get_job(self, job_id: str) -> JobSummary:
+        return await self._call(self.store.get_job, job_id)
+
+    async def get_jobs(self) -> list[JobSummary]:
+        return await self._call(self.store.get_jobs)
+
+    async def get_jobs_by_id(self, job_ids: list[str]) -> list[JobSummary]:
+        return await self._call(self.store.get_jobs_by_id, job_ids)
+
+    async def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ) -> list[JobSummary]:
+        return await self._call(self.store.query_jobs, phases, after, limit, before)
+
+    async def get_job_version(self, job_id: str) -> Optional[JobVersion]:
+        return await self._call(self.store.get_job_version, job_id)
+
+    async def count_jobs(self) -> dict[ExecutionPhase, int]:
+        return await self._call(self.store.count_jobs)
+
+    async def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None) -> str:
+        return await self._call(self.store.add_job, parameters, owner_id, run_id)
+
+    async def save_job(self, job: JobSummary) -> None:
+        return await self._call(self.store.save_job, job)
+
+    async def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        return await self._call(self.store.update_job, job_id, update)
+
+    async def delete_job(self, job_id: str) -> None:
+        return await self._call(self.store.delete_job, job_id)
+
+    async def add_jobs(self, jobs: list[NewJob]) -> list[str]:
+        return await self._call(self.store.add_jobs, jobs)
+
+    async def save_jobs(self, jobs: list[JobSummary]) -> None:
+        return await self._call(self.store.save_jobs, jobs)
+
+    async def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        return await self._call(self.store.update_jobs, job_ids, update)
+
+    async def delete_jobs(self, job_ids: list[str]) -> list[str]:
+        return await self._call(self.store.delete_jobs, job_ids)
+
+    async def expire_jobs(self, now: datetime = None, archive: bool = False) -> list[JobSummary]:
+        return await self._call(self.store.expire_jobs, now, archive)
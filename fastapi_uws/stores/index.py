@@ -0,0 +1,67 @@
+"""Secondary indexes used by the store implementations."""
+
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Iterator
+
+from fastapi_uws.models import JobSummary
+
+IndexKey = tuple[datetime, str]
+
+
+def index_key(job: JobSummary) -> IndexKey:
+    """The ordering key of a job: its creation time, with the job ID breaking ties."""
+    return (job.creation_time, job.job_id)
+
+
+class CreationTimeIndex:
+    """Job IDs kept sorted by creation time.
+
+    New jobs almost always have the latest creation time, so insertion is an append in practice.
+    Iteration re-locates its position with a binary search at every step, so the index can be
+    modified while it is being walked without skipping or repeating entries.
+    """
+
+    def __init__(self):
+        self._keys: list[IndexKey] = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: IndexKey):
+        """Add a key to the index."""
+        insort(self._keys, key)
+
+    def remove(self, key: IndexKey):
+        """Remove a key from the index, if present."""
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def clear(self):
+        """Remove every key from the index."""
+        self._keys.clear()
+
+    def newest_first(self, after: datetime = None, before: IndexKey = None) -> Iterator[IndexKey]:
+        """Iterate over the keys from the newest to the oldest job.
+
+        Args:
+            after: Stop at jobs created before this time.
+            before: Start with the newest key ordered before this one.
+        """
+        keys = self._keys
+        position = len(keys) if before is None else bisect_left(keys, before)
+        while True:
+            position -= 1
+            if position < 0:
+                return
+            try:
+                key = keys[position]
+            except IndexError:
+                # keys were removed concurrently past our position
+                return
+            if after is not None and key[0] < after:
+                return
+            yield key
+            # the index may have changed while the caller held the key, so find our place again
+            position = bisect_left(keys, key)
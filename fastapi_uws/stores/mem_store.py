@@ -1,72 +1,339 @@
 """Basic in-memory store implementation"""
 
+import threading
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timedelta, timezone
-from uuid import uuid4
+from heapq import heapify, heappop, heappush, merge
+from itertools import islice
+from typing import Callable, Iterable, Optional
 
-from fastapi_uws.models import JobSummary, Parameter, Parameters
+from fastapi_uws.events import JobEvent
+from fastapi_uws.models import JobSummary, Parameter
 from fastapi_uws.models.types import ExecutionPhase
 from fastapi_uws.settings import app_settings
-from fastapi_uws.stores.base import BaseUWSStore
+from fastapi_uws.stores.base import BaseUWSStore, JobVersion, NewJob, archive_job, new_job
+from fastapi_uws.stores.index import CreationTimeIndex, IndexKey, index_key
 
 
 class InMemoryStore(BaseUWSStore):
     """
     Basic in-memory store implementation
+
+    The store is safe to use from many threads. Each job is held as a private snapshot that is
+    replaced on save and never modified, so reads take no lock. :meth:`get_job` hands out a copy
+    for the caller to modify and save, while the jobs returned by :meth:`get_jobs` and
+    :meth:`query_jobs` are the snapshots themselves and must be treated as read-only.
+
+    Writes to one job are serialised by one of a fixed set of striped locks, so saves of different
+    jobs only contend on the short critical section updating the shared indexes. Use
+    :meth:`update_job` to modify a job without losing concurrent updates.
     """
 
+    blocking = False
+
+    LOCK_STRIPES = 64
+    """The number of locks job writes are spread over."""
+
     def __init__(self):
-        self.data = {}
+        super().__init__()
+        self.data: dict[str, JobSummary] = {}
+        self.creation_index = CreationTimeIndex()
+        self.phase_index = {phase: CreationTimeIndex() for phase in ExecutionPhase}
+        # the index key and phase each job was last indexed under
+        self.indexed = {}
+        # min-heap of (destruction time, job ID), with stale entries skipped when popped
+        self.expiry_heap = []
+        self.expiries = {}
+        self.versions: dict[str, JobVersion] = {}
         self.default_expiry = app_settings.store.DEFAULT_EXPIRY
         self.max_expiry = app_settings.store.MAX_EXPIRY
 
+        # re-entrant, as reading an expired job deletes it
+        self._stripes = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        # guards the indexes, the expiry heap and the revisions
+        self._index_lock = threading.Lock()
+
+    def _job_lock(self, job_id: str) -> threading.RLock:
+        return self._stripes[hash(job_id) % len(self._stripes)]
+
+    @contextmanager
+    def _job_locks(self, job_ids: Iterable[str]):
+        """Hold the locks of many jobs, taken in a fixed order so that bulk writers cannot deadlock."""
+        stripes = sorted({hash(job_id) % len(self._stripes) for job_id in job_ids})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._stripes[stripe])
+            yield
+
     def get_job(self, job_id):
-        """Get a job by its ID."""
-        current_time = datetime.now(timezone.utc)
+        """Get a copy of a job by its ID."""
+        job = self._snapshot(job_id)
+        return None if job is None else job.model_copy(deep=True)
 
-        job: JobSummary = self.data.get(job_id)
+    def _snapshot(self, job_id: str) -> Optional[JobSummary]:
+        """Get the stored snapshot of a job, deleting it if it has expired."""
+        job = self.data.get(job_id)
+        if job is None:
+            return None
 
         destruction = job.destruction_time
-        if destruction and destruction < current_time:
-            self.delete_job(job_id)
+        if destruction and destruction < datetime.now(timezone.utc):
+            self._delete(job_id, expected=job)
+            return None
 
-        return self.data.get(job_id)
+        return job
 
     def get_jobs(self):
-        """Get all jobs."""
+        """Get all jobs, as read-only snapshots."""
         all_jobs: list[JobSummary] = list(self.data.values())
         return all_jobs
 
+    def get_jobs_by_id(self, job_ids: list[str]):
+        """Get copies of many jobs by their IDs."""
+        jobs = (self._snapshot(job_id) for job_id in job_ids)
+        return [job.model_copy(deep=True) for job in jobs if job is not None]
+
+    def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ):
+        """Get jobs matching the given filters, newest first, by walking the creation time indexes.
+
+        When filtering by phase only the indexes for the requested phases are visited. The jobs
+        are read-only snapshots.
+        """
+        if phases is None:
+            keys = self.creation_index.newest_first(after, before)
+        else:
+            indexes = [self.phase_index[ExecutionPhase(phase)] for phase in set(phases)]
+            keys = merge(*(index.newest_first(after, before) for index in indexes), reverse=True)
+
+        matches = (
+            job
+            for job in (self.data.get(job_id) for _, job_id in keys)
+            # a job saved while the indexes are walked may be found under its old phase
+            if job is not None and (phases is None or job.phase in phases)
+        )
+        return list(islice(matches, limit))
+
+    def count_jobs(self):
+        """Count the jobs in each phase from the sizes of the phase indexes."""
+        return {phase: len(index) for phase, index in self.phase_index.items()}
+
+    def get_job_version(self, job_id):
+        """Get the revision of a job."""
+        if self._snapshot(job_id) is None:
+            return None
+        return self.versions.get(job_id)
+
+    def _touch(self, job_id: str):
+        """Advance the revision of a job."""
+        previous = self.versions.get(job_id)
+        self.versions[job_id] = JobVersion(previous.version + 1 if previous else 1, datetime.now(timezone.utc))
+
+    def _index_job(self, job: JobSummary):
+        """Move a job to its current position in the indexes."""
+        key = index_key(job)
+        phase = ExecutionPhase(job.phase)
+
+        previous = self.indexed.get(job.job_id)
+        if previous == (key, phase):
+            return
+        if previous is not None:
+            self._unindex_job(job.job_id)
+
+        self.creation_index.add(key)
+        self.phase_index[phase].add(key)
+        self.indexed[job.job_id] = (key, phase)
+
+    def _unindex_job(self, job_id: str):
+        """Remove a job from the indexes."""
+        key, phase = self.indexed.pop(job_id)
+        self.creation_index.remove(key)
+        self.phase_index[phase].remove(key)
+
+    def _schedule_expiry(self, job: JobSummary):
+        """Track a change to the destruction time of a job."""
+        destruction = job.destruction_time
+        if self.expiries.get(job.job_id) == destruction:
+            return
+
+        if destruction is None:
+            del self.expiries[job.job_id]
+        else:
+            self.expiries[job.job_id] = destruction
+            heappush(self.expiry_heap, (destruction, job.job_id))
+
+        # rebuild the heap once it is mostly stale entries
+        if len(self.expiry_heap) > 2 * len(self.expiries) + 64:
+            self.expiry_heap = [(destruction, job_id) for job_id, destruction in self.expiries.items()]
+            heapify(self.expiry_heap)
+
     def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None):
         """Add a job to the store"""
-        job_id = str(uuid4())
-
-        job = JobSummary(
-            job_id=job_id,
-            owner_id=owner_id,
-            run_id=run_id,
-            phase=ExecutionPhase.PENDING,
-            creation_time=datetime.now(timezone.utc),
-            destruction_time=datetime.now(timezone.utc) + timedelta(seconds=self.default_expiry),
-            parameters=Parameters(parameter=parameters),
-        )
+        job = new_job(parameters, owner_id, run_id, self.default_expiry)
+        with self._index_lock:
+            self._put(job)
+        self.events.publish(JobEvent.from_job(job))
+
+        return job.job_id
 
-        self.data[job_id] = job
+    def add_jobs(self, jobs: list[NewJob]):
+        """Add many jobs to the store, taking the index lock once."""
+        new_jobs = [new_job(*job, expiry=self.default_expiry) for job in jobs]
+        # the IDs are new, so no other thread can be writing these jobs
+        with self._index_lock:
+            for job in new_jobs:
+                self._put(job)
+        for job in new_jobs:
+            self.events.publish(JobEvent.from_job(job))
 
-        return job_id
+        return [job.job_id for job in new_jobs]
 
     def save_job(self, job: JobSummary):
-        """Update a job in the store."""
+        """Update a job in the store, replacing its snapshot with a copy of the given job."""
+        snapshot = self._prepare(job).model_copy(deep=True)
+        with self._job_lock(job.job_id), self._index_lock:
+            self._put(snapshot)
+        self.events.publish(JobEvent.from_job(snapshot))
 
-        creation_time = job.creation_time
-        destruction_time = job.destruction_time
+    def save_jobs(self, jobs: list[JobSummary]):
+        """Update many jobs in the store, taking the index lock once."""
+        snapshots = [self._prepare(job).model_copy(deep=True) for job in jobs]
+        with self._job_locks(job.job_id for job in snapshots), self._index_lock:
+            for snapshot in snapshots:
+                self._put(snapshot)
+        for snapshot in snapshots:
+            self.events.publish(JobEvent.from_job(snapshot))
+
+    def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        """Modify a job atomically, holding its lock between reading and saving it."""
+        with self._job_lock(job_id):
+            current = self._snapshot(job_id)
+            if current is None:
+                return None
+
+            snapshot = current.model_copy(deep=True)
+            update(snapshot)
+            self._prepare(snapshot)
+            with self._index_lock:
+                self._put(snapshot)
 
-        max_destruction_time = creation_time + timedelta(seconds=self.max_expiry)
+        self.events.publish(JobEvent.from_job(snapshot))
+        return snapshot.model_copy(deep=True)
 
-        job.destruction_time = min(destruction_time, max_destruction_time)
+    def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        """Modify many jobs atomically, holding all their locks and taking the index lock once."""
+        job_ids = list(dict.fromkeys(job_ids))
+        snapshots = []
+        with self._job_locks(job_ids):
+            for job_id in job_ids:
+                current = self._snapshot(job_id)
+                if current is not None:
+                    snapshot = current.model_copy(deep=True)
+                    update(snapshot)
+                    snapshots.append(self._prepare(snapshot))
+            with self._index_lock:
+                for snapshot in snapshots:
+                    self._put(snapshot)
 
+        for snapshot in snapshots:
+            self.events.publish(JobEvent.from_job(snapshot))
+        return [snapshot.model_copy(deep=True) for snapshot in snapshots]
+
+    def _prepare(self, job: JobSummary) -> JobSummary:
+        """Clamp the destruction time of a job being saved, and normalise its phase."""
+        destruction_time = job.destruction_time
+        if destruction_time is not None:
+            max_destruction_time = job.creation_time + timedelta(seconds=self.max_expiry)
+            job.destruction_time = min(destruction_time, max_destruction_time)
+
+        # callers may set the phase as a plain string; keep the stored job serialisable as its model
+        job.phase = ExecutionPhase(job.phase)
+        return job
+
+    def _put(self, job: JobSummary):
+        """Store a job snapshot and bring the indexes up to date. The caller holds the index lock."""
         self.data[job.job_id] = job
+        self._index_job(job)
+        self._schedule_expiry(job)
+        self._touch(job.job_id)
 
     def delete_job(self, job_id):
         """Delete a job from the store."""
-        if job_id in self.data:
-            del self.data[job_id]
+        self._delete(job_id)
+
+    def _delete(self, job_id: str, expected: JobSummary = None) -> Optional[JobSummary]:
+        """Delete a job, optionally only if its snapshot has not been replaced.
+
+        Returns:
+            The deleted snapshot, or None if nothing was deleted.
+        """
+        with self._job_lock(job_id):
+            job = self.data.get(job_id)
+            if job is None or (expected is not None and job is not expected):
+                return None
+            with self._index_lock:
+                del self.data[job_id]
+                self._unindex_job(job_id)
+                self.expiries.pop(job_id, None)
+                self.versions.pop(job_id, None)
+
+        self.events.publish(JobEvent(job_id=job_id, owner_id=job.owner_id, deleted=True))
+        return job
+
+    def delete_jobs(self, job_ids: list[str]):
+        """Delete many jobs from the store."""
+        return [job_id for job_id in job_ids if self._delete(job_id) is not None]
+
+    def expire_jobs(self, now: datetime = None, archive: bool = False):
+        """Delete or archive every job past its destruction time.
+
+        Jobs are popped from the expiry heap in order of destruction time, so each sweep only
+        touches the jobs that have expired.
+        """
+        now = now or datetime.now(timezone.utc)
+
+        due = []
+        with self._index_lock:
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                destruction, job_id = heappop(self.expiry_heap)
+                # skip jobs that have since been deleted or given a new destruction time
+                if self.expiries.get(job_id) == destruction:
+                    due.append(job_id)
+
+        expired = []
+        for job_id in due:
+            with self._job_lock(job_id):
+                job = self.data.get(job_id)
+                if job is None or job.destruction_time is None or job.destruction_time > now:
+                    # saved with a new destruction time since it was found
+                    continue
+
+                if archive:
+                    archived = archive_job(job.model_copy(deep=True))
+                    with self._index_lock:
+                        self._put(archived)
+                else:
+                    self._delete(job_id, expected=job)
+
+            if archive:
+                self.events.publish(JobEvent.from_job(archived))
+            expired.append(job)
+
+        return expired
+
+    def clear(self):
+        """Delete every job from the store, without notifying listeners."""
+        with self._index_lock:
+            self.data.clear()
+            self.indexed.clear()
+            self.expiry_heap.clear()
+            self.expiries.clear()
+            self.versions.clear()
+            self.creation_index.clear()
+            for index in self.phase_index.values():
+                index.clear()
@@ -0,0 +1,469 @@
+"""Persistent store implementation backed by SQLite"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from uuid import uuid4
+
+from fastapi_uws.events import JobEvent
+from fastapi_uws.models import JobSummary, Parameter
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.settings import app_settings
+from fastapi_uws.stores.base import BaseUWSStore, JobVersion, NewJob, archive_job, new_job
+from fastapi_uws.stores.index import IndexKey
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    owner_id TEXT,
+    phase TEXT NOT NULL,
+    creation_time INTEGER NOT NULL,
+    destruction_time INTEGER,
+    summary TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    modified INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_creation_time ON jobs (creation_time, job_id);
+CREATE INDEX IF NOT EXISTS jobs_phase ON jobs (phase, creation_time, job_id);
+CREATE INDEX IF NOT EXISTS jobs_owner_id ON jobs (owner_id, creation_time);
+CREATE INDEX IF NOT EXISTS jobs_destruction_time ON jobs (destruction_time) WHERE destruction_time IS NOT NULL;
+"""
+
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    phase TEXT,
+    owner_id TEXT,
+    deleted INTEGER NOT NULL,
+    changed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_changes_changed_at ON job_changes (changed_at);
+"""
+
+UPSERT_JOB = """
+INSERT INTO jobs (job_id, owner_id, phase, creation_time, destruction_time, summary, version, modified)
+VALUES (:job_id, :owner_id, :phase, :creation_time, :destruction_time, :summary, 1, :modified)
+ON CONFLICT (job_id) DO UPDATE SET
+    owner_id = excluded.owner_id,
+    phase = excluded.phase,
+    creation_time = excluded.creation_time,
+    destruction_time = excluded.destruction_time,
+    summary = excluded.summary,
+    version = jobs.version + 1,
+    modified = excluded.modified
+"""
+
+# columns added since the jobs table was introduced, with the statements adding them to older databases
+ADDED_COLUMNS = {
+    "version": "ALTER TABLE jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+    "modified": "ALTER TABLE jobs ADD COLUMN modified INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def to_timestamp(value: datetime) -> int:
+    """Convert a datetime to integer microseconds since the epoch, treating naive times as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_timestamp(value: int) -> datetime:
+    """Convert integer microseconds since the epoch back to a UTC datetime."""
+    return EPOCH + timedelta(microseconds=value)
+
+
+class SQLiteStore(BaseUWSStore):
+    """
+    Store implementation persisting jobs to an SQLite database.
+
+    Jobs are stored as JSON documents, with the fields used for filtering copied into indexed
+    columns so that job list queries are answered by the database. The database runs in WAL mode,
+    so readers never block the writer, and each thread gets its own connection.
+
+    Args:
+        path: The database file. Defaults to ``UWS_STORE_DATABASE``.
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or app_settings.store.DATABASE
+        self.default_expiry = app_settings.store.DEFAULT_EXPIRY
+        self.max_expiry = app_settings.store.MAX_EXPIRY
+        self._local = threading.local()
+
+        self.connection.executescript(SCHEMA)
+        self._add_columns()
+
+    def _add_columns(self):
+        """Bring a database created by an older version up to date."""
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        for column, statement in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.connection.execute(statement)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database connection for the current thread."""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            # autocommit mode, so that transactions are only opened by _transaction
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, events: list[JobEvent] = None):
+        """Run statements in a write transaction, taking the write lock up front.
+
+        Args:
+            events: Events describing the changes made in the transaction. They may be appended to
+                inside the block, and are published once the transaction commits.
+        """
+        events = [] if events is None else events
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            self._record_changes(conn, events)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        for event in events:
+            self.events.publish(event)
+
+    def _record_changes(self, conn: sqlite3.Connection, events: list[JobEvent]):
+        """Hook to persist the events of a transaction before it commits."""
+        pass
+
+    @staticmethod
+    def _row(job: JobSummary) -> dict:
+        return {
+            "job_id": job.job_id,
+            "owner_id": job.owner_id,
+            "phase": ExecutionPhase(job.phase).value,
+            "creation_time": to_timestamp(job.creation_time),
+            "destruction_time": to_timestamp(job.destruction_time) if job.destruction_time else None,
+            "summary": job.model_dump_json(),
+            "modified": to_timestamp(datetime.now(timezone.utc)),
+        }
+
+    def get_job(self, job_id):
+        """Get a job by its ID."""
+        row = self.connection.execute("SELECT summary FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = JobSummary.model_validate_json(row[0])
+
+        destruction = job.destruction_time
+        if destruction and destruction < datetime.now(timezone.utc):
+            self.delete_job(job_id)
+            return None
+
+        return job
+
+    def get_job_version(self, job_id):
+        """Get the revision of a job from its row, without decoding the job."""
+        row = self.connection.execute(
+            "SELECT version, modified, destruction_time FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        version, modified, destruction_time = row
+        if destruction_time is not None and destruction_time < to_timestamp(datetime.now(timezone.utc)):
+            return None
+        return JobVersion(version, from_timestamp(modified))
+
+    def get_jobs(self):
+        """Get all jobs."""
+        rows = self.connection.execute("SELECT summary FROM jobs")
+        return [JobSummary.model_validate_json(summary) for (summary,) in rows]
+
+    def get_jobs_by_id(self, job_ids: list[str]):
+        """Get many jobs by their IDs in one query."""
+        job_ids = list(dict.fromkeys(job_ids))
+        rows = self.connection.execute(
+            f"SELECT job_id, summary FROM jobs WHERE job_id IN ({', '.join('?' * len(job_ids))})", job_ids
+        )
+        found = {job_id: JobSummary.model_validate_json(summary) for job_id, summary in rows}
+
+        now = datetime.now(timezone.utc)
+        jobs = [found[job_id] for job_id in job_ids if job_id in found]
+        expired = [job.job_id for job in jobs if job.destruction_time and job.destruction_time < now]
+        if expired:
+            self.delete_jobs(expired)
+        return [job for job in jobs if job.job_id not in expired]
+
+    def query_jobs(
+        self,
+        phases: list[ExecutionPhase] = None,
+        after: datetime = None,
+        limit: int = None,
+        before: IndexKey = None,
+    ):
+        """Get jobs matching the given filters, newest first, with the filtering done by SQLite."""
+        conditions = []
+        params = []
+        if phases is not None:
+            phases = {ExecutionPhase(phase).value for phase in phases}
+            conditions.append(f"phase IN ({', '.join('?' * len(phases))})")
+            params.extend(sorted(phases))
+        if after is not None:
+            conditions.append("creation_time >= ?")
+            params.append(to_timestamp(after))
+        if before is not None:
+            conditions.append("(creation_time, job_id) < (?, ?)")
+            params.extend((to_timestamp(before[0]), before[1]))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(-1 if limit is None else limit)
+
+        rows = self.connection.execute(
+            f"SELECT summary FROM jobs {where} ORDER BY creation_time DESC, job_id DESC LIMIT ?", params
+        )
+        return [JobSummary.model_validate_json(summary) for (summary,) in rows]
+
+    def count_jobs(self):
+        """Count the jobs in each phase from the phase index."""
+        rows = self.connection.execute("SELECT phase, COUNT(*) FROM jobs GROUP BY phase")
+        return {ExecutionPhase(phase): count for phase, count in rows}
+
+    def add_job(self, parameters: list[Parameter], owner_id: str = None, run_id: str = None):
+        """Add a job to the store"""
+        job = new_job(parameters, owner_id, run_id, self.default_expiry)
+
+        with self._transaction([JobEvent.from_job(job)]) as conn:
+            conn.execute(UPSERT_JOB, self._row(job))
+
+        return job.job_id
+
+    def add_jobs(self, jobs: list[NewJob]):
+        """Add many jobs to the store in one transaction."""
+        new_jobs = [new_job(*job, expiry=self.default_expiry) for job in jobs]
+
+        with self._transaction([JobEvent.from_job(job) for job in new_jobs]) as conn:
+            conn.executemany(UPSERT_JOB, [self._row(job) for job in new_jobs])
+
+        return [job.job_id for job in new_jobs]
+
+    def _clamp_destruction(self, job: JobSummary):
+        if job.destruction_time is not None:
+            max_destruction_time = job.creation_time + timedelta(seconds=self.max_expiry)
+            job.destruction_time = min(job.destruction_time, max_destruction_time)
+
+    def save_job(self, job: JobSummary):
+        """Update a job in the store."""
+        self._clamp_destruction(job)
+
+        with self._transaction([JobEvent.from_job(job)]) as conn:
+            conn.execute(UPSERT_JOB, self._row(job))
+
+    def save_jobs(self, jobs: list[JobSummary]):
+        """Update many jobs in the store in one transaction."""
+        for job in jobs:
+            self._clamp_destruction(job)
+
+        with self._transaction([JobEvent.from_job(job) for job in jobs]) as conn:
+            conn.executemany(UPSERT_JOB, [self._row(job) for job in jobs])
+
+    def update_job(self, job_id: str, update: Callable[[JobSummary], None]) -> Optional[JobSummary]:
+        """Modify a job inside one write transaction, so that concurrent updates cannot be lost."""
+        events = []
+        with self._transaction(events) as conn:
+            row = conn.execute("SELECT summary FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+
+            job = JobSummary.model_validate_json(row[0])
+            if job.destruction_time and job.destruction_time < datetime.now(timezone.utc):
+                return None
+
+            update(job)
+            self._clamp_destruction(job)
+            conn.execute(UPSERT_JOB, self._row(job))
+            events.append(JobEvent.from_job(job))
+
+        return job
+
+    def update_jobs(self, job_ids: list[str], update: Callable[[JobSummary], None]) -> list[JobSummary]:
+        """Modify many jobs inside one write transaction."""
+        job_ids = list(dict.fromkeys(job_ids))
+        now = datetime.now(timezone.utc)
+
+        events = []
+        with self._transaction(events) as conn:
+            rows = conn.execute(
+                f"SELECT job_id, summary FROM jobs WHERE job_id IN ({', '.join('?' * len(job_ids))})", job_ids
+            )
+            found = {job_id: JobSummary.model_validate_json(summary) for job_id, summary in rows}
+
+            jobs = []
+            for job_id in job_ids:
+                job = found.get(job_id)
+                if job is None or (job.destruction_time and job.destruction_time < now):
+                    continue
+                update(job)
+                self._clamp_destruction(job)
+                jobs.append(job)
+
+            conn.executemany(UPSERT_JOB, [self._row(job) for job in jobs])
+            events.extend(JobEvent.from_job(job) for job in jobs)
+
+        return jobs
+
+    def delete_job(self, job_id):
+        """Delete a job from the store."""
+        events = []
+        with self._transaction(events) as conn:
+            row = conn.execute("SELECT owner_id FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                events.append(JobEvent(job_id=job_id, owner_id=row[0], deleted=True))
+
+    def delete_jobs(self, job_ids: list[str]):
+        """Delete many jobs from the store in one transaction."""
+        events = []
+        with self._transaction(events) as conn:
+            for job_id in job_ids:
+                row = conn.execute("SELECT owner_id FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                    events.append(JobEvent(job_id=job_id, owner_id=row[0], deleted=True))
+        return [event.job_id for event in events]
+
+    def expire_jobs(self, now: datetime = None, archive: bool = False):
+        """Delete or archive every job past its destruction time, found through the destruction time index."""
+        now = now or datetime.now(timezone.utc)
+
+        events = []
+        with self._transaction(events) as conn:
+            rows = conn.execute("SELECT summary FROM jobs WHERE destruction_time <= ?", (to_timestamp(now),)).fetchall()
+            expired = [JobSummary.model_validate_json(summary) for (summary,) in rows]
+
+            if archive:
+                conn.executemany(UPSERT_JOB, [self._row(archive_job(job)) for job in expired])
+                events.extend(JobEvent.from_job(job) for job in expired)
+            else:
+                conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job.job_id,) for job in expired])
+                events.extend(JobEvent(job_id=job.job_id, owner_id=job.owner_id, deleted=True) for job in expired)
+
+        return expired
+
+    def clear(self):
+        """Delete every job from the store, without notifying listeners."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs")
+
+
+class SharedSQLiteStore(SQLiteStore):
+    """
+    SQLite store shared by several processes on one host, such as ``uvicorn --workers N``.
+
+    Every process sees the same jobs through the database file. Each write also appends to a
+    change log table, which a background thread in every process follows so that clients waiting
+    on a job in one process are woken by changes made in another. The thread checks
+    ``PRAGMA data_version`` every ``watch_interval`` seconds, which costs no I/O while the
+    database is idle.
+
+    Args:
+        path: The database file. Defaults to ``UWS_STORE_DATABASE``.
+        watch_interval: How often to check for changes from other processes, in seconds.
+            Defaults to ``UWS_STORE_WATCH_INTERVAL``.
+        retention: How long change log entries are kept, in seconds.
+    """
+
+    def __init__(self, path: str = None, watch_interval: float = None, retention: int = 60):
+        # identifies this store's own entries in the change log, which it has already published
+        self.origin = uuid4().hex
+        super().__init__(path)
+        self.connection.executescript(CHANGES_SCHEMA)
+
+        self.watch_interval = app_settings.store.WATCH_INTERVAL if watch_interval is None else watch_interval
+        self.retention = retention
+        self._last_change = self.connection.execute("SELECT COALESCE(MAX(seq), 0) FROM job_changes").fetchone()[0]
+        self._last_prune = time.monotonic()
+
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="uws-store-watcher", daemon=True)
+        self._watcher.start()
+
+    def _record_changes(self, conn: sqlite3.Connection, events: list[JobEvent]):
+        changed_at = to_timestamp(datetime.now(timezone.utc))
+        conn.executemany(
+            "INSERT INTO job_changes (origin, job_id, phase, owner_id, deleted, changed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.origin,
+                    event.job_id,
+                    event.phase and event.phase.value,
+                    event.owner_id,
+                    event.deleted,
+                    changed_at,
+                )
+                for event in events
+            ],
+        )
+
+    def poll_changes(self) -> int:
+        """Publish the changes committed by other processes since the last poll.
+
+        Returns:
+            The number of events published.
+        """
+        conn = self.connection
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == getattr(self._local, "data_version", None):
+            return 0
+        self._local.data_version = data_version
+
+        rows = conn.execute(
+            "SELECT seq, origin, job_id, phase, owner_id, deleted FROM job_changes WHERE seq > ? ORDER BY seq",
+            (self._last_change,),
+        ).fetchall()
+
+        published = 0
+        for seq, origin, job_id, phase, owner_id, deleted in rows:
+            self._last_change = seq
+            if origin == self.origin:
+                continue
+            phase = ExecutionPhase(phase) if phase else None
+            self.events.publish(JobEvent(job_id=job_id, phase=phase, owner_id=owner_id, deleted=bool(deleted)))
+            published += 1
+
+        return published
+
+    def prune_changes(self):
+        """Drop change log entries older than the retention period."""
+        cutoff = to_timestamp(datetime.now(timezone.utc) - timedelta(seconds=self.retention))
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM job_changes WHERE changed_at < ?", (cutoff,))
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.poll_changes()
+                if time.monotonic() - self._last_prune > self.retention:
+                    self._last_prune = time.monotonic()
+                    self.prune_changes()
+            except sqlite3.Error:
+                logger.exception("Failed to read the job change log")
+
+    def close(self):
+        """Stop following changes from other processes."""
+        self._stop.set()
+        self._watcher.join()
@@ -1 +1,4 @@
-from fastapi_uws.workers.base import BaseUWSWorker
+from fastapi_uws.workers.base import AsyncBaseUWSWorker, AsyncWorkerAdapter, BaseUWSWorker
+from fastapi_uws.workers.thread_worker import ThreadPoolUWSWorker
+from fastapi_uws.workers.process_worker import ProcessPoolUWSWorker
+from fastapi_uws.workers.asyncio_worker import AsyncioUWSWorker
@@ -0,0 +1,159 @@
+"""UWS worker running job coroutines on an event loop."""
+
+import asyncio
+import threading
+from functools import partial
+from typing import Awaitable, Callable, Optional
+
+from fastapi_uws.models import ErrorSummary, JobSummary, Results
+from fastapi_uws.models.types import ErrorType, ExecutionPhase
+from fastapi_uws.settings import app_settings, get_store_instance, import_string
+from fastapi_uws.stores import BaseUWSStore
+from fastapi_uws.workers.base import BaseUWSWorker, mark_executing, mark_finished, mark_queued
+
+AsyncJobTarget = Callable[[JobSummary], Awaitable[Optional[Results]]]
+
+
+class AsyncioUWSWorker(BaseUWSWorker):
+    """Worker running I/O-bound jobs as tasks on an event loop.
+
+    Each job is a coroutine, so thousands of jobs waiting on the network cost a task each rather
+    than a thread. At most ``max_concurrency`` jobs execute at once; the rest stay QUEUED until a
+    slot is free. Cancelling a job cancels its task, and a job running past its execution
+    duration is cancelled and marked ABORTED.
+
+    By default the worker runs its own event loop in a daemon thread, so slow job code cannot
+    stall request handling. Pass the application's loop to run jobs there instead.
+
+    The work itself is done by :meth:`execute`, which subclasses override, or by the ``target``
+    coroutine function.
+
+    As :meth:`run` records the job as QUEUED, the worker blocks exactly when its store does, so
+    it is called from the event loop only for non-blocking stores.
+
+    Args:
+        target: Coroutine function called with the job, returning the job results.
+            Defaults to the callable at ``UWS_WORKER_TARGET``.
+        store: The store to record job progress in. Defaults to the configured store.
+        max_concurrency: The maximum number of jobs to run at once.
+            Defaults to ``UWS_WORKER_MAX_CONCURRENT_JOBS``.
+        loop: The event loop to run jobs on. Defaults to a dedicated loop.
+    """
+
+    def __init__(
+        self,
+        target: AsyncJobTarget = None,
+        store: BaseUWSStore = None,
+        max_concurrency: int = None,
+        loop: asyncio.AbstractEventLoop = None,
+    ):
+        if target is None and app_settings.worker.TARGET:
+            target = import_string(app_settings.worker.TARGET)
+        self.target = target
+        self.store = store or get_store_instance()
+        self.blocking = self.store.blocking
+        self.max_concurrency = max_concurrency or app_settings.worker.MAX_CONCURRENT_JOBS
+
+        self._thread = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="uws-asyncio-worker", daemon=True)
+            self._thread.start()
+        self.loop = loop
+
+        # only touched from the loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def execute(self, job: JobSummary) -> Optional[Results]:
+        """Do the work of a job.
+
+        Args:
+            job: The job to run.
+
+        Returns:
+            The results of the job.
+        """
+        if self.target is None:
+            raise NotImplementedError
+        return await self.target(job)
+
+    def run(self, job: JobSummary) -> None:
+        """Queue a job for execution."""
+        if self.store.update_job(job.job_id, mark_queued) is None:
+            # deleted since the caller read it
+            return
+        self.loop.call_soon_threadsafe(self._start, job.job_id)
+
+    def cancel(self, job: JobSummary) -> None:
+        """Cancel a queued or executing job.
+
+        The caller is responsible for moving the job to its new phase.
+        """
+        # scheduled after any pending start of the same job, so it always finds the task
+        self.loop.call_soon_threadsafe(self._cancel, job.job_id)
+
+    def shutdown(self, wait: bool = True):
+        """Cancel every job, and stop the worker's own event loop."""
+        future = asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop)
+        if wait:
+            future.result()
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if wait:
+                self._thread.join()
+
+    def _start(self, job_id: str):
+        task = self.loop.create_task(self._run_job(job_id), name=f"uws-job-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda done: self._forget(job_id, done))
+
+    def _forget(self, job_id: str, task: asyncio.Task):
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+
+    def _cancel(self, job_id: str):
+        task = self._tasks.pop(job_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _cancel_all(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _store_call(self, func, *args):
+        if self.store.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def _run_job(self, job_id: str):
+        async with self._semaphore:
+            job = await self._store_call(self.store.update_job, job_id, mark_executing)
+            if job is None:
+                return
+
+            # cancellation by the caller propagates as CancelledError, and is not recorded here
+            timeout = asyncio.timeout(job.execution_duration or None)
+            try:
+                async with timeout:
+                    results = await self.execute(job)
+            except Exception as exc:
+                if timeout.expired():
+                    error = ErrorSummary(message="Job exceeded its execution duration", type=ErrorType.TRANSIENT)
+                    await self._record_outcome(job_id, ExecutionPhase.ABORTED, error=error)
+                    return
+                error = ErrorSummary(message=str(exc) or type(exc).__name__, type=ErrorType.FATAL)
+                await self._record_outcome(job_id, ExecutionPhase.ERROR, error=error)
+            else:
+                await self._record_outcome(job_id, ExecutionPhase.COMPLETED, results=results)
+
+    async def _record_outcome(
+        self,
+        job_id: str,
+        phase: ExecutionPhase,
+        results: Optional[Results] = None,
+        error: Optional[ErrorSummary] = None,
+    ):
+        await self._store_call(self.store.update_job, job_id, partial(mark_finished, phase, results, error))
@@ -1,11 +1,43 @@
 """Base UWS worker class."""
 
-from fastapi_uws.models import JobSummary
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from fastapi_uws.models import ErrorSummary, JobSummary, Results
+from fastapi_uws.models.types import ExecutionPhase
+
+
+def mark_queued(job: JobSummary) -> None:
+    """Move a job to the QUEUED phase, for use with ``update_job``."""
+    job.phase = ExecutionPhase.QUEUED
+
+
+def mark_executing(job: JobSummary) -> None:
+    """Move a job to the EXECUTING phase, for use with ``update_job``."""
+    job.phase = ExecutionPhase.EXECUTING
+    job.start_time = datetime.now(timezone.utc)
+
+
+def mark_finished(
+    phase: ExecutionPhase, results: Optional[Results], error: Optional[ErrorSummary], job: JobSummary
+) -> None:
+    """Record the outcome of a job, for use with ``update_job`` through ``functools.partial``."""
+    job.phase = phase
+    job.end_time = datetime.now(timezone.utc)
+    if results is not None:
+        job.results = results
+    if error is not None:
+        job.error_summary = error
 
 
 class BaseUWSWorker:
     """Base UWS worker class."""
 
+    blocking: bool = True
+    """Whether calls may block. Non-blocking workers are called directly from the event loop."""
+
     def run(self, job: JobSummary) -> None:
         """Run the worker on the given job.
 
@@ -21,3 +53,92 @@ class BaseUWSWorker:
             job: The job to cancel the worker on.
         """
         pass
+
+    def cleanup(self, job: JobSummary) -> None:
+        """Remove anything the worker produced for a job that has been destroyed.
+
+        Args:
+            job: The job being destroyed.
+        """
+        pass
+
+    def queue_position(self, job: JobSummary) -> Optional[int]:
+        """Get the number of jobs that will be started before the given job.
+
+        Args:
+            job: The queued job.
+
+        Returns:
+            The position of the job in the queue, or None if the worker does not queue jobs.
+        """
+        return None
+
+
+class AsyncBaseUWSWorker:
+    """Base class for UWS workers with a native asynchronous interface."""
+
+    async def run(self, job: JobSummary) -> None:
+        """Run the worker on the given job.
+
+        Args:
+            job: The job to run the worker on.
+        """
+        pass
+
+    async def cancel(self, job: JobSummary) -> None:
+        """Cancel the worker on the given job.
+
+        Args:
+            job: The job to cancel the worker on.
+        """
+        pass
+
+    async def cleanup(self, job: JobSummary) -> None:
+        """Remove anything the worker produced for a job that has been destroyed.
+
+        Args:
+            job: The job being destroyed.
+        """
+        pass
+
+    async def queue_position(self, job: JobSummary) -> Optional[int]:
+        """Get the number of jobs that will be started before the given job.
+
+        Args:
+            job: The queued job.
+
+        Returns:
+            The position of the job in the queue, or None if the worker does not queue jobs.
+        """
+        return None
+
+
+class AsyncWorkerAdapter(AsyncBaseUWSWorker):
+    """Exposes a synchronous worker through the asynchronous worker interface.
+
+    Calls to blocking workers are run in the threadpool; non-blocking workers are called directly
+    on the event loop.
+
+    Args:
+        worker: The synchronous worker to wrap.
+    """
+
+    def __init__(self, worker: BaseUWSWorker):
+        self.worker = worker
+
+    async def _call(self, func, *args, **kwargs):
+        if self.worker.blocking:
+            return await run_in_threadpool(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def run(self, job: JobSummary) -> None:
+        return await self._call(self.worker.run, job)
+
+    async def cancel(self, job: JobSummary) -> None:
+        return await self._call(self.worker.cancel, job)
+
+    async def cleanup(self, job: JobSummary) -> None:
+        return await self._call(self.worker.cleanup, job)
+
+    async def queue_position(self, job: JobSummary) -> Optional[int]:
+        return await self._call(self.worker.queue_position, job)
@@ -0,0 +1,109 @@
+"""UWS worker running jobs in child processes."""
+
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Optional
+
+from fastapi_uws.models import JobSummary, Parameters, Results
+from fastapi_uws.stores import BaseUWSStore
+from fastapi_uws.workers.thread_worker import RunningJob, ThreadPoolUWSWorker
+
+ProcessTarget = Callable[[Parameters], Optional[Results]]
+
+
+def run_in_child(target: ProcessTarget, parameters: dict, conn: Connection):
+    """Entry point of a job process: run the target and send its outcome back to the parent."""
+    try:
+        results = target(Parameters.model_validate(parameters))
+        conn.send(("results", results.model_dump() if results is not None else None))
+    except BaseException as exc:
+        conn.send(("error", str(exc) or type(exc).__name__))
+    finally:
+        conn.close()
+
+
+class ProcessPoolUWSWorker(ThreadPoolUWSWorker):
+    """Worker running each job in its own child process, for CPU-bound jobs.
+
+    Jobs are scheduled exactly as for :class:`ThreadPoolUWSWorker`, with at most ``max_workers``
+    running at once, but each one is executed in a fresh process so that jobs run in parallel
+    regardless of the GIL. Only the job parameters are sent to the child, and only the results
+    are sent back. Cancelled jobs and jobs exceeding their execution duration are stopped by
+    terminating the child process.
+
+    The target must be picklable, i.e. a function defined at module level, as children are
+    started with the ``spawn`` method by default.
+
+    Args:
+        target: Called in the child process with the job parameters, returning the job results.
+            Defaults to the callable at ``UWS_WORKER_TARGET``.
+        store: The store to record job progress in. Defaults to the configured store.
+        max_workers: The maximum number of jobs to run at once. Defaults to ``UWS_WORKER_MAX_WORKERS``.
+        start_method: The multiprocessing start method for job processes.
+    """
+
+    def __init__(
+        self,
+        target: ProcessTarget = None,
+        store: BaseUWSStore = None,
+        max_workers: int = None,
+        start_method: str = "spawn",
+    ):
+        super().__init__(target, store, max_workers)
+        self.context = multiprocessing.get_context(start_method)
+        self._processes: dict[str, multiprocessing.Process] = {}
+        self._processes_lock = threading.Lock()
+
+    def execute(self, job: JobSummary, cancelled: threading.Event) -> Optional[Results]:
+        """Run the target on the job parameters in a child process, and wait for its results."""
+        if self.target is None:
+            raise NotImplementedError
+
+        receiver, sender = self.context.Pipe(duplex=False)
+        try:
+            process = self.context.Process(
+                target=run_in_child,
+                args=(self.target, job.parameters.model_dump(), sender),
+                name=f"uws-job-{job.job_id}",
+                daemon=True,
+            )
+
+            try:
+                with self._processes_lock:
+                    if cancelled.is_set():
+                        return None
+                    process.start()
+                    self._processes[job.job_id] = process
+            finally:
+                # the child has its own copy of the sending end
+                sender.close()
+
+            try:
+                # returns when the child sends its outcome, or when it exits without sending one
+                wait([receiver, process.sentinel])
+                outcome = receiver.recv() if receiver.poll() else None
+            except EOFError:
+                outcome = None
+            finally:
+                process.join()
+                with self._processes_lock:
+                    self._processes.pop(job.job_id, None)
+        finally:
+            receiver.close()
+
+        if outcome is None:
+            if cancelled.is_set():
+                return None
+            raise RuntimeError(f"Job process exited with code {process.exitcode}")
+
+        kind, value = outcome
+        if kind == "error":
+            raise RuntimeError(value)
+        return Results.model_validate(value) if value is not None else None
+
+    def _interrupt(self, running: RunningJob):
+        with self._processes_lock:
+            process = self._processes.get(running.job_id)
+        if process is not None and process.is_alive():
+            process.terminate()
@@ -0,0 +1,172 @@
+"""UWS worker running jobs in a thread pool."""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from fastapi_uws.models import ErrorSummary, JobSummary, Results
+from fastapi_uws.models.types import ErrorType, ExecutionPhase
+from fastapi_uws.settings import app_settings, get_store_instance, import_string
+from fastapi_uws.stores import BaseUWSStore
+from fastapi_uws.workers.base import BaseUWSWorker, mark_executing, mark_finished, mark_queued
+
+JobTarget = Callable[[JobSummary, threading.Event], Optional[Results]]
+
+
+class RunningJob:
+    """Book-keeping for a job submitted to a pool worker."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.cancelled = threading.Event()
+        self.future: Optional[Future] = None
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def finish(self) -> bool:
+        """Claim the right to record the outcome of the job.
+
+        Returns:
+            True for the first caller only, so that a job finishing, timing out and being
+            cancelled at the same time is only recorded once.
+        """
+        with self.lock:
+            if self.finished:
+                return False
+            self.finished = True
+            return True
+
+
+class ThreadPoolUWSWorker(BaseUWSWorker):
+    """Worker running jobs concurrently in a bounded thread pool.
+
+    :meth:`run` queues the job and returns immediately. The job is moved through
+    QUEUED, EXECUTING and finally COMPLETED or ERROR in the store, with its start and end times
+    recorded. Jobs still running after their execution duration are marked ABORTED and their
+    cancellation event is set; the job code should check the event and return early, as Python
+    threads cannot be killed.
+
+    As :meth:`run` records the job as QUEUED, the worker blocks exactly when its store does, so
+    it is called from the event loop only for non-blocking stores.
+
+    The work itself is done by :meth:`execute`, which subclasses override, or by the ``target``
+    callable.
+
+    Args:
+        target: Called with the job and its cancellation event, returning the job results.
+            Defaults to the callable at ``UWS_WORKER_TARGET``.
+        store: The store to record job progress in. Defaults to the configured store.
+        max_workers: The maximum number of jobs to run at once. Defaults to ``UWS_WORKER_MAX_WORKERS``.
+    """
+
+    def __init__(self, target: JobTarget = None, store: BaseUWSStore = None, max_workers: int = None):
+        if target is None and app_settings.worker.TARGET:
+            target = import_string(app_settings.worker.TARGET)
+        self.target = target
+        self.store = store or get_store_instance()
+        self.blocking = self.store.blocking
+        self.max_workers = max_workers or app_settings.worker.MAX_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="uws-worker")
+        self._lock = threading.Lock()
+        self._running: dict[str, RunningJob] = {}
+
+    def execute(self, job: JobSummary, cancelled: threading.Event) -> Optional[Results]:
+        """Do the work of a job.
+
+        Args:
+            job: The job to run.
+            cancelled: Set when the job is cancelled or runs out of time.
+
+        Returns:
+            The results of the job.
+        """
+        if self.target is None:
+            raise NotImplementedError
+        return self.target(job, cancelled)
+
+    def run(self, job: JobSummary) -> None:
+        """Queue a job for execution."""
+        running = RunningJob(job.job_id)
+        with self._lock:
+            self._running[job.job_id] = running
+
+        if self.store.update_job(job.job_id, mark_queued) is None:
+            # deleted since the caller read it
+            with self._lock:
+                if self._running.get(job.job_id) is running:
+                    del self._running[job.job_id]
+            return
+
+        running.future = self.executor.submit(self._run_job, running)
+
+    def cancel(self, job: JobSummary) -> None:
+        """Cancel a queued or executing job.
+
+        The caller is responsible for moving the job to its new phase.
+        """
+        with self._lock:
+            running = self._running.pop(job.job_id, None)
+        if running is None:
+            return
+
+        running.finish()
+        running.cancelled.set()
+        self._interrupt(running)
+        if running.future is not None:
+            running.future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs, and optionally wait for the running ones to finish."""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run_job(self, running: RunningJob):
+        timer = None
+        with running.lock:
+            if running.finished:
+                return
+            job = self.store.update_job(running.job_id, mark_executing)
+        if job is None:
+            return
+
+        if job.execution_duration:
+            timer = threading.Timer(job.execution_duration, self._time_out, (running,))
+            timer.daemon = True
+            timer.start()
+
+        try:
+            results = self.execute(job, running.cancelled)
+        except Exception as exc:
+            error = ErrorSummary(message=str(exc) or type(exc).__name__, type=ErrorType.FATAL)
+            self._record_outcome(running, ExecutionPhase.ERROR, error=error)
+        else:
+            self._record_outcome(running, ExecutionPhase.COMPLETED, results=results)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                if self._running.get(running.job_id) is running:
+                    del self._running[running.job_id]
+
+    def _interrupt(self, running: RunningJob):
+        """Hook to stop a job that has been cancelled or has run out of time."""
+        pass
+
+    def _time_out(self, running: RunningJob):
+        # record the outcome before interrupting, so it isn't taken for the job ending on its own
+        error = ErrorSummary(message="Job exceeded its execution duration", type=ErrorType.TRANSIENT)
+        self._record_outcome(running, ExecutionPhase.ABORTED, error=error)
+        running.cancelled.set()
+        self._interrupt(running)
+
+    def _record_outcome(
+        self,
+        running: RunningJob,
+        phase: ExecutionPhase,
+        results: Optional[Results] = None,
+        error: Optional[ErrorSummary] = None,
+    ):
+        if not running.finish():
+            return
+
+        self.store.update_job(running.job_id, partial(mark_finished, phase, results, error))
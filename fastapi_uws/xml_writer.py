@@ -0,0 +1,123 @@
+"""Incremental writers for the UWS XML representation.
+
+Each writer yields the document in small string chunks as it walks the model, so large job lists
+can be streamed to the client without building an element tree or the whole document in memory.
+"""
+
+from datetime import datetime
+from typing import Iterator, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from fastapi_uws.models import ErrorSummary, Jobs, JobSummary, Parameters, Results
+
+UWS_NAMESPACE = "http://www.ivoa.net/xml/UWS/v1.0"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACES = f'xmlns:uws="{UWS_NAMESPACE}" xmlns:xlink="{XLINK_NAMESPACE}" xmlns:xsi="{XSI_NAMESPACE}"'
+
+
+def _text(value) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    # enum members are written by value
+    return escape(str(getattr(value, "value", value)))
+
+
+def _element(name: str, value, nillable: bool = False) -> str:
+    """A simple element, written as nil or left out when it has no value."""
+    if value is None:
+        return f'<uws:{name} xsi:nil="true"/>' if nillable else ""
+    return f"<uws:{name}>{_text(value)}</uws:{name}>"
+
+
+def _root(name: str, version, standalone: bool) -> str:
+    attributes = f" {NAMESPACES}" if standalone else ""
+    if version is not None:
+        attributes += f" version={quoteattr(_text(version))}"
+    prefix = XML_DECLARATION if standalone else ""
+    return f"{prefix}<uws:{name}{attributes}>"
+
+
+def iter_jobs_xml(job_list: Jobs) -> Iterator[str]:
+    """Write a job list as a ``uws:jobs`` document."""
+    yield _root("jobs", job_list.version, standalone=True)
+    for job in job_list.jobref:
+        href = f" xlink:href={quoteattr(job.href)}" if job.href else ""
+        yield (
+            f"<uws:jobref id={quoteattr(job.job_id)}{href}>"
+            f"{_element('phase', job.phase)}"
+            f"{_element('runId', job.run_id)}"
+            f"{_element('ownerId', job.owner_id, nillable=True)}"
+            f"{_element('creationTime', job.creation_time)}"
+            "</uws:jobref>"
+        )
+    yield "</uws:jobs>"
+
+
+def iter_parameters_xml(parameters: Parameters, standalone: bool = True) -> Iterator[str]:
+    """Write job parameters as a ``uws:parameters`` element."""
+    yield _root("parameters", None, standalone)
+    for parameter in parameters.parameter:
+        attributes = f"id={quoteattr(parameter.id)}"
+        if parameter.by_reference:
+            attributes += ' byReference="true"'
+        if parameter.value is None:
+            yield f"<uws:parameter {attributes}/>"
+        else:
+            yield f"<uws:parameter {attributes}>{_text(parameter.value)}</uws:parameter>"
+    yield "</uws:parameters>"
+
+
+def iter_results_xml(results: Results, standalone: bool = True) -> Iterator[str]:
+    """Write job results as a ``uws:results`` element."""
+    yield _root("results", None, standalone)
+    for result in results.result or []:
+        attributes = f"id={quoteattr(result.id)}"
+        if result.href is not None:
+            attributes += f" xlink:href={quoteattr(result.href)}"
+        if result.size is not None:
+            attributes += f' size="{result.size}"'
+        if result.mime_type is not None:
+            attributes += f" mime-type={quoteattr(result.mime_type)}"
+        yield f"<uws:result {attributes}/>"
+    yield "</uws:results>"
+
+
+def _error_summary_xml(error: Optional[ErrorSummary]) -> str:
+    if error is None:
+        return ""
+    return (
+        f"<uws:errorSummary type={quoteattr(_text(error.type))} hasDetail={quoteattr(_text(error.has_detail))}>"
+        f"{_element('message', error.message or '')}"
+        "</uws:errorSummary>"
+    )
+
+
+def iter_job_xml(job: JobSummary) -> Iterator[str]:
+    """Write a job summary as a ``uws:job`` document."""
+    yield _root("job", job.version, standalone=True)
+    yield (
+        f"{_element('jobId', job.job_id)}"
+        f"{_element('runId', job.run_id)}"
+        f"{_element('ownerId', job.owner_id, nillable=True)}"
+        f"{_element('phase', job.phase)}"
+        f"{_element('quote', job.quote, nillable=True)}"
+        f"{_element('creationTime', job.creation_time)}"
+        f"{_element('startTime', job.start_time, nillable=True)}"
+        f"{_element('endTime', job.end_time, nillable=True)}"
+        f"{_element('executionDuration', job.execution_duration or 0)}"
+        f"{_element('destruction', job.destruction_time, nillable=True)}"
+    )
+    yield from iter_parameters_xml(job.parameters, standalone=False)
+    yield from iter_results_xml(job.results, standalone=False)
+    yield _error_summary_xml(job.error_summary)
+    if job.job_info:
+        yield "<uws:jobInfo>"
+        for info in job.job_info:
+            yield _text(info)
+        yield "</uws:jobInfo>"
+    yield "</uws:job>"
@@ -18,7 +18,7 @@ def app() -> FastAPI:
 def store():
     """Fixture to get a fresh store instance for each test."""
     test_store = get_store_instance()
-    test_store.data = {}
+    test_store.clear()
     return test_store
 
 
@@ -1,14 +1,45 @@
 """Tests for `fastapi_uws` package."""
 
+import asyncio
+import base64
+import json
 import os
+import threading
 import time
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, timezone
 
+import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
-from fastapi_uws.models import ErrorSummary, JobSummary, ResultReference, Results
-from fastapi_uws.stores import BaseUWSStore
-from fastapi_uws.workers import BaseUWSWorker
+from fastapi_uws.loadgen import ClientProfile, LoadReport, percentile, run_load
+from fastapi_uws.metrics import (
+    STORE_ERRORS,
+    STORE_SECONDS,
+    InstrumentedStore,
+    MetricsMiddleware,
+    MetricsRegistry,
+    metrics_router,
+)
+from fastapi_uws.models import ErrorSummary, Jobs, JobSummary, Parameter, ResultReference, Results, ShortJobDescription
+from fastapi_uws.models.types import ExecutionPhase, PhaseAction
+from fastapi_uws.reaper import ExpiryReaper
+from fastapi_uws.responses import EventSourceResponse, UWSJSONResponse, UWSXMLResponse
+from fastapi_uws.results import LocalResultStore, MappedResultCache
+from fastapi_uws.router.uws_router import uws_service
+from fastapi_uws.service import UWSService, mark_aborted
+from fastapi_uws.settings import app_settings
+from fastapi_uws.stores import (
+    AsyncStoreAdapter,
+    BaseUWSStore,
+    InMemoryStore,
+    NewJob,
+    SharedSQLiteStore,
+    SQLiteStore,
+)
+from fastapi_uws.workers import AsyncWorkerAdapter, BaseUWSWorker
+from fastapi_uws.xml_writer import UWS_NAMESPACE, XSI_NAMESPACE
 
 SIMPLE_PARAMETERS = [
     {"value": "SELECT * FROM TAP_SCHEMA.tables", "id": "QUERY", "by_reference": False},
@@ -454,6 +485,66 @@ class TestJobList:
         assert len(job_list["jobref"]) == 2
         assert_id_in_joblist([running_job2, running_job3], job_list)
 
+    def test_paged_job_list(self, client: TestClient, store: BaseUWSStore):
+        """Test walking the job list in pages with PAGESIZE and CURSOR"""
+
+        job_ids = [build_test_job(client) for _ in range(7)]
+
+        seen = []
+        params = {"PAGESIZE": 3}
+        url = "/uws"
+        while url:
+            resp = client.request("GET", url, params=params)
+            assert resp.status_code == 200
+
+            page = resp.json()
+            assert len(page["jobref"]) <= 3
+            seen.extend(job["jobId"] for job in page["jobref"])
+
+            url = resp.links.get("next", {}).get("url")
+            params = None
+
+        assert seen == job_ids[::-1]
+
+    def test_paged_job_list_last(self, client: TestClient, store: BaseUWSStore):
+        """Test LAST limits the total number of jobs across pages"""
+
+        job_ids = [build_test_job(client) for _ in range(7)]
+
+        resp = client.request("GET", "/uws", params={"PAGESIZE": 3, "LAST": 4})
+        assert resp.status_code == 200
+        first_page = [job["jobId"] for job in resp.json()["jobref"]]
+
+        resp = client.request("GET", resp.links["next"]["url"])
+        assert resp.status_code == 200
+        second_page = [job["jobId"] for job in resp.json()["jobref"]]
+
+        assert first_page + second_page == job_ids[:-5:-1]
+        assert "next" not in resp.links
+
+    def test_invalid_cursor(self, client: TestClient):
+        """Test a malformed cursor is rejected"""
+
+        resp = client.request("GET", "/uws", params={"CURSOR": "not-a-cursor"})
+        assert resp.status_code == 400
+
+    def test_tampered_cursor(self, client: TestClient):
+        """Test a well-formed cursor with values the job list cannot use is rejected"""
+
+        build_test_job(client)
+
+        payloads = [
+            # a creation time without a timezone
+            ["2024-01-01T00:00:00", "job", None],
+            # a remaining count that is not an integer, or is negative
+            ["2024-01-01T00:00:00+00:00", "job", "abc"],
+            ["2024-01-01T00:00:00+00:00", "job", -1],
+        ]
+        for payload in payloads:
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+            resp = client.request("GET", "/uws", params={"CURSOR": cursor, "PAGESIZE": 1})
+            assert resp.status_code == 400
+
 
 class TestUpdateJob:
     """Tests updating job properties"""
@@ -544,5 +635,1020 @@ class TestUpdateJob:
         pass
 
 
+class TestJobWait:
+    """Test blocking on job phase changes with WAIT"""
+
+    def test_wait_returns_on_phase_change(self, client: TestClient, store: BaseUWSStore):
+        """Test a waiting client is woken as soon as the phase changes"""
+
+        job_id = build_test_job(client)
+
+        def start_job():
+            job = store.get_job(job_id)
+            job.phase = "EXECUTING"
+            store.save_job(job)
+
+        timer = threading.Timer(0.5, start_job)
+        timer.start()
+
+        start = time.monotonic()
+        resp = client.request("GET", f"/uws/{job_id}", params={"WAIT": 10})
+        elapsed = time.monotonic() - start
+        timer.join()
+
+        assert resp.status_code == 200
+        assert resp.json()["phase"] == "EXECUTING"
+        assert elapsed < 5
+
+    def test_wait_times_out(self, client: TestClient):
+        """Test waiting on a job that never changes returns after WAIT seconds"""
+
+        job_id = build_test_job(client)
+
+        start = time.monotonic()
+        resp = client.request("GET", f"/uws/{job_id}", params={"WAIT": 1})
+        elapsed = time.monotonic() - start
+
+        assert resp.status_code == 200
+        assert resp.json()["phase"] == "PENDING"
+        assert elapsed >= 1
+
+    def test_wait_skipped_for_other_phase(self, client: TestClient):
+        """Test WAIT returns immediately if the job is not in the monitored phase"""
+
+        job_id = build_test_job(client)
+
+        start = time.monotonic()
+        resp = client.request("GET", f"/uws/{job_id}", params={"WAIT": 10, "PHASE": "EXECUTING"})
+        elapsed = time.monotonic() - start
+
+        assert resp.status_code == 200
+        assert elapsed < 5
+
+
+class TestInMemoryStore:
+    """Test the in-memory store directly"""
+
+    def test_query_jobs_newest_first(self, store: InMemoryStore):
+        """Test querying jobs walks the creation time index newest first"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_ids = [store.add_job(parameters) for _ in range(5)]
+
+        store.delete_job(job_ids[3])
+
+        jobs = store.query_jobs(limit=3)
+        assert [job.job_id for job in jobs] == [job_ids[4], job_ids[2], job_ids[1]]
+
+        jobs = store.query_jobs(after=store.get_job(job_ids[1]).creation_time)
+        assert [job.job_id for job in jobs] == [job_ids[4], job_ids[2], job_ids[1]]
+
+    def test_query_jobs_by_phase(self, store: InMemoryStore):
+        """Test querying by phase follows jobs as they move between phases"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_ids = [store.add_job(parameters) for _ in range(4)]
+
+        for job_id in job_ids[:3]:
+            job = store.get_job(job_id)
+            job.phase = ExecutionPhase.EXECUTING
+            store.save_job(job)
+
+        job = store.get_job(job_ids[0])
+        job.phase = ExecutionPhase.COMPLETED
+        store.save_job(job)
+
+        jobs = store.query_jobs(phases=[ExecutionPhase.EXECUTING])
+        assert [job.job_id for job in jobs] == [job_ids[2], job_ids[1]]
+
+        jobs = store.query_jobs(phases=[ExecutionPhase.PENDING, ExecutionPhase.COMPLETED])
+        assert [job.job_id for job in jobs] == [job_ids[3], job_ids[0]]
+
+        assert len(store.phase_index[ExecutionPhase.EXECUTING]) == 2
+
+    def test_expire_jobs(self, store: InMemoryStore):
+        """Test expired jobs are deleted or archived, leaving the rest alone"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        first_id, second_id, live_id = (store.add_job(parameters) for _ in range(3))
+
+        for job_id in (first_id, second_id):
+            job = store.get_job(job_id)
+            job.destruction_time = datetime.now(timezone.utc) + timedelta(seconds=1)
+            store.save_job(job)
+
+        now = datetime.now(timezone.utc) + timedelta(seconds=2)
+
+        expired = store.expire_jobs(now=now)
+        assert sorted(job.job_id for job in expired) == sorted([first_id, second_id])
+        assert store.get_job(first_id) is None
+        assert store.get_job(live_id) is not None
+
+        job = store.get_job(live_id)
+        job.destruction_time = datetime.now(timezone.utc) + timedelta(seconds=1)
+        store.save_job(job)
+
+        expired = store.expire_jobs(now=now, archive=True)
+        assert [job.job_id for job in expired] == [live_id]
+
+        archived_job = store.get_job(live_id)
+        assert archived_job.phase == ExecutionPhase.ARCHIVED
+        assert archived_job.destruction_time is None
+        assert store.expire_jobs(now=now) == []
+
+    def test_get_job_returns_copy(self, store: InMemoryStore):
+        """Test changes to a fetched job only reach the store when it is saved"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_id = store.add_job(parameters)
+
+        job = store.get_job(job_id)
+        job.phase = ExecutionPhase.EXECUTING
+        assert store.get_job(job_id).phase == ExecutionPhase.PENDING
+
+        store.save_job(job)
+        job.phase = ExecutionPhase.COMPLETED
+        assert store.get_job(job_id).phase == ExecutionPhase.EXECUTING
+        assert store.query_jobs(phases=[ExecutionPhase.COMPLETED]) == []
+
+    def test_concurrent_updates(self, store: InMemoryStore):
+        """Test updates to different values of a job from many threads are all kept"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_id = store.add_job(parameters)
+        other_ids = [store.add_job(parameters) for _ in range(8)]
+
+        def bump_duration():
+            for _ in range(200):
+                store.update_job(job_id, lambda job: setattr(job, "execution_duration", job.execution_duration + 1))
+
+        def append_info():
+            for i in range(200):
+                store.update_job(job_id, lambda job, i=i: setattr(job, "job_info", [*(job.job_info or []), str(i)]))
+
+        def save_others():
+            for _ in range(50):
+                for other_id in other_ids:
+                    job = store.get_job(other_id)
+                    job.phase = ExecutionPhase.QUEUED
+                    store.save_job(job)
+
+        threads = [threading.Thread(target=target) for target in (bump_duration, append_info, save_others) * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        job = store.get_job(job_id)
+        assert job.execution_duration == 400
+        assert sorted(job.job_info) == sorted([str(i) for i in range(200)] * 2)
+        assert store.get_job_version(job_id).version == 801
+        assert len(store.query_jobs(phases=[ExecutionPhase.QUEUED])) == len(other_ids)
+
+
+class TestSQLiteStore:
+    """Test the SQLite store directly"""
+
+    def test_job_round_trip(self, tmp_path):
+        """Test jobs survive being reopened from the database file"""
+
+        path = str(tmp_path / "uws.db")
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+
+        store = SQLiteStore(path)
+        job_id = store.add_job(parameters, "anonuser", "run1")
+
+        job = store.get_job(job_id)
+        job.phase = ExecutionPhase.COMPLETED
+        job.results = Results(result=[ResultReference(id="result1", href="/result1")])
+        store.save_job(job)
+
+        reopened_job = SQLiteStore(path).get_job(job_id)
+        assert reopened_job.owner_id == "anonuser"
+        assert reopened_job.run_id == "run1"
+        assert reopened_job.phase == ExecutionPhase.COMPLETED
+        assert reopened_job.results.result[0].href == "/result1"
+
+        store.delete_job(job_id)
+        assert store.get_job(job_id) is None
+
+    def test_query_jobs(self, tmp_path):
+        """Test job list filters are applied by the database"""
+
+        store = SQLiteStore(str(tmp_path / "uws.db"))
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_ids = [store.add_job(parameters) for _ in range(5)]
+
+        for job_id in job_ids[1:4]:
+            job = store.get_job(job_id)
+            job.phase = ExecutionPhase.EXECUTING
+            store.save_job(job)
+
+        jobs = store.query_jobs(phases=[ExecutionPhase.EXECUTING], limit=2)
+        assert [job.job_id for job in jobs] == [job_ids[3], job_ids[2]]
+
+        jobs = store.query_jobs(after=store.get_job(job_ids[2]).creation_time)
+        assert [job.job_id for job in jobs] == [job_ids[4], job_ids[3], job_ids[2]]
+
+        last_job = store.get_job(job_ids[2])
+        jobs = store.query_jobs(before=(last_job.creation_time, last_job.job_id))
+        assert [job.job_id for job in jobs] == [job_ids[1], job_ids[0]]
+
+    def test_expire_jobs(self, tmp_path):
+        """Test expired jobs are removed through the destruction time index"""
+
+        store = SQLiteStore(str(tmp_path / "uws.db"))
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        expired_id, live_id = (store.add_job(parameters) for _ in range(2))
+
+        job = store.get_job(expired_id)
+        job.destruction_time = datetime.now(timezone.utc) + timedelta(seconds=1)
+        store.save_job(job)
+
+        expired = store.expire_jobs(now=datetime.now(timezone.utc) + timedelta(seconds=2))
+        assert [job.job_id for job in expired] == [expired_id]
+        assert [job.job_id for job in store.get_jobs()] == [live_id]
+
+    def test_shared_store_notifications(self, tmp_path):
+        """Test changes made through one shared store are published by another on the same file"""
+
+        path = str(tmp_path / "uws.db")
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        writer = SharedSQLiteStore(path, watch_interval=3600)
+        reader = SharedSQLiteStore(path, watch_interval=3600)
+
+        try:
+            job_id = writer.add_job(parameters)
+            assert reader.poll_changes() == 1
+
+            received = []
+            reader.events.subscribe(received.append, job_id)
+
+            job = writer.get_job(job_id)
+            job.phase = ExecutionPhase.EXECUTING
+            writer.save_job(job)
+            writer.delete_job(job_id)
+
+            assert reader.poll_changes() == 2
+            assert received[0].phase == ExecutionPhase.EXECUTING
+            assert received[1].deleted
+
+            # changes are only published once, and a store never republishes its own changes
+            assert reader.poll_changes() == 0
+            assert writer.poll_changes() == 0
+        finally:
+            writer.close()
+            reader.close()
+
+
+class TestAsyncStore:
+    """Test the asynchronous store interface"""
+
+    def test_adapter_round_trip(self):
+        """Test a synchronous store can be used through the async adapter"""
+
+        async def round_trip():
+            async_store = AsyncStoreAdapter(InMemoryStore())
+            job_id = await async_store.add_job([Parameter(**param) for param in SIMPLE_PARAMETERS], "anonuser")
+
+            job = await async_store.get_job(job_id)
+            job.phase = "EXECUTING"
+            await async_store.save_job(job)
+
+            saved_job = await async_store.get_job(job_id)
+            await async_store.delete_job(job_id)
+
+            return saved_job, await async_store.get_job(job_id)
+
+        saved_job, deleted_job = asyncio.run(round_trip())
+
+        assert saved_job.owner_id == "anonuser"
+        assert saved_job.phase == "EXECUTING"
+        assert deleted_job is None
+
+
+class CleanupRecorder(BaseUWSWorker):
+    """Worker recording the jobs it is asked to clean up after"""
+
+    blocking = False
+
+    def __init__(self):
+        self.cleaned_up = []
+
+    def cleanup(self, job):
+        self.cleaned_up.append(job.job_id)
+
+
+class TestExpiryReaper:
+    """Test the background removal of expired jobs"""
+
+    @staticmethod
+    def expire(store: InMemoryStore, job_id: str):
+        job = store.get_job(job_id)
+        job.destruction_time = datetime.now(timezone.utc) - timedelta(seconds=1)
+        store.save_job(job)
+
+    def test_reap(self, store: InMemoryStore):
+        """Test a sweep deletes or archives expired jobs and has the worker clean up after them"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        expired_id, live_id = (store.add_job(parameters) for _ in range(2))
+        self.expire(store, expired_id)
+
+        worker = CleanupRecorder()
+        reaper = ExpiryReaper(AsyncStoreAdapter(store), AsyncWorkerAdapter(worker), interval=0, archive=False)
+
+        expired = asyncio.run(reaper.reap())
+        assert [job.job_id for job in expired] == [expired_id]
+        assert worker.cleaned_up == [expired_id]
+        assert expired_id not in store.data
+        assert store.get_job(live_id) is not None
+
+        reaper.archive = True
+        self.expire(store, live_id)
+
+        expired = asyncio.run(reaper.reap())
+        assert [job.job_id for job in expired] == [live_id]
+        assert worker.cleaned_up == [expired_id, live_id]
+        assert store.get_job(live_id).phase == ExecutionPhase.ARCHIVED
+
+    def test_start_stop(self, store: InMemoryStore):
+        """Test the reaper sweeps in the background until stopped"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_id = store.add_job(parameters)
+        self.expire(store, job_id)
+        worker = CleanupRecorder()
+
+        async def run_reaper():
+            disabled = ExpiryReaper(AsyncStoreAdapter(store), AsyncWorkerAdapter(worker), interval=0)
+            disabled.start()
+            assert disabled._task is None
+
+            reaper = ExpiryReaper(AsyncStoreAdapter(store), AsyncWorkerAdapter(worker), interval=0.01, archive=False)
+            reaper.start()
+            for _ in range(100):
+                if worker.cleaned_up:
+                    break
+                await asyncio.sleep(0.01)
+            await reaper.stop()
+            return reaper
+
+        reaper = asyncio.run(run_reaper())
+        assert reaper._task is None
+        assert worker.cleaned_up == [job_id]
+        assert job_id not in store.data
+
+
+class TestBatchRequests:
+    """Test creating and updating many jobs in one request"""
+
+    def test_create_jobs(self, client: TestClient):
+        """Test many jobs are created by one request, in order"""
+
+        jobs = [{"parameter": SIMPLE_PARAMETERS, "runId": f"run{i}"} for i in range(5)]
+        resp = client.request("POST", "/uws/batch", json={"jobs": jobs})
+
+        assert resp.status_code == 200
+        job_ids = resp.json()["jobIds"]
+        assert len(job_ids) == 5
+        for i, job_id in enumerate(job_ids):
+            job = client.request("GET", f"/uws/{job_id}").json()
+            assert job["runId"] == f"run{i}"
+            assert job["phase"] == "PENDING"
+
+    def test_abort_and_delete_jobs(self, client: TestClient):
+        """Test a list of jobs is aborted and then deleted, with unknown IDs reported"""
+
+        job_ids = [build_test_job(client) for _ in range(3)]
+
+        resp = client.request("POST", "/uws/batch/phase", json={"jobIds": job_ids + ["nonexistent"], "PHASE": "ABORT"})
+        assert resp.status_code == 200
+        assert resp.json() == {"jobIds": job_ids, "notFound": ["nonexistent"]}
+        for job_id in job_ids:
+            assert client.request("GET", f"/uws/{job_id}/phase").text == "ABORTED"
+
+        resp = client.request("POST", "/uws/batch/delete", json={"jobIds": job_ids[:2]})
+        assert resp.json() == {"jobIds": job_ids[:2], "notFound": []}
+        assert client.request("GET", f"/uws/{job_ids[0]}").status_code == 404
+        assert client.request("GET", f"/uws/{job_ids[2]}").status_code == 200
+
+    def test_abort_keeps_worker_progress(self, store: InMemoryStore):
+        """Test a job finishing while a batch is being aborted keeps what the worker recorded"""
+
+        class FinishingWorker(BaseUWSWorker):
+            blocking = False
+
+            def cancel(self, job):
+                store.update_job(job.job_id, lambda job: setattr(job, "end_time", datetime.now(timezone.utc)))
+
+        service = UWSService()
+        service.store = AsyncStoreAdapter(store)
+        service.worker = AsyncWorkerAdapter(FinishingWorker())
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_ids = [store.add_job(parameters) for _ in range(2)]
+
+        found, missing = asyncio.run(service.update_jobs_phase(job_ids, PhaseAction.ABORT))
+        assert (found, missing) == (job_ids, [])
+        for job_id in job_ids:
+            job = store.get_job(job_id)
+            assert job.phase == ExecutionPhase.ABORTED
+            assert job.end_time is not None
+
+    def test_batch_store_calls(self, store: InMemoryStore):
+        """Test a batch is read, aborted and deleted with one store call each"""
+
+        class IdleWorker(BaseUWSWorker):
+            blocking = False
+
+        service = UWSService()
+        service.store = AsyncStoreAdapter(InstrumentedStore(store))
+        service.worker = AsyncWorkerAdapter(IdleWorker())
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        job_ids = [store.add_job(parameters) for _ in range(3)]
+        STORE_SECONDS.clear()
+
+        found, missing = asyncio.run(service.update_jobs_phase([*job_ids, "nonexistent"], PhaseAction.ABORT))
+        assert (found, missing) == (job_ids, ["nonexistent"])
+        found, missing = asyncio.run(service.delete_jobs([*job_ids, "nonexistent"]))
+        assert (found, missing) == (job_ids, ["nonexistent"])
+
+        samples = {labels: value for suffix, labels, value in STORE_SECONDS.samples() if suffix == "_count"}
+        assert samples == {
+            (("operation", "get_jobs_by_id"),): 2,
+            (("operation", "update_jobs"),): 1,
+            (("operation", "delete_jobs"),): 1,
+        }
+
+    def test_store_bulk_methods(self, tmp_path):
+        """Test the bulk store methods of both stores"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        for store in (InMemoryStore(), SQLiteStore(str(tmp_path / "uws.db"))):
+            events = []
+            store.events.subscribe(events.append)
+
+            job_ids = store.add_jobs([NewJob(parameters, "anonuser", f"run{i}") for i in range(3)])
+            assert [store.get_job(job_id).run_id for job_id in job_ids] == ["run0", "run1", "run2"]
+
+            jobs = [store.get_job(job_id) for job_id in job_ids]
+            for job in jobs:
+                job.phase = ExecutionPhase.COMPLETED
+            store.save_jobs(jobs)
+            assert {store.get_job(job_id).phase for job_id in job_ids} == {ExecutionPhase.COMPLETED}
+
+            jobs = store.get_jobs_by_id([job_ids[2], "nonexistent", job_ids[0]])
+            assert [job.job_id for job in jobs] == [job_ids[2], job_ids[0]]
+
+            updated = store.update_jobs([job_ids[1], "nonexistent", job_ids[2]], mark_aborted)
+            assert [job.job_id for job in updated] == [job_ids[1], job_ids[2]]
+            assert [job.phase for job in store.get_jobs_by_id(job_ids)] == [
+                ExecutionPhase.COMPLETED,
+                ExecutionPhase.ABORTED,
+                ExecutionPhase.ABORTED,
+            ]
+
+            assert store.delete_jobs([job_ids[0], "nonexistent"]) == [job_ids[0]]
+            assert store.get_job(job_ids[0]) is None
+            assert store.get_jobs_by_id([]) == []
+            assert len(events) == 9
+
+
+class TestJobEventStream:
+    """Test streaming job changes as server-sent events"""
+
+    def test_stream_owner_events(self):
+        """Test the stream reports changes to the owner's jobs, and only those"""
+
+        store = InMemoryStore()
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+
+        async def read_stream():
+            response = EventSourceResponse(store.events.subscription(owner_id="anonuser"), keepalive=5)
+            stream = response.body_iterator
+            assert await anext(stream) == ": subscribed\n\n"
+
+            def change_jobs():
+                store.add_job(parameters, "otheruser")
+                job_id = store.add_job(parameters, "anonuser")
+                job = store.get_job(job_id)
+                job.phase = ExecutionPhase.QUEUED
+                store.save_job(job)
+                store.delete_job(job_id)
+                return job_id
+
+            # publish from another thread, as workers do
+            job_id = await asyncio.to_thread(change_jobs)
+            chunks = [await asyncio.wait_for(anext(stream), 5) for _ in range(3)]
+            await stream.aclose()
+            return job_id, chunks
+
+        job_id, chunks = asyncio.run(read_stream())
+
+        messages = []
+        for chunk in chunks:
+            lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            assert lines["event"] == "job"
+            messages.append(json.loads(lines["data"]))
+
+        assert [message["jobId"] for message in messages] == [job_id] * 3
+        assert [message["phase"] for message in messages[:2]] == ["PENDING", "QUEUED"]
+        assert messages[2]["deleted"] is True
+        # the subscription is dropped when the stream closes
+        assert not store.events._listeners
+
+    def test_stream_overflow(self):
+        """Test a client that falls behind is told how many events it missed"""
+
+        store = InMemoryStore()
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+
+        async def read_stream():
+            subscription = store.events.subscription(max_queued=2)
+            stream = EventSourceResponse(subscription, keepalive=5).body_iterator
+            await anext(stream)
+
+            await asyncio.to_thread(lambda: [store.add_job(parameters) for _ in range(5)])
+            # let the queued handoffs from the publishing thread run
+            await asyncio.sleep(0.1)
+            chunk = await asyncio.wait_for(anext(stream), 5)
+            await stream.aclose()
+            return chunk
+
+        chunk = asyncio.run(read_stream())
+
+        assert chunk.startswith('event: overflow\ndata: {"dropped":3}')
+
+
+class TestJobMonitor:
+    """Test monitoring and controlling jobs over a WebSocket"""
+
+    def test_subscribe_and_abort(self, client: TestClient):
+        """Test a subscribed job is reported, and can be aborted over the socket"""
+
+        job_id = build_test_job(client)
+
+        with client.websocket_connect("/uws/monitor") as websocket:
+            websocket.send_json({"action": "subscribe", "jobs": [job_id]})
+            assert websocket.receive_json() == {
+                "type": "job",
+                "jobId": job_id,
+                "phase": "PENDING",
+                "ownerId": None,
+                "deleted": False,
+            }
+            assert websocket.receive_json() == {"type": "ack", "action": "subscribe"}
+
+            websocket.send_json({"action": "phase", "jobId": job_id, "phase": "ABORT"})
+            # the acknowledgement and the change may arrive in either order
+            messages = []
+            while {"ack", "ABORTED"} - {message.get("phase", message["type"]) for message in messages}:
+                messages.append(websocket.receive_json())
+                assert len(messages) <= 10
+
+        assert {"type": "ack", "action": "phase"} in messages
+        assert client.request("GET", f"/uws/{job_id}/phase").text == "ABORTED"
+
+    def test_errors(self, client: TestClient):
+        """Test bad commands are answered with errors without closing the socket"""
+
+        with client.websocket_connect("/uws/monitor") as websocket:
+            websocket.send_text("not json")
+            assert websocket.receive_json() == {"type": "error", "message": "Malformed command"}
+
+            websocket.send_json({"action": "phase", "jobId": "nonexistent", "phase": "RUN"})
+            message = websocket.receive_json()
+            assert message["type"] == "error"
+            assert message["message"] == "Job not found"
+
+            websocket.send_json({"action": "subscribe", "jobs": ["nonexistent"]})
+            assert websocket.receive_json()["type"] == "error"
+            assert websocket.receive_json() == {"type": "ack", "action": "subscribe"}
+
+
+class TestConditionalRequests:
+    """Test validators and conditional reads of job resources"""
+
+    def test_not_modified(self, client: TestClient):
+        """Test a job read with a current ETag is answered with 304 and no body"""
+
+        job_id = build_test_job(client)
+
+        resp = client.request("GET", f"/uws/{job_id}")
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+        assert resp.headers["Last-Modified"]
+
+        for path in (f"/uws/{job_id}", f"/uws/{job_id}/phase", f"/uws/{job_id}/parameters"):
+            resp = client.request("GET", path, headers={"If-None-Match": etag})
+            assert resp.status_code == 304
+            assert resp.content == b""
+            assert resp.headers["ETag"] == etag
+
+    def test_modified_after_save(self, client: TestClient):
+        """Test saving a job changes its ETag, so stale copies are sent the new job"""
+
+        job_id = build_test_job(client)
+        etag = client.request("GET", f"/uws/{job_id}").headers["ETag"]
+
+        resp = client.request(
+            "POST",
+            f"/uws/{job_id}/executionduration",
+            json={"EXECUTIONDURATION": "100"},
+            follow_redirects=False,
+        )
+        assert resp.status_code == 303
+
+        resp = client.request("GET", f"/uws/{job_id}", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+        assert resp.json()["executionDuration"] == 100
+
+    def test_store_versions(self, tmp_path):
+        """Test both stores advance the job revision on every save"""
+
+        parameters = [Parameter(**param) for param in SIMPLE_PARAMETERS]
+        for store in (InMemoryStore(), SQLiteStore(str(tmp_path / "uws.db"))):
+            job_id = store.add_job(parameters)
+            first = store.get_job_version(job_id)
+
+            store.save_job(store.get_job(job_id))
+            second = store.get_job_version(job_id)
+
+            assert first.version == 1
+            assert second.version == 2
+            assert second.modified >= first.modified
+
+            store.delete_job(job_id)
+            assert store.get_job_version(job_id) is None
+
+
+class TestShortJobDescription:
+    """Test projecting jobs onto their short description"""
+
+    def test_projection_matches_validation(self):
+        """Test the unvalidated projection equals the validated short description"""
+
+        job = JobSummary(
+            job_id="job1",
+            run_id="run1",
+            owner_id="anonuser",
+            phase=ExecutionPhase.EXECUTING,
+            creation_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            parameters={"parameter": SIMPLE_PARAMETERS},
+            results=Results(result=[ResultReference(id="result1", href="/result1")]),
+        )
+
+        short = job.to_short_description()
+
+        assert short.model_dump(by_alias=True) == ShortJobDescription(**job.model_dump()).model_dump(by_alias=True)
+
+
+class TestJSONResponse:
+    """Test the fast JSON response class"""
+
+    def test_render_model_by_alias(self):
+        """Test models are rendered with their aliases, as the default serialisation would"""
+
+        job_list = Jobs(
+            jobref=[
+                ShortJobDescription(
+                    job_id="job1",
+                    owner_id="anonuser",
+                    phase=ExecutionPhase.PENDING,
+                    creation_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                )
+            ],
+            version="1.1",
+        )
+
+        response = UWSJSONResponse(job_list)
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == job_list.model_dump(mode="json", by_alias=True)
+        assert json.loads(response.body)["jobref"][0]["jobId"] == "job1"
+
+    def test_render_plain_content(self):
+        """Test content that is not a model is rendered as ordinary JSON"""
+
+        assert json.loads(UWSJSONResponse({"count": 3, "phases": ["PENDING"]}).body) == {
+            "count": 3,
+            "phases": ["PENDING"],
+        }
+        assert UWSJSONResponse(None).body == b"null"
+
+
+class TestXMLResponses:
+    """Test the UWS XML representation"""
+
+    NS = {"uws": UWS_NAMESPACE}
+
+    def test_job_list_xml(self, client: TestClient, store: BaseUWSStore):
+        """Test the job list is returned as uws:jobs when XML is requested"""
+
+        job_ids = [build_test_job(client, owner_id="anonuser") for _ in range(3)]
+
+        response = client.get("/uws/", headers={"Accept": "application/xml"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/xml")
+        root = ET.fromstring(response.content)
+        assert root.tag == f"{{{UWS_NAMESPACE}}}jobs"
+        jobrefs = root.findall("uws:jobref", self.NS)
+        assert sorted(jobref.get("id") for jobref in jobrefs) == sorted(job_ids)
+        assert jobrefs[0].find("uws:phase", self.NS).text == "PENDING"
+
+    def test_xml_chunks(self):
+        """Test the writer's small strings are sent in large chunks"""
+
+        async def encode():
+            return [chunk async for chunk in UWSXMLResponse._encode(iter(["<a/>"] * 40000 + [""]))]
+
+        chunks = asyncio.run(encode())
+        assert b"".join(chunks) == b"<a/>" * 40000
+        chunk_size = UWSXMLResponse.CHUNK_SIZE
+        assert [len(chunk) for chunk in chunks] == [chunk_size, chunk_size, 160000 - 2 * chunk_size]
+
+    def test_job_summary_xml(self, client: TestClient):
+        """Test the job summary is returned as uws:job when XML is requested"""
+
+        job_id = build_test_job(client)
+
+        response = client.get(f"/uws/{job_id}", headers={"Accept": "application/xml, application/json;q=0.5"})
+
+        assert response.status_code == 200
+        root = ET.fromstring(response.content)
+        assert root.find("uws:jobId", self.NS).text == job_id
+        assert root.find("uws:ownerId", self.NS).get(f"{{{XSI_NAMESPACE}}}nil") == "true"
+        parameters = root.findall("uws:parameters/uws:parameter", self.NS)
+        assert {parameter.get("id"): parameter.text for parameter in parameters} == {
+            "QUERY": "SELECT * FROM TAP_SCHEMA.tables",
+            "LANG": "ADQL",
+        }
+
+    def test_json_preferred(self, client: TestClient):
+        """Test JSON is still returned when the client prefers it or does not ask for XML"""
+
+        job_id = build_test_job(client)
+
+        for accept in ("application/json, application/xml;q=0.9", "*/*"):
+            response = client.get(f"/uws/{job_id}/parameters", headers={"Accept": accept})
+            assert response.headers["content-type"].startswith("application/json")
+            assert response.json()["parameter"][0]["id"] == "QUERY"
+
+
+class TestResultDownloads:
+    """Test storing job results and downloading them"""
+
+    CONTENT = bytes(range(256)) * 4
+
+    @pytest.fixture
+    def result_store(self, tmp_path, monkeypatch, store: BaseUWSStore):
+        result_store = LocalResultStore(str(tmp_path))
+        monkeypatch.setattr(uws_service, "results", result_store)
+        unsubscribe = store.events.subscribe(result_store.on_job_event)
+        yield result_store
+        unsubscribe()
+
+    def add_result(self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore) -> str:
+        job_id = build_test_job(client)
+        job = store.get_job(job_id)
+        job.results = Results(result=[result_store.put(job_id, "image.png", self.CONTENT)])
+        job.phase = ExecutionPhase.COMPLETED
+        store.save_job(job)
+        return job_id
+
+    def test_download_result(self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore):
+        """Test a stored result is listed with its size, type and URL, and can be downloaded"""
+
+        job_id = self.add_result(client, store, result_store)
+
+        result = client.get(f"/uws/{job_id}/results").json()["result"][0]
+        assert result["size"] == len(self.CONTENT)
+        assert result["mimeType"] == "image/png"
+        assert result["href"].endswith(f"/uws/{job_id}/results/image.png")
+
+        response = client.get(result["href"])
+        assert response.status_code == 200
+        assert response.content == self.CONTENT
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["accept-ranges"] == "bytes"
+
+    def test_download_range(self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore):
+        """Test byte ranges of a result are served as partial content"""
+
+        job_id = self.add_result(client, store, result_store)
+        url = f"/uws/{job_id}/results/image.png"
+        size = len(self.CONTENT)
+
+        response = client.get(url, headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.content == self.CONTENT[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{size}"
+
+        response = client.get(url, headers={"Range": "bytes=-5"})
+        assert response.status_code == 206
+        assert response.content == self.CONTENT[-5:]
+
+        response = client.get(url, headers={"Range": f"bytes={size - 3}-{size + 100}"})
+        assert response.content == self.CONTENT[-3:]
+
+        response = client.get(url, headers={"Range": f"bytes={size}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{size}"
+
+        # a range for a different version of the file gets the whole file
+        response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == self.CONTENT
+
+    def test_missing_result(self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore):
+        """Test results that are not listed or not stored are not found"""
+
+        job_id = self.add_result(client, store, result_store)
+
+        assert client.get(f"/uws/{job_id}/results/other.png").status_code == 404
+        assert result_store.get(job_id, "..") is None
+
+        job = store.get_job(job_id)
+        job.results = Results(result=[ResultReference(id="other.png")])
+        store.save_job(job)
+        assert client.get(f"/uws/{job_id}/results/other.png").status_code == 404
+
+    def test_mapped_download(
+        self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore, monkeypatch
+    ):
+        """Test results are served from shared memory mappings, closed on eviction or job deletion"""
+
+        mapped_results = MappedResultCache(max_size=1)
+        monkeypatch.setattr(uws_service, "mapped_results", mapped_results)
+        monkeypatch.setattr(app_settings.results, "CHUNK_SIZE", 100)
+        unsubscribe = store.events.subscribe(mapped_results.on_job_event)
+        try:
+            job_id = self.add_result(client, store, result_store)
+            url = f"/uws/{job_id}/results/image.png"
+
+            assert client.get(url).content == self.CONTENT
+            response = client.get(url, headers={"Range": "bytes=150-449"})
+            assert response.status_code == 206
+            assert response.content == self.CONTENT[150:450]
+            response = client.get(url, headers={"Range": f"bytes={len(self.CONTENT)}-"})
+            assert response.status_code == 416
+            assert response.headers["content-range"] == f"bytes */{len(self.CONTENT)}"
+
+            mapped = mapped_results.acquire(job_id, "image.png", result_store.get(job_id, "image.png"))
+            # both downloads shared this mapping and handed it back
+            assert mapped.users == 1
+            mapped.release()
+
+            other_id = self.add_result(client, store, result_store)
+            assert client.get(f"/uws/{other_id}/results/image.png").content == self.CONTENT
+            assert mapped.mapping.closed
+
+            store.delete_job(other_id)
+            assert len(mapped_results) == 0
+        finally:
+            unsubscribe()
+
+    def test_results_deleted_with_job(self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore):
+        """Test the results of a job are removed when the job is deleted"""
+
+        job_id = self.add_result(client, store, result_store)
+        assert result_store.get(job_id, "image.png") is not None
+
+        store.delete_job(job_id)
+        result_store.flush()
+        assert result_store.get(job_id, "image.png") is None
+
+    def test_results_deleted_in_background(
+        self, client: TestClient, store: BaseUWSStore, result_store: LocalResultStore, monkeypatch
+    ):
+        """Test results are not deleted in the thread publishing the job event"""
+
+        delete = result_store.delete
+        threads = []
+
+        def record_delete(job_id: str):
+            threads.append(threading.current_thread())
+            delete(job_id)
+
+        monkeypatch.setattr(result_store, "delete", record_delete)
+
+        job_id = self.add_result(client, store, result_store)
+        store.delete_job(job_id)
+        result_store.flush()
+
+        assert len(threads) == 1
+        assert threads[0] is not threading.current_thread()
+        assert result_store.get(job_id, "image.png") is None
+
+
+class TestMetrics:
+    """Test the metrics endpoint and instrumentation"""
+
+    def test_render_registry(self):
+        """Test metrics are rendered in the Prometheus text format"""
+
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests.", ["route"])
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.25, 1.0))
+
+        requests.inc(route='/a"b')
+        requests.inc(2, route='/a"b')
+        for value in (0.125, 0.25, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        assert "# TYPE requests_total counter" in lines
+        assert 'requests_total{route="/a\\"b"} 3.0' in lines
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{le="0.25"} 2.0' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3.0' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4.0' in lines
+        assert "latency_seconds_sum 3.875" in lines
+        assert "latency_seconds_count 4.0" in lines
+
+    def test_instrumented_store(self, store: BaseUWSStore):
+        """Test store operations are timed and failures counted, without changing their results"""
+
+        instrumented = InstrumentedStore(store)
+        STORE_SECONDS.clear()
+        STORE_ERRORS.clear()
+
+        job_id = instrumented.add_job([Parameter(**param) for param in SIMPLE_PARAMETERS])
+        assert instrumented.get_job(job_id).job_id == job_id
+        assert instrumented.count_jobs()[ExecutionPhase.PENDING] == 1
+        with pytest.raises(AttributeError):
+            instrumented.save_job(None)
+
+        samples = {(suffix, labels): value for suffix, labels, value in STORE_SECONDS.samples()}
+        assert samples[("_count", (("operation", "add_job"),))] == 1
+        assert samples[("_count", (("operation", "get_job"),))] == 1
+        assert [value for _, _, value in STORE_ERRORS.samples()] == [1]
+
+    def test_metrics_endpoint(self, app: FastAPI, store: BaseUWSStore):
+        """Test the endpoint reports job counts and request latency by route"""
+
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+        client = TestClient(app)
+
+        job_id = build_test_job(client)
+        client.get(f"/uws/{job_id}/phase")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        lines = response.text.splitlines()
+        assert 'uws_jobs{phase="PENDING"} 1.0' in lines
+        assert 'uws_jobs{phase="COMPLETED"} 0.0' in lines
+        assert any(
+            line.startswith('uws_http_requests_total{method="GET",route="/uws/{job_id}/phase",status="200"}')
+            for line in lines
+        )
+        assert job_id not in response.text
+
+
+class TestLoadGenerator:
+    """Test the load generator"""
+
+    def test_report(self):
+        """Test latency percentiles and throughput are reported per endpoint"""
+
+        assert percentile([1, 2, 3, 4], 0.5) == 2
+        assert percentile([1, 2, 3, 4], 0.99) == 4
+
+        report = LoadReport(duration=2)
+        for latency in range(1, 101):
+            report.record("GET /uws/", latency / 1000)
+        report.record("GET /uws/", 0.5, error=True)
+
+        summary = report.as_dict()["endpoints"]["GET /uws/"]
+        assert summary["requests"] == 101
+        assert summary["errors"] == 1
+        assert summary["throughput"] == 50.5
+        assert summary["p50"] == pytest.approx(51)
+        assert summary["p99"] == pytest.approx(100)
+        assert "GET /uws/" in report.render()
+
+    def test_in_process_run(self, store: BaseUWSStore):
+        """Test a short run against the application in this process"""
+
+        profiles = [
+            ClientProfile("submitter", 1, 0.01),
+            ClientProfile("poller", 1, 0.01),
+            ClientProfile("viewer", 1, 0.01),
+        ]
+        report = asyncio.run(run_load(profiles, duration=0.5, wait=1))
+
+        assert report.endpoints["POST /uws/"].latencies
+        assert report.endpoints["GET /uws/?LAST"].latencies
+        assert all(stats.errors == 0 for stats in report.endpoints.values())
+        # a submission cut off by the end of the run is not recorded
+        assert store.count_jobs()[ExecutionPhase.PENDING] >= len(report.endpoints["POST /uws/"].latencies)
+
+
 class Test404Responses:
     """Test accessing non-existent resources"""
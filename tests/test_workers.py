@@ -0,0 +1,465 @@
+"""Tests for the bundled UWS workers."""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from fastapi_uws.models import JobSummary, Parameter, Parameters, ResultReference, Results
+from fastapi_uws.models.types import ExecutionPhase
+from fastapi_uws.scheduler import FairShareScheduler
+from fastapi_uws.stores import InMemoryStore, SQLiteStore
+from fastapi_uws.workers import AsyncioUWSWorker, BaseUWSWorker, ProcessPoolUWSWorker, ThreadPoolUWSWorker
+
+SIMPLE_PARAMETERS = [
+    Parameter(id="QUERY", value="SELECT * FROM TAP_SCHEMA.tables"),
+    Parameter(id="LANG", value="ADQL"),
+]
+
+FINAL_PHASES = (ExecutionPhase.COMPLETED, ExecutionPhase.ERROR, ExecutionPhase.ABORTED)
+
+
+def count_parameters(parameters: Parameters) -> Results:
+    """Process job target returning one result per parameter"""
+    return Results(result=[ResultReference(id=param.id) for param in parameters.parameter])
+
+
+def fail(parameters: Parameters) -> Results:
+    """Process job target that always fails"""
+    raise ValueError("bad query")
+
+
+def sleep_forever(parameters: Parameters) -> Results:
+    """Process job target that never finishes on its own"""
+    time.sleep(600)
+
+
+def wait_for_final_phase(store: InMemoryStore, job_id: str, timeout: float = 10) -> JobSummary:
+    """Wait for a job to reach a final phase, and return it"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = store.get_job(job_id)
+        phase = job.phase
+        if phase in FINAL_PHASES:
+            return job
+        with store.events.watch(job_id, phase) as watch:
+            if store.get_job(job_id).phase == phase:
+                watch.wait(deadline - time.monotonic())
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Job {job_id} is still {phase}")
+
+
+@pytest.fixture
+def mem_store():
+    """A private in-memory store"""
+    return InMemoryStore()
+
+
+class TestThreadPoolWorker:
+    """Test running jobs in a thread pool"""
+
+    def test_run_job(self, mem_store: InMemoryStore):
+        """Test a job is run in the background and its results recorded"""
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def target(job, cancelled):
+            started.set()
+            release.wait(5)
+            return Results(result=[ResultReference(id="result1", href="/result1")])
+
+        worker = ThreadPoolUWSWorker(target, store=mem_store, max_workers=1)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(job_id))
+        assert started.wait(5)
+
+        job = mem_store.get_job(job_id)
+        assert job.phase == ExecutionPhase.EXECUTING
+        assert job.start_time is not None
+
+        release.set()
+        job = wait_for_final_phase(mem_store, job_id)
+
+        assert job.phase == ExecutionPhase.COMPLETED
+        assert job.end_time >= job.start_time
+        assert job.results.result[0].id == "result1"
+        worker.shutdown()
+
+    def test_job_error(self, mem_store: InMemoryStore):
+        """Test a failing job ends in the ERROR phase with an error summary"""
+
+        def target(job, cancelled):
+            raise ValueError("bad query")
+
+        worker = ThreadPoolUWSWorker(target, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(job_id))
+        job = wait_for_final_phase(mem_store, job_id)
+
+        assert job.phase == ExecutionPhase.ERROR
+        assert job.error_summary.message == "bad query"
+        worker.shutdown()
+
+    def test_execution_duration(self, mem_store: InMemoryStore):
+        """Test a job running past its execution duration is aborted and told to stop"""
+
+        stopped = threading.Event()
+
+        def target(job, cancelled):
+            if cancelled.wait(10):
+                stopped.set()
+
+        worker = ThreadPoolUWSWorker(target, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        job = mem_store.get_job(job_id)
+        job.execution_duration = 1
+        mem_store.save_job(job)
+
+        worker.run(job)
+        job = wait_for_final_phase(mem_store, job_id)
+
+        assert job.phase == ExecutionPhase.ABORTED
+        assert stopped.wait(5)
+        worker.shutdown()
+
+    def test_cancel_queued_job(self, mem_store: InMemoryStore):
+        """Test cancelling a job still waiting for a free thread means it never runs"""
+
+        release = threading.Event()
+        ran = []
+
+        def target(job, cancelled):
+            ran.append(job.job_id)
+            release.wait(5)
+
+        worker = ThreadPoolUWSWorker(target, store=mem_store, max_workers=1)
+        first_id = mem_store.add_job(SIMPLE_PARAMETERS)
+        second_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(first_id))
+        worker.run(mem_store.get_job(second_id))
+        assert mem_store.get_job(second_id).phase == ExecutionPhase.QUEUED
+
+        worker.cancel(mem_store.get_job(second_id))
+        release.set()
+        worker.shutdown()
+
+        assert ran == [first_id]
+
+    def test_run_updates_stored_job(self, mem_store: InMemoryStore, tmp_path):
+        """Test queueing a job keeps changes saved since the caller read it, and skips deleted jobs"""
+
+        release = threading.Event()
+
+        def target(job, cancelled):
+            release.wait(5)
+
+        worker = ThreadPoolUWSWorker(target, store=mem_store)
+        assert not worker.blocking
+        assert ThreadPoolUWSWorker(store=SQLiteStore(str(tmp_path / "jobs.db"))).blocking
+
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+        stale_job = mem_store.get_job(job_id)
+        mem_store.update_job(job_id, lambda job: setattr(job, "execution_duration", 60))
+
+        worker.run(stale_job)
+        assert mem_store.get_job(job_id).execution_duration == 60
+
+        deleted_id = mem_store.add_job(SIMPLE_PARAMETERS)
+        deleted_job = mem_store.get_job(deleted_id)
+        mem_store.delete_job(deleted_id)
+        worker.run(deleted_job)
+        assert mem_store.get_job(deleted_id) is None
+
+        release.set()
+        assert wait_for_final_phase(mem_store, job_id).phase == ExecutionPhase.COMPLETED
+        worker.shutdown()
+
+
+class TestProcessPoolWorker:
+    """Test running jobs in child processes"""
+
+    def test_run_job(self, mem_store: InMemoryStore):
+        """Test a job is run in a child process and its results sent back"""
+
+        worker = ProcessPoolUWSWorker(count_parameters, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(job_id))
+        job = wait_for_final_phase(mem_store, job_id, timeout=30)
+
+        assert job.phase == ExecutionPhase.COMPLETED
+        assert [result.id for result in job.results.result] == ["QUERY", "LANG"]
+        worker.shutdown()
+
+    def test_job_error(self, mem_store: InMemoryStore):
+        """Test an exception in the child process puts the job in the ERROR phase"""
+
+        worker = ProcessPoolUWSWorker(fail, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(job_id))
+        job = wait_for_final_phase(mem_store, job_id, timeout=30)
+
+        assert job.phase == ExecutionPhase.ERROR
+        assert job.error_summary.message == "bad query"
+        worker.shutdown()
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc to count open files")
+    def test_cancelled_before_start(self, mem_store: InMemoryStore):
+        """Test a job cancelled before its process starts does not leak the pipe to it"""
+
+        worker = ProcessPoolUWSWorker(count_parameters, store=mem_store)
+        job = mem_store.get_job(mem_store.add_job(SIMPLE_PARAMETERS))
+        cancelled = threading.Event()
+        cancelled.set()
+
+        open_files = len(os.listdir("/proc/self/fd"))
+        for _ in range(10):
+            assert worker.execute(job, cancelled) is None
+        assert len(os.listdir("/proc/self/fd")) == open_files
+        worker.shutdown()
+
+    def test_execution_duration(self, mem_store: InMemoryStore):
+        """Test a child process running past the execution duration is terminated"""
+
+        worker = ProcessPoolUWSWorker(sleep_forever, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        job = mem_store.get_job(job_id)
+        job.execution_duration = 2
+        mem_store.save_job(job)
+
+        start = time.monotonic()
+        worker.run(job)
+        job = wait_for_final_phase(mem_store, job_id, timeout=30)
+
+        assert job.phase == ExecutionPhase.ABORTED
+
+        # the worker thread returns as soon as the child is gone
+        worker.shutdown()
+        assert time.monotonic() - start < 60
+
+
+class TestAsyncioWorker:
+    """Test running job coroutines on an event loop"""
+
+    def test_run_jobs_concurrently(self, mem_store: InMemoryStore):
+        """Test many sleeping jobs share one loop and respect the concurrency cap"""
+
+        active = 0
+        peak = 0
+
+        async def target(job):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return Results(result=[ResultReference(id=job.job_id)])
+
+        worker = AsyncioUWSWorker(target, store=mem_store, max_concurrency=10)
+        job_ids = [mem_store.add_job(SIMPLE_PARAMETERS) for _ in range(50)]
+        for job_id in job_ids:
+            worker.run(mem_store.get_job(job_id))
+
+        for job_id in job_ids:
+            job = wait_for_final_phase(mem_store, job_id)
+            assert job.phase == ExecutionPhase.COMPLETED
+            assert job.results.result[0].id == job_id
+
+        assert peak == 10
+        worker.shutdown()
+
+    def test_execution_duration(self, mem_store: InMemoryStore):
+        """Test a job running past its execution duration is cancelled and aborted"""
+
+        cancelled = threading.Event()
+
+        async def target(job):
+            try:
+                await asyncio.sleep(600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker = AsyncioUWSWorker(target, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        job = mem_store.get_job(job_id)
+        job.execution_duration = 1
+        mem_store.save_job(job)
+
+        worker.run(job)
+        job = wait_for_final_phase(mem_store, job_id)
+
+        assert job.phase == ExecutionPhase.ABORTED
+        assert cancelled.is_set()
+        worker.shutdown()
+
+    def test_cancel_job(self, mem_store: InMemoryStore):
+        """Test cancelling a job cancels its task without recording an outcome"""
+
+        started = threading.Event()
+        cancelled = threading.Event()
+
+        async def target(job):
+            started.set()
+            try:
+                await asyncio.sleep(600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker = AsyncioUWSWorker(target, store=mem_store)
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+
+        worker.run(mem_store.get_job(job_id))
+        assert started.wait(5)
+
+        worker.cancel(mem_store.get_job(job_id))
+        assert cancelled.wait(5)
+        assert mem_store.get_job(job_id).phase == ExecutionPhase.EXECUTING
+        worker.shutdown()
+
+    def test_run_updates_stored_job(self, mem_store: InMemoryStore, tmp_path):
+        """Test queueing a job keeps changes saved since the caller read it, and skips deleted jobs"""
+
+        async def target(job):
+            return None
+
+        worker = AsyncioUWSWorker(target, store=mem_store)
+        assert not worker.blocking
+        sqlite_worker = AsyncioUWSWorker(target, store=SQLiteStore(str(tmp_path / "jobs.db")))
+        assert sqlite_worker.blocking
+        sqlite_worker.shutdown()
+
+        job_id = mem_store.add_job(SIMPLE_PARAMETERS)
+        stale_job = mem_store.get_job(job_id)
+        mem_store.update_job(job_id, lambda job: setattr(job, "execution_duration", 60))
+        worker.run(stale_job)
+
+        job = wait_for_final_phase(mem_store, job_id)
+        assert (job.phase, job.execution_duration) == (ExecutionPhase.COMPLETED, 60)
+
+        deleted_id = mem_store.add_job(SIMPLE_PARAMETERS)
+        deleted_job = mem_store.get_job(deleted_id)
+        mem_store.delete_job(deleted_id)
+        worker.run(deleted_job)
+        assert mem_store.get_job(deleted_id) is None
+        worker.shutdown()
+
+
+class RecordingWorker(BaseUWSWorker):
+    """Worker that only records which jobs it was asked to run"""
+
+    blocking = False
+
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+        self.started = []
+
+    def run(self, job: JobSummary) -> None:
+        self.started.append(job.job_id)
+        job.phase = ExecutionPhase.EXECUTING
+        self.store.save_job(job)
+
+    def finish(self, job_id: str):
+        job = self.store.get_job(job_id)
+        job.phase = ExecutionPhase.COMPLETED
+        self.store.save_job(job)
+
+
+class TestFairShareScheduler:
+    """Test queueing jobs fairly between owners"""
+
+    def add_jobs(self, store: InMemoryStore, owner_id: str, count: int, priority: int = None) -> list[str]:
+        parameters = list(SIMPLE_PARAMETERS)
+        if priority is not None:
+            parameters.append(Parameter(id="PRIORITY", value=str(priority)))
+        return [store.add_job(parameters, owner_id=owner_id) for _ in range(count)]
+
+    def test_max_running(self, mem_store: InMemoryStore):
+        """Test jobs past the limit wait until a running job finishes"""
+
+        worker = RecordingWorker(mem_store)
+        scheduler = FairShareScheduler(worker, store=mem_store, max_running=2, weights={})
+
+        job_ids = self.add_jobs(mem_store, "alice", 3)
+        for job_id in job_ids:
+            scheduler.run(mem_store.get_job(job_id))
+
+        assert worker.started == job_ids[:2]
+        assert mem_store.get_job(job_ids[2]).phase == ExecutionPhase.QUEUED
+
+        worker.finish(job_ids[0])
+        assert worker.started == job_ids
+
+    def test_fair_share(self, mem_store: InMemoryStore):
+        """Test an owner with many queued jobs does not starve another owner"""
+
+        worker = RecordingWorker(mem_store)
+        scheduler = FairShareScheduler(worker, store=mem_store, max_running=1, weights={})
+
+        alice_ids = self.add_jobs(mem_store, "alice", 4)
+        bob_ids = self.add_jobs(mem_store, "bob", 2)
+        for job_id in alice_ids + bob_ids:
+            scheduler.run(mem_store.get_job(job_id))
+
+        while len(worker.started) < 6:
+            worker.finish(worker.started[-1])
+
+        # alice took the free slot first, then the owners alternate
+        assert worker.started == [alice_ids[0], bob_ids[0], alice_ids[1], bob_ids[1], alice_ids[2], alice_ids[3]]
+
+    def test_priority_and_queue_position(self, mem_store: InMemoryStore):
+        """Test higher priority jobs of an owner run first, and are reported as such"""
+
+        worker = RecordingWorker(mem_store)
+        scheduler = FairShareScheduler(worker, store=mem_store, max_running=1, weights={})
+
+        (running_id,) = self.add_jobs(mem_store, "alice", 1)
+        (low_id,) = self.add_jobs(mem_store, "alice", 1, priority=1)
+        (high_id,) = self.add_jobs(mem_store, "alice", 1, priority=5)
+        for job_id in (running_id, low_id, high_id):
+            scheduler.run(mem_store.get_job(job_id))
+
+        assert scheduler.queue_position(mem_store.get_job(running_id)) is None
+        assert scheduler.queue_position(mem_store.get_job(high_id)) == 0
+        assert scheduler.queue_position(mem_store.get_job(low_id)) == 1
+
+        scheduler.cancel(mem_store.get_job(high_id))
+        assert scheduler.queue_position(mem_store.get_job(low_id)) == 0
+
+        worker.finish(running_id)
+        assert worker.started == [running_id, low_id]
+
+    def test_run_updates_stored_job(self, mem_store: InMemoryStore, tmp_path):
+        """Test queueing a job keeps changes saved since the caller read it, and skips deleted jobs"""
+
+        worker = RecordingWorker(mem_store)
+        scheduler = FairShareScheduler(worker, store=mem_store, max_running=1, weights={})
+        assert not scheduler.blocking
+        sqlite_store = SQLiteStore(str(tmp_path / "jobs.db"))
+        assert FairShareScheduler(RecordingWorker(mem_store), store=sqlite_store).blocking
+
+        running_id, queued_id, deleted_id = self.add_jobs(mem_store, "alice", 3)
+        scheduler.run(mem_store.get_job(running_id))
+
+        stale_job = mem_store.get_job(queued_id)
+        mem_store.update_job(queued_id, lambda job: setattr(job, "execution_duration", 60))
+        scheduler.run(stale_job)
+        job = mem_store.get_job(queued_id)
+        assert (job.phase, job.execution_duration) == (ExecutionPhase.QUEUED, 60)
+
+        deleted_job = mem_store.get_job(deleted_id)
+        mem_store.delete_job(deleted_id)
+        scheduler.run(deleted_job)
+        assert scheduler.queue_position(deleted_job) is None
+        assert mem_store.get_job(deleted_id) is None